@@ -127,3 +127,71 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Ollama
+# All generation commands talk to Ollama through hotels.llm.OllamaClient.
+
+OLLAMA_URL = config('OLLAMA_URL', default='http://127.0.0.1:11434')
+OLLAMA_MODEL = config('OLLAMA_MODEL', default='tinyllama:latest')
+OLLAMA_POOL_SIZE = config('OLLAMA_POOL_SIZE', default=10, cast=int)
+OLLAMA_CONNECT_TIMEOUT = config('OLLAMA_CONNECT_TIMEOUT', default=5, cast=float)
+OLLAMA_READ_TIMEOUT = config('OLLAMA_READ_TIMEOUT', default=300, cast=float)
+
+# Several Ollama servers, e.g. "http://gpu1:11434 weight=2 max_in_flight=8, http://gpu2:11434".
+# When set, requests go to the least loaded healthy one (see hotels.balancer)
+# and OLLAMA_URL is ignored. Backends are probed every OLLAMA_PROBE_INTERVAL
+# seconds and taken out after OLLAMA_EJECT_AFTER failures in a row.
+OLLAMA_BACKENDS = config('OLLAMA_BACKENDS', default='')
+OLLAMA_PROBE_INTERVAL = config('OLLAMA_PROBE_INTERVAL', default=10, cast=float)
+OLLAMA_EJECT_AFTER = config('OLLAMA_EJECT_AFTER', default=3, cast=int)
+
+# Failed requests are retried with jittered exponential backoff (see hotels.llm.RetryPolicy).
+OLLAMA_MAX_RETRIES = config('OLLAMA_MAX_RETRIES', default=3, cast=int)
+OLLAMA_RETRY_BACKOFF = config('OLLAMA_RETRY_BACKOFF', default=1.0, cast=float)
+OLLAMA_RETRY_MAX_BACKOFF = config('OLLAMA_RETRY_MAX_BACKOFF', default=30, cast=float)
+
+# Completed responses are cached on disk when a path is set (see hotels.cache).
+OLLAMA_CACHE_PATH = config('OLLAMA_CACHE_PATH', default='')
+OLLAMA_CACHE_MAX_BYTES = config('OLLAMA_CACHE_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+
+
+# Read API
+# Responses are cached per view and URL through Django's cache framework.
+# Generation commands invalidate them when they commit, so point the web
+# server and the commands at a shared backend (e.g. Redis or Memcached) for
+# new rows to show up before API_CACHE_SECONDS pass.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+API_CACHE_SECONDS = config('API_CACHE_SECONDS', default=300, cast=int)
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=100, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=1000, cast=int)
+
+# On-demand summaries (see hotels.ondemand): at most this many Ollama calls
+# at once per server process; requests for the same property share one call.
+ONDEMAND_MAX_IN_FLIGHT = config('ONDEMAND_MAX_IN_FLIGHT', default=4, cast=int)
+ONDEMAND_MAX_TOKENS = config('ONDEMAND_MAX_TOKENS', default=400, cast=int)
+
+
+# Logging
+# Progress from the generation pipeline (e.g. adaptive concurrency decisions)
+# is logged under the "hotels" logger.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'hotels': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO')},
+    },
+}
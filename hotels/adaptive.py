@@ -0,0 +1,142 @@
+import logging
+import re
+import threading
+import time
+
+from hotels.llm import OllamaError, OllamaTimeout, on_retry
+
+logger = logging.getLogger(__name__)
+
+# Statuses Ollama (or a proxy in front of it) uses to say it is overloaded.
+OVERLOAD_STATUSES = (429, 503)
+
+_TEMPLATE_END = re.compile(r'[:\n]')
+_NUMBER = re.compile(r'\d+')
+
+
+def prompt_template(prompt):
+    """Name of the template ``prompt`` was built from: its opening words, numbers masked.
+
+    Prompts stop mentioning the property at the first colon or line break,
+    so every rating prompt gets one name and every review prompt another.
+    """
+    match = _TEMPLATE_END.search(prompt, 0, 200)
+    return _NUMBER.sub('#', prompt[:match.start() if match else 80])
+
+
+class AIMDLimiter:
+    """Additive-increase, multiplicative-decrease limit on requests in flight.
+
+    The limit starts at ``min_limit`` and doubles every round of requests
+    until the first sign of overload, then grows by about one per round
+    while requests stay within the latency target. A request that was slower
+    than the target, rejected with 429/503 or timed out multiplies the limit
+    by ``backoff``. Signals from requests that started before the last
+    decrease are ignored, so one burst of overload only backs off once.
+
+    Without ``target_latency`` the target is ``tolerance`` times the lowest
+    smoothed latency seen so far. Latency is smoothed and compared per prompt
+    ``template``: a long review is not slow next to a short rating, so mixing
+    them must not read as overload.
+    """
+
+    def __init__(self, max_limit, min_limit=1, target_latency=None, tolerance=2.0, backoff=0.5, smoothing=0.2):
+        self.max_limit = max(max_limit, min_limit)
+        self.min_limit = min_limit
+        self.target_latency = target_latency
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self._limit = float(min_limit)
+        self._slow_start = True
+        self._latency = {}
+        self._baseline = {}
+        self._decreased_at = float('-inf')
+        self._lock = threading.Lock()
+        self.lowest = self.highest = self.limit
+        self.decreases = {}
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def target(self, template=None):
+        if self.target_latency is not None:
+            return self.target_latency
+        baseline = self._baseline.get(template)
+        if baseline is None:
+            return None
+        return baseline * self.tolerance
+
+    def on_success(self, started, seconds, template=None):
+        with self._lock:
+            latency = self._latency.get(template)
+            latency = seconds if latency is None else latency + self.smoothing * (seconds - latency)
+            self._latency[template] = latency
+            if template not in self._baseline or latency < self._baseline[template]:
+                self._baseline[template] = latency
+
+            target = self.target(template)
+            if target is not None and latency > target:
+                self._decrease(started, f"latency {latency:.2f}s over target {target:.2f}s", 'latency')
+            else:
+                self._increase()
+
+    def on_overload(self, started, reason):
+        with self._lock:
+            self._decrease(started, reason, 'overload')
+
+    def _increase(self):
+        if self._limit >= self.max_limit:
+            return
+        step = 1.0 if self._slow_start else 1.0 / self._limit
+        self._set(min(self._limit + step, self.max_limit), 'requests within target')
+
+    def _decrease(self, started, reason, kind):
+        if started < self._decreased_at:
+            return
+        self._decreased_at = time.monotonic()
+        self._slow_start = False
+        self.decreases[kind] = self.decreases.get(kind, 0) + 1
+        self._set(max(self._limit * self.backoff, self.min_limit), reason)
+
+    def _set(self, value, reason):
+        previous = self.limit
+        self._limit = value
+        if self.limit != previous:
+            logger.info("Concurrency limit %d -> %d: %s", previous, self.limit, reason)
+            self.lowest = min(self.lowest, self.limit)
+            self.highest = max(self.highest, self.limit)
+
+
+class AdaptiveClient:
+    """Wraps a client and reports how each request went to an ``AIMDLimiter``.
+
+    Overloads the wrapped client retried by itself are reported too, as
+    they happen, so the limit backs off before the retries run out.
+    """
+
+    def __init__(self, client, limiter):
+        self.client = client
+        self.limiter = limiter
+
+    def chat(self, prompt, **options):
+        started = time.monotonic()
+
+        def report(error):
+            if isinstance(error, OllamaTimeout):
+                self.limiter.on_overload(started, 'timeout')
+            elif error.status_code in OVERLOAD_STATUSES:
+                self.limiter.on_overload(started, f"HTTP {error.status_code}")
+
+        try:
+            with on_retry(report):
+                content = self.client.chat(prompt, **options)
+        except OllamaError as e:
+            report(e)
+            raise
+        self.limiter.on_success(started, time.monotonic() - started, prompt_template(prompt))
+        return content
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
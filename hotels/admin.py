@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import GeneratedHotelTD,GeneratedPropertySummary,GeneratePropertyRatingReview
+from .models import GeneratedHotelTD,GeneratedPropertySummary,GeneratePropertyRatingReview,Property
 
+admin.site.register(Property)
 admin.site.register(GeneratedHotelTD)
 admin.site.register(GeneratedPropertySummary)
 admin.site.register(GeneratePropertyRatingReview)
@@ -0,0 +1,35 @@
+import time
+
+from django.core.cache import cache
+
+# API views whose responses include rows of each model.
+VIEWS_BY_MODEL = {
+    'property': ('properties', 'property'),
+    'generatedhoteltd': ('properties', 'property', 'rewrites'),
+    'generatedpropertysummary': ('properties', 'property', 'summaries'),
+    'generatepropertyratingreview': ('properties', 'property', 'reviews'),
+}
+
+
+def _version_key(view):
+    return f"hotels-api:version:{view}"
+
+
+def cache_version(view):
+    """Current cache version of ``view``; entries written under older versions are never read again."""
+    # Start from the clock rather than 1, so a version that was evicted
+    # cannot come back as a number old entries were stored under.
+    return cache.get_or_set(_version_key(view), time.time_ns, None)
+
+
+def invalidate(*views):
+    for view in views:
+        try:
+            cache.incr(_version_key(view))
+        except ValueError:
+            cache.set(_version_key(view), time.time_ns(), None)
+
+
+def invalidate_model(model):
+    """Invalidate every API view that shows rows of ``model``."""
+    invalidate(*VIEWS_BY_MODEL.get(model._meta.model_name, ()))
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from hotels.llm import OllamaAborted, OllamaClient, OllamaError, RetryPolicy, retrying
+
+logger = logging.getLogger(__name__)
+
+
+def parse_backends(value):
+    """Parse ``OLLAMA_BACKENDS``: comma-separated URLs, each optionally followed by ``weight=`` and ``max_in_flight=``."""
+    backends = []
+    for entry in filter(None, (entry.strip() for entry in value.split(','))):
+        url, *options = entry.split()
+        kwargs = {}
+        for option in options:
+            name, _, number = option.partition('=')
+            if name not in ('weight', 'max_in_flight'):
+                raise ValueError(f"Unknown option {name!r} for Ollama backend {url}")
+            kwargs[name] = float(number) if name == 'weight' else int(number)
+        backends.append(Backend(url, **kwargs))
+    if not backends:
+        raise ValueError('OLLAMA_BACKENDS lists no backends')
+    return backends
+
+
+class Backend:
+    """One Ollama server, with its own connection pool of ``max_in_flight`` connections."""
+
+    def __init__(self, url, weight=1.0, max_in_flight=None, client=None):
+        self.url = url.rstrip('/')
+        self.weight = weight
+        self.max_in_flight = max_in_flight or settings.OLLAMA_POOL_SIZE
+        # Retries are made by BalancedClient, so they can go to another backend.
+        self.client = client or OllamaClient(
+            base_url=self.url, pool_size=self.max_in_flight, retry=RetryPolicy(max_retries=0)
+        )
+        self.healthy = True
+        self.failures = 0
+        self.in_flight = 0
+        self.turn = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.ejections = 0
+
+    def as_dict(self):
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'requests': self.requests,
+            'errors': self.errors,
+            'ejections': self.ejections,
+        }
+
+
+class BalancedClient:
+    """Spreads requests over several Ollama backends.
+
+    Each request goes to the healthy backend with the lowest in-flight count
+    relative to its ``weight``, among those below their ``max_in_flight``;
+    equally loaded backends take turns in proportion to their weight. When
+    all are full, callers wait for a free slot. A backend that fails
+    ``eject_after`` times in a row with an outage error (see
+    ``OllamaError.retryable``; 429 only means busy) is taken out of rotation.
+    Every ``probe_interval`` seconds a background thread asks each backend
+    for its model list, ejecting the ones that stop answering and
+    re-admitting the ones that answer again.
+
+    Failed requests are retried according to ``retry``, preferably on
+    another backend. With no healthy backend left, requests fail with a
+    retryable ``OllamaError``, which lets the circuit breaker pause the run
+    until a probe brings one back.
+    """
+
+    def __init__(self, backends, retry=None, eject_after=None, probe_interval=None, probe_timeout=2.0):
+        self.backends = list(backends)
+        self.retry = retry or RetryPolicy()
+        self.eject_after = settings.OLLAMA_EJECT_AFTER if eject_after is None else eject_after
+        self.probe_interval = settings.OLLAMA_PROBE_INTERVAL if probe_interval is None else probe_interval
+        self.probe_timeout = probe_timeout
+        self.model = self.backends[0].client.model
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._prober = None
+
+    def start(self):
+        """Start the background health probes."""
+        if self.probe_interval and self._prober is None:
+            self._prober = threading.Thread(target=self._probe_forever, name='ollama-probe', daemon=True)
+            self._prober.start()
+        return self
+
+    def chat(self, prompt, **options):
+        return self.complete(prompt, **options).content
+
+    def complete(self, prompt, on_token=None, **options):
+        """Send the request to the least loaded backend; see ``OllamaClient.complete``."""
+        started = time.perf_counter()
+        retries = 0
+        emitted = False
+        failed_on = None
+
+        def forward(text):
+            nonlocal emitted
+            emitted = True
+            on_token(text)
+
+        while True:
+            backend = self._acquire(avoid=failed_on)
+            try:
+                completion = backend.client.complete(
+                    prompt, on_token=forward if on_token is not None else None, **options
+                )
+            except OllamaError as e:
+                self._release(backend, e)
+                if not e.retryable or retries >= self.retry.max_retries or emitted:
+                    raise
+                retrying(e)
+                time.sleep(self.retry.delay(retries, e.retry_after))
+                retries += 1
+                failed_on = backend
+                continue
+            self._release(backend)
+            completion.retries = retries
+            completion.seconds = time.perf_counter() - started
+            return completion
+
+    def _acquire(self, avoid=None):
+        with self._condition:
+            while True:
+                healthy = [backend for backend in self.backends if backend.healthy]
+                if not healthy:
+                    raise OllamaError('No healthy Ollama backend')
+                free = [backend for backend in healthy if backend.in_flight < backend.max_in_flight]
+                candidates = [backend for backend in free if backend is not avoid] or free
+                if candidates:
+                    backend = self._pick(candidates)
+                    backend.in_flight += 1
+                    backend.requests += 1
+                    return backend
+                self._condition.wait()
+
+    @staticmethod
+    def _pick(candidates):
+        # Least loaded first; ties are broken by smooth weighted round-robin,
+        # so idle backends still share requests in proportion to their weight.
+        least = min(backend.in_flight / backend.weight for backend in candidates)
+        tied = [backend for backend in candidates if backend.in_flight / backend.weight == least]
+        for backend in tied:
+            backend.turn += backend.weight
+        chosen = max(tied, key=lambda backend: backend.turn)
+        chosen.turn -= sum(backend.weight for backend in tied)
+        return chosen
+
+    def _release(self, backend, error=None):
+        with self._condition:
+            backend.in_flight -= 1
+            if error is not None and error.retryable and error.status_code != 429:
+                backend.errors += 1
+                self._failed(backend, str(error))
+            elif not isinstance(error, OllamaAborted):
+                # An aborted request says nothing about the backend.
+                backend.failures = 0
+            self._condition.notify_all()
+
+    def _failed(self, backend, reason):
+        backend.failures += 1
+        if backend.healthy and backend.failures >= self.eject_after:
+            backend.healthy = False
+            backend.ejections += 1
+            logger.warning("Ejecting Ollama backend %s after %d failures (%s)", backend.url, backend.failures, reason)
+
+    def probe(self):
+        """Check every backend once, ejecting or re-admitting it."""
+        for backend in self.backends:
+            ok = backend.client.ping(self.probe_timeout)
+            with self._condition:
+                if not ok:
+                    self._failed(backend, 'health probe failed')
+                    continue
+                backend.failures = 0
+                if not backend.healthy:
+                    backend.healthy = True
+                    logger.warning("Ollama backend %s answers again; re-admitting it", backend.url)
+                    self._condition.notify_all()
+
+    def _probe_forever(self):
+        while not self._stopped.wait(self.probe_interval):
+            try:
+                self.probe()
+            except Exception:
+                logger.exception('Ollama health probe crashed')
+
+    def backend_stats(self):
+        with self._condition:
+            return [backend.as_dict() for backend in self.backends]
+
+    def stats(self):
+        """Connection statistics summed over all backends."""
+        totals = [backend.client.stats() for backend in self.backends]
+        opened = sum(stats['connections_opened'] for stats in totals)
+        requests = sum(stats['requests'] for stats in totals)
+        return {
+            'connections_opened': opened,
+            'requests': requests,
+            'reused_requests': sum(stats['reused_requests'] for stats in totals),
+            'requests_per_connection': requests / opened if opened else 0.0,
+            'max_requests_per_connection': max(stats['max_requests_per_connection'] for stats in totals),
+        }
+
+    def close(self):
+        self._stopped.set()
+        for backend in self.backends:
+            backend.client.close()
@@ -0,0 +1,142 @@
+import csv
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+from django.core.management import call_command
+from django.db import transaction
+
+ROOM_TYPES = ['Private Room', 'Entire House', 'Shared Room', 'Hotel Room']
+CITIES = [
+    ('Los Angeles', 34.0522, -118.2437), ('Miami', 25.7617, -80.1918), ('Denver', 39.7392, -104.9903),
+    ('Chicago', 41.8781, -87.6298), ('Seattle', 47.6062, -122.3321), ('Austin', 30.2672, -97.7431),
+]
+WORDS = (
+    'cozy bright spacious quiet modern charming rustic renovated sunny private walkable '
+    'balcony kitchen garden pool view downtown beach lake mountain park'
+).split()
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    """Write ``rows`` fake properties in the hotel_datas.csv layout."""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['id', 'title', 'rating', 'location', 'latitude', 'longitude', 'room_type', 'price', 'description'])
+        for property_id in range(1, rows + 1):
+            city, latitude, longitude = rng.choice(CITIES)
+            writer.writerow([
+                property_id,
+                f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {property_id}",
+                round(rng.uniform(3, 5), 1),
+                city,
+                round(latitude + rng.uniform(-0.2, 0.2), 4),
+                round(longitude + rng.uniform(-0.2, 0.2), 4),
+                rng.choice(ROOM_TYPES),
+                rng.randint(40, 600),
+                ' '.join(rng.choice(WORDS) for _ in range(rng.randint(12, 40))).capitalize() + '.',
+            ])
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # ru_maxrss is the lifetime peak: kilobytes on Linux, bytes on macOS.
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+
+
+class PeakRSSSampler:
+    """Tracks the highest RSS seen while the ``with`` block runs."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class LatencyRecorder:
+    """Wraps a client and records how long every request takes."""
+
+    def __init__(self, client):
+        self.client = client
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def chat(self, prompt, **options):
+        return self.complete(prompt, **options).content
+
+    def complete(self, prompt, **options):
+        started = time.perf_counter()
+        try:
+            return self.client.complete(prompt, **options)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.samples.append(elapsed)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run_command(command, client, rows, input_path, **options):
+    """Run one generation command against ``client`` and return its measurements.
+
+    Everything the command writes is rolled back afterwards, so benchmarks can
+    run against a database that holds real data.
+    """
+    recorder = LatencyRecorder(client)
+    command._client = recorder
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), PeakRSSSampler() as rss:
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                call_command(command, input=input_path, stdout=devnull, **options)
+                raise _Rollback
+        except _Rollback:
+            pass
+        elapsed = time.perf_counter() - started
+
+    return {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed else 0.0,
+        'requests': len(recorder.samples),
+        'p50_latency': percentile(recorder.samples, 0.50),
+        'p99_latency': percentile(recorder.samples, 0.99),
+        'peak_rss_bytes': rss.peak,
+    }
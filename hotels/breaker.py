@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+
+from hotels.llm import OllamaError
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+
+class CircuitOpen(OllamaError):
+    """Raised when Ollama stayed down for longer than a caller was willing to wait."""
+
+
+class CircuitBreaker:
+    """Pauses all requests while Ollama is down.
+
+    After ``threshold`` consecutive outage failures (see
+    ``OllamaError.retryable``) the circuit opens and every caller waits. After
+    ``cooldown`` seconds a single probe request is let through. If it
+    succeeds the circuit closes and everyone carries on; if it fails the
+    circuit opens again with twice the cooldown, up to ``max_cooldown``.
+    A caller that has waited ``max_wait`` seconds gives up with CircuitOpen.
+    """
+
+    def __init__(self, threshold=5, cooldown=5.0, max_cooldown=60.0, max_wait=900.0):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_wait = max_wait
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.paused_seconds = 0.0
+        self._cooldown = cooldown
+        self._retry_at = 0.0
+        self._opened_at = None
+        self._condition = threading.Condition()
+
+    def before_request(self):
+        """Block while the circuit is open; return once this caller may send a request."""
+        with self._condition:
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                now = time.monotonic()
+                if self.state == CLOSED:
+                    return
+                if self.state == OPEN and now >= self._retry_at:
+                    self.state = HALF_OPEN
+                    return
+                if now >= deadline:
+                    raise CircuitOpen(f"Ollama unavailable for more than {self.max_wait:.0f}s")
+                wait = deadline - now if self.state == HALF_OPEN else self._retry_at - now
+                self._condition.wait(min(wait, deadline - now))
+
+    def on_success(self):
+        with self._condition:
+            if self.state != CLOSED:
+                paused = time.monotonic() - self._opened_at
+                self.paused_seconds += paused
+                logger.warning("Ollama is back after %.0fs; resuming requests", paused)
+                self.state = CLOSED
+                self._condition.notify_all()
+            self.failures = 0
+            self._cooldown = self.base_cooldown
+
+    def on_failure(self, error):
+        with self._condition:
+            self.failures += 1
+            if self.state == OPEN:
+                # Requests that were already in flight when the circuit opened.
+                return
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state == CLOSED:
+                    self.opened += 1
+                    self._opened_at = time.monotonic()
+                self.state = OPEN
+                self._retry_at = time.monotonic() + self._cooldown
+                logger.warning(
+                    "Ollama looks down after %d failed requests (%s); pausing for %.0fs",
+                    self.failures, error, self._cooldown,
+                )
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                self._condition.notify_all()
+
+
+class BreakerClient:
+    """Wraps a client so every request goes through a ``CircuitBreaker``."""
+
+    def __init__(self, client, breaker):
+        self.client = client
+        self.breaker = breaker
+
+    def chat(self, prompt, **options):
+        self.breaker.before_request()
+        try:
+            content = self.client.chat(prompt, **options)
+        except OllamaError as e:
+            if e.retryable:
+                self.breaker.on_failure(e)
+            else:
+                # Ollama answered, so it is up; the request itself was the problem.
+                self.breaker.on_success()
+            raise
+        self.breaker.on_success()
+        return content
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
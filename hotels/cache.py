@@ -0,0 +1,170 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Replies fetched inside ``cache_if_accepted`` on this thread, as (cache, key, content).
+_scope = threading.local()
+
+
+@contextmanager
+def cache_if_accepted():
+    """Cache the replies fetched inside the block only if the block succeeds.
+
+    Commands generate each row inside one, so a reply that fails to parse is
+    never stored. A cached reply that fails is deleted, so the next run asks
+    Ollama again instead of failing on the same text. Blocks can be nested;
+    an inner block's replies are kept once the outer one succeeds.
+    """
+    outer = getattr(_scope, 'replies', None)
+    _scope.replies = replies = []
+    try:
+        yield
+    except BaseException:
+        for cache, key, content in replies:
+            if content is None:
+                cache.delete(key)
+        raise
+    else:
+        if outer is not None:
+            outer.extend(replies)
+        else:
+            for cache, key, content in replies:
+                if content is not None:
+                    cache.set(key, content)
+    finally:
+        _scope.replies = outer
+
+
+class ResponseCache:
+    """On-disk cache of Ollama replies, keyed by a hash of the request.
+
+    Entries live in a single SQLite file. When the stored replies grow past
+    ``max_bytes`` the least recently read entries are evicted first.
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self.total_bytes = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def make_key(model, prompt, options=None):
+        raw = json.dumps([model, prompt, options or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT value FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def set(self, key, value):
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            old = self._db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, size, time.time()),
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            old = self._db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if old is not None:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self.total_bytes -= old[0]
+
+    def _evict(self):
+        # Drop the oldest entries in chunks until the cache fits again.
+        while self.total_bytes > self.max_bytes:
+            rows = self._db.execute('SELECT key, size FROM responses ORDER BY accessed LIMIT 100').fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            freed = []
+            for key, size in rows:
+                freed.append(key)
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+            self._db.executemany('DELETE FROM responses WHERE key = ?', [(key,) for key in freed])
+            self.evictions += len(freed)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'bytes': self.total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CachedClient:
+    """Wraps an ``OllamaClient`` so repeated requests are served from a cache.
+
+    With ``refresh=True`` the cache is never read, but fresh replies are still
+    written to it. Streaming options are left out of the key; a streamed reply
+    that stopped early is cached as is, since its caller already had all it
+    needed from it. Inside ``cache_if_accepted`` fresh replies are only
+    written once the caller has used them.
+    """
+    transport_options = ('stream', 'stop_when')
+
+    def __init__(self, client, cache, refresh=False):
+        self.client = client
+        self.cache = cache
+        self.refresh = refresh
+
+    def chat(self, prompt, **options):
+        key_options = {name: value for name, value in options.items() if name not in self.transport_options}
+        key = self.cache.make_key(self.client.model, prompt, key_options)
+        if not self.refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._track(key, None)
+                return cached
+
+        content = self.client.chat(prompt, **options)
+        if not self._track(key, content):
+            self.cache.set(key, content)
+        return content
+
+    def _track(self, key, content):
+        replies = getattr(_scope, 'replies', None)
+        if replies is None:
+            return False
+        replies.append((self.cache, key, content))
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
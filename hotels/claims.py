@@ -0,0 +1,100 @@
+import os
+import socket
+import time
+import zlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from hotels.models import WorkClaim
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def parse_shard(value):
+    """Parse ``"i/N"`` into ``(i, N)`` with ``0 <= i < N``."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard {value!r}, expected i/N such as 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value!r}, need 0 <= i < N")
+    return index, count
+
+
+def shard_of(property_id, row, count):
+    if property_id is None:
+        # Rows without an id still land on exactly one shard.
+        return zlib.crc32(f"{row.get('title')}|{row.get('description')}".encode('utf-8')) % count
+    return property_id % count
+
+
+class WorkClaimer:
+    """Hands out properties to one worker at a time through ``WorkClaim`` rows.
+
+    A worker claims a batch of properties by taking a lease on them. Rows that
+    another worker holds with a live lease are skipped. On PostgreSQL,
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` keeps concurrent claims from
+    blocking each other. A lease that expires because its worker died makes
+    the property claimable again.
+
+    Completed properties are only skipped by workers of the same ``run``.
+    Claims left over from an earlier run, done or not, are taken over, so a
+    new run regenerates what its own filters (``--resume``,
+    ``--changed-only``) select.
+    """
+
+    def __init__(self, task, run, owner=None, lease_seconds=600):
+        self.task = task
+        self.run = run
+        self.owner = owner or default_worker_id()
+        self.lease = timedelta(seconds=lease_seconds)
+        self._last_renewed = time.monotonic()
+
+    def claim(self, property_ids):
+        """Take leases on as many of ``property_ids`` as possible; return those claimed."""
+        property_ids = sorted(set(property_ids))
+        if not property_ids:
+            return set()
+
+        now = timezone.now()
+        with transaction.atomic():
+            WorkClaim.objects.bulk_create(
+                [WorkClaim(task=self.task, property_id=property_id, run=self.run) for property_id in property_ids],
+                ignore_conflicts=True,
+            )
+            claimable = list(
+                WorkClaim.objects.select_for_update(skip_locked=True)
+                .filter(task=self.task, property_id__in=property_ids)
+                .filter(Q(done=False) | ~Q(run=self.run))
+                .filter(Q(leased_until__isnull=True) | Q(leased_until__lt=now) | Q(owner=self.owner))
+                .values_list('id', 'property_id')
+            )
+            WorkClaim.objects.filter(id__in=[claim_id for claim_id, _ in claimable]).update(
+                run=self.run, owner=self.owner, leased_until=now + self.lease, done=False
+            )
+        return {property_id for _, property_id in claimable}
+
+    def complete(self, property_ids):
+        WorkClaim.objects.filter(
+            task=self.task, run=self.run, owner=self.owner, property_id__in=list(property_ids)
+        ).update(done=True, leased_until=None)
+
+    def renew(self, force=False):
+        """Extend this worker's open leases, at most once per quarter lease."""
+        if not force and time.monotonic() - self._last_renewed < self.lease.total_seconds() / 4:
+            return
+        self._last_renewed = time.monotonic()
+        WorkClaim.objects.filter(task=self.task, run=self.run, owner=self.owner, done=False).update(
+            leased_until=timezone.now() + self.lease
+        )
+
+    def release(self):
+        """Give up leases on claimed properties that were not finished."""
+        WorkClaim.objects.filter(task=self.task, run=self.run, owner=self.owner, done=False).update(
+            owner='', leased_until=None
+        )
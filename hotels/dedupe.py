@@ -0,0 +1,174 @@
+import hashlib
+import re
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+_NOT_WORD = re.compile(r'[^\w\s]+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Case-fold and NFKC-normalize ``text`` and drop punctuation and repeated whitespace."""
+    text = unicodedata.normalize('NFKC', str(text or '')).casefold()
+    return _SPACES.sub(' ', _NOT_WORD.sub(' ', text)).strip()
+
+
+def shingles(text, size=5):
+    """Character ``size``-grams of ``text``; short texts are their own single shingle."""
+    if len(text) <= size:
+        return {text}
+    return {text[start:start + size] for start in range(len(text) - size + 1)}
+
+
+def _digest(*parts):
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).digest()
+
+
+class MinHasher:
+    """MinHash signatures over character shingles.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the two shingle sets. Permutations are ``(a * x + b) mod p``
+    over CRC32 shingle hashes, computed for all shingles at once with numpy.
+    """
+    prime = 4294967291  # largest prime below 2**32, so a * x + b fits in uint64
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, self.prime, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, self.prime, num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)), dtype=np.uint64
+        )
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % self.prime
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+class DuplicateIndex:
+    """Finds rows whose generated content can be copied from an earlier row.
+
+    Two rows are exact duplicates when all ``fields`` are equal after
+    ``normalize``. With ``near=True``, rows are also near duplicates when
+    their other fields are equal and the MinHash-estimated Jaccard
+    similarity of their ``text_fields`` is at least ``threshold``. Candidate
+    pairs come from LSH: the signature is split into ``bands``, and rows that
+    share any band are compared.
+
+    ``match`` is called on the main thread for every selected row, in input
+    order. It returns the key of an earlier representative row, or None if
+    the row must be generated. The representative's result is handed over
+    with ``remember`` and read back for each follower with ``result``. At
+    most ``max_results`` results are kept; older representatives without
+    waiting followers are forgotten, and rows that would have matched them
+    are generated again.
+    """
+
+    def __init__(self, fields, text_fields=('title', 'description'), near=False, threshold=0.85,
+                 num_perm=64, bands=8, max_results=100_000):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.fields = tuple(fields)
+        self.text_fields = tuple(field for field in text_fields if field in self.fields)
+        self.other_fields = tuple(field for field in self.fields if field not in self.text_fields)
+        self.near = near
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.max_results = max_results
+        self.hasher = MinHasher(num_perm) if near else None
+
+        self._next_key = 0
+        self._exact = {}
+        self._buckets = {}
+        self._signatures = {}
+        self._digests = {}
+        self._band_keys = {}
+        self._awaiting = {}
+        self._pending = set()
+        self._followers = {}
+        self._results = OrderedDict()
+
+    def match(self, row):
+        """Return ``(key, kind)`` for a duplicate, with kind ``'exact'`` or ``'near'``; None otherwise."""
+        values = {field: normalize(row.get(field)) for field in self.fields}
+        digest = _digest(*(values[field] for field in self.fields))
+        key = self._exact.get(digest)
+        if self._usable(key):
+            return self._follow(key, 'exact')
+
+        signature = band_keys = None
+        if self.near:
+            text = ' '.join(values[field] for field in self.text_fields)
+            signature = self.hasher.signature(text)
+            band_keys = self._bands_of(signature, values)
+            for band_key in band_keys:
+                candidate = self._buckets.get(band_key)
+                if self._usable(candidate) and candidate in self._signatures:
+                    if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                        return self._follow(candidate, 'near')
+
+        key = self._next_key
+        self._next_key += 1
+        self._exact[digest] = key
+        self._digests[key] = digest
+        if signature is not None:
+            self._signatures[key] = signature
+            self._band_keys[key] = band_keys
+            for band_key in band_keys:
+                self._buckets[band_key] = key
+        self._awaiting[id(row)] = key
+        self._pending.add(key)
+        return None
+
+    def remember(self, row, result):
+        """Keep the result generated for representative ``row``."""
+        key = self._awaiting.pop(id(row), None)
+        if key is None:
+            return
+        self._pending.discard(key)
+        self._results[key] = result
+        self._evict()
+
+    def result(self, key):
+        """Result of representative ``key`` for one of its followers."""
+        self._followers[key] -= 1
+        if not self._followers[key]:
+            del self._followers[key]
+        return self._results[key]
+
+    def _usable(self, key):
+        return key is not None and (key in self._results or key in self._pending)
+
+    def _follow(self, key, kind):
+        self._followers[key] = self._followers.get(key, 0) + 1
+        return key, kind
+
+    def _bands_of(self, signature, values):
+        others = _digest(*(values[field] for field in self.other_fields))
+        size = self.rows_per_band
+        return [
+            hash((band, others, signature[band * size:(band + 1) * size].tobytes()))
+            for band in range(self.bands)
+        ]
+
+    def _evict(self):
+        while len(self._results) > self.max_results:
+            for key in self._results:
+                if key not in self._followers:
+                    break
+            else:
+                return
+            del self._results[key]
+            digest = self._digests.pop(key)
+            if self._exact.get(digest) == key:
+                del self._exact[digest]
+            self._signatures.pop(key, None)
+            for band_key in self._band_keys.pop(key, ()):
+                if self._buckets.get(band_key) == key:
+                    del self._buckets[band_key]
@@ -0,0 +1,105 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def run_ordered(func, items, concurrency=1, on_wait=None, limiter=None):
+    """Call ``func`` on every item and yield ``(item, result)`` in input order.
+
+    At most ``concurrency`` calls are in flight at once. Results are yielded on
+    the calling thread, so the caller can write to the database while the
+    worker threads keep the next requests going. Completed results that are
+    waiting on a slower predecessor are buffered, up to a few per worker.
+    ``on_wait`` is called with the seconds from an item being read until its
+    first HTTP request went out (see ``request_started``), which covers
+    waiting for a worker, the circuit breaker, a backend and a pooled
+    connection. Items that send no request are not reported.
+    With a ``limiter`` (see ``hotels.adaptive``) the number of calls in flight
+    follows ``limiter.limit``, capped at ``concurrency``.
+    """
+    call = _timed_queue(func, on_wait)
+
+    if concurrency <= 1:
+        for item in items:
+            yield item, call(item, time.perf_counter())
+        return
+
+    items = iter(items)
+    max_buffered = concurrency * 4
+    pending = {}
+    finished = {}
+    submitted = emitted = 0
+    exhausted = False
+    # The next item is read before a worker is free, so the time it waits
+    # for one is part of its queue wait.
+    upcoming = None
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        while True:
+            limit = _in_flight_limit(concurrency, limiter)
+            while not exhausted and len(finished) < max_buffered:
+                if upcoming is None:
+                    try:
+                        upcoming = (next(items), time.perf_counter())
+                    except StopIteration:
+                        exhausted = True
+                        break
+                if len(pending) >= limit:
+                    break
+                item, ready_at = upcoming
+                upcoming = None
+                pending[pool.submit(call, item, ready_at)] = (submitted, item)
+                submitted += 1
+
+            while emitted in finished:
+                item, future = finished.pop(emitted)
+                emitted += 1
+                yield item, future.result()
+
+            if not pending:
+                if exhausted and not finished:
+                    break
+                continue
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = pending.pop(future)
+                finished[index] = (item, future)
+    finally:
+        # Do not wait for requests still in flight: on Ctrl-C or SIGTERM the
+        # caller flushes what it already has first.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _in_flight_limit(concurrency, limiter):
+    if limiter is None:
+        return concurrency
+    return max(1, min(concurrency, limiter.limit))
+
+
+_waiting = threading.local()
+
+
+def request_started():
+    """Report the queue wait of the item this thread works on, once per item.
+
+    Called by the Ollama client when a request is written to a connection.
+    """
+    waiting = getattr(_waiting, 'item', None)
+    if waiting is not None:
+        _waiting.item = None
+        on_wait, ready_at = waiting
+        on_wait(time.perf_counter() - ready_at)
+
+
+def _timed_queue(func, on_wait):
+    def call(item, ready_at):
+        if on_wait is None:
+            return func(item)
+        _waiting.item = (on_wait, ready_at)
+        try:
+            return func(item)
+        finally:
+            _waiting.item = None
+    return call
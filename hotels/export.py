@@ -0,0 +1,124 @@
+import json
+import os
+from decimal import Decimal
+
+from django.db import models
+
+FORMATS = ('jsonl', 'parquet')
+
+
+def export_fields(model):
+    """Concrete fields of ``model`` in column order; foreign keys are exported as their ids."""
+    return list(model._meta.concrete_fields)
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class JSONLWriter:
+    """Writes one JSON object per line."""
+
+    def __init__(self, path, fields):
+        self.names = [field.attname for field in fields]
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self.file.writelines(
+            json.dumps({name: _json_value(value) for name, value in zip(self.names, row)}, ensure_ascii=False) + '\n'
+            for row in rows
+        )
+
+    def close(self):
+        self.file.close()
+
+
+def arrow_type(field):
+    import pyarrow as pa
+
+    if isinstance(field, models.ForeignKey):
+        field = field.target_field
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField, models.BigIntegerField)):
+        return pa.int64()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    return pa.string()
+
+
+class ParquetWriter:
+    """Writes columnar Parquet, one row group per ``write`` call."""
+
+    def __init__(self, path, fields):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Parquet export requires the pyarrow package (pip install pyarrow).')
+        self.pa = pa
+        self.schema = pa.schema([(field.attname, arrow_type(field)) for field in fields])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        columns = list(zip(*rows)) or [()] * len(self.schema)
+        table = self.pa.Table.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'jsonl': JSONLWriter, 'parquet': ParquetWriter}
+
+
+def export_queryset(queryset, path, format='jsonl', chunk_size=2000, row_group_size=50_000):
+    """Stream ``queryset`` to ``path`` and return ``(rows, last_id, latest generated_at)``.
+
+    Rows are read with ``iterator(chunk_size)``, which uses a server-side
+    cursor on PostgreSQL, and written every ``row_group_size`` rows, so memory
+    use does not depend on the size of the table. The file is written under a
+    temporary name and only renamed to ``path`` once it is complete.
+    """
+    fields = export_fields(queryset.model)
+    names = [field.attname for field in fields]
+    pk_index = names.index(queryset.model._meta.pk.attname)
+    generated_index = names.index('generated_at') if 'generated_at' in names else None
+
+    partial = f"{path}.partial"
+    writer = WRITERS[format](partial, fields)
+    rows = 0
+    last_id = latest = None
+    completed = False
+    try:
+        buffer = []
+        for row in queryset.order_by('pk').values_list(*names).iterator(chunk_size=chunk_size):
+            buffer.append(row)
+            if len(buffer) >= row_group_size:
+                writer.write(buffer)
+                rows += len(buffer)
+                buffer = []
+            last_id = row[pk_index]
+            if generated_index is not None and row[generated_index] is not None:
+                latest = row[generated_index] if latest is None else max(latest, row[generated_index])
+        if buffer or not rows:
+            writer.write(buffer)
+            rows += len(buffer)
+        completed = True
+    finally:
+        writer.close()
+        if not completed:
+            os.remove(partial)
+    os.replace(partial, path)
+    return rows, last_id, latest
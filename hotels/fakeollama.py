@@ -0,0 +1,301 @@
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaServer:
+    """Local stand-in for Ollama's ``/v1/chat/completions`` endpoint.
+
+    Each request waits for a time-to-first-token drawn from the latency
+    distribution (``fixed``, ``uniform`` or ``lognormal`` around
+    ``latency_ms``), plus ``reply_tokens / tokens_per_second`` to generate the
+    reply. ``max_concurrency`` requests are served at once. Up to
+    ``max_queue`` more wait their turn and anything beyond that gets a 503,
+    like Ollama's ``OLLAMA_NUM_PARALLEL`` and ``OLLAMA_MAX_QUEUE``. A fraction
+    ``error_rate`` of requests fail with a 500. Requests with ``"stream": true``
+    get server-sent events one token at a time. A client that disconnects
+    before its reply is sent is counted in ``cancelled``. ``GET /api/tags`` lists the
+    served model, for health checks. Setting ``available`` to False makes
+    every endpoint answer 503, like a server that is going down.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency='lognormal', latency_ms=200.0,
+                 tokens_per_second=0.0, reply_tokens=60, error_rate=0.0,
+                 max_concurrency=0, max_queue=512, seed=None):
+        if latency not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution {latency!r}")
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.random = random.Random(seed)
+        self.available = True
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.requests = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'cancelled': self.cancelled,
+                'rejected': self.rejected,
+                'peak_in_flight': self.peak_in_flight,
+            }
+
+    def sample_latency(self):
+        """Return one time-to-first-token in seconds."""
+        with self._lock:
+            if self.latency == 'fixed':
+                ms = self.latency_ms
+            elif self.latency == 'uniform':
+                ms = self.random.uniform(0, 2 * self.latency_ms)
+            else:
+                ms = self.latency_ms * self.random.lognormvariate(0, 0.5)
+        return ms / 1000
+
+    def reply_for(self, body):
+        """Build a plausible reply for the prompt so command parsers succeed."""
+        prompt = body['messages'][-1]['content']
+        filler = ' '.join(['lorem'] * max(self.reply_tokens - 8, 1))
+        rating = round(self.random.uniform(3, 5), 1)
+        if body.get('response_format'):
+            return json.dumps({'rating': rating, 'review': f"Pleasant stay. {filler}"})
+        ids = re.findall(r'^id: (\S+)$', prompt, flags=re.MULTILINE)
+        if ids:
+            # A batched prompt: one JSON entry per property.
+            if prompt.startswith('Rewrite'):
+                entries = [{'id': key, 'title': 'Renovated Stay', 'description': filler} for key in ids]
+            else:
+                entries = [{'id': key, 'rating': round(self.random.uniform(3, 5), 1)} for key in ids]
+            return json.dumps(entries)
+        if prompt.startswith('Rewrite'):
+            return f"Renovated Stay. Description: {filler}"
+        if 'rating' in prompt.split('\n', 1)[0].lower():
+            return f"Rating: {rating}"
+        return filler
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/api/tags':
+                    self.send_json(404, {'error': 'not found'})
+                elif not server.available:
+                    self.send_json(503, {'error': 'unavailable'})
+                else:
+                    self.send_json(200, {'models': [{'name': 'fake', 'model': 'fake'}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if not server.available:
+                    self.send_json(503, {'error': 'unavailable'})
+                    return
+                if server._slots is None:
+                    self.serve(body)
+                    return
+
+                with server._lock:
+                    if server.waiting >= server.max_queue:
+                        server.rejected += 1
+                        rejected = True
+                    else:
+                        server.waiting += 1
+                        rejected = False
+                if rejected:
+                    self.send_json(503, {'error': 'server busy, please try again. maximum pending requests exceeded'})
+                    return
+
+                with server._slots:
+                    with server._lock:
+                        server.waiting -= 1
+                    self.serve(body)
+
+            def serve(self, body):
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+                    failed = server.random.random() < server.error_rate
+                try:
+                    time.sleep(server.sample_latency())
+                    if failed:
+                        with server._lock:
+                            server.errors += 1
+                        self.send_json(500, {'error': 'simulated failure'})
+                        return
+
+                    content = server.reply_for(body)
+                    completion_tokens = len(content.split())
+                    prompt_tokens = sum(len(m['content'].split()) for m in body.get('messages', []))
+                    usage = {
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': completion_tokens,
+                        'total_tokens': prompt_tokens + completion_tokens,
+                    }
+                    if body.get('stream'):
+                        self.send_stream(body, content, usage)
+                        return
+
+                    if server.tokens_per_second:
+                        time.sleep(completion_tokens / server.tokens_per_second)
+                    self.send_json(200, {
+                        'id': 'chatcmpl-fake',
+                        'object': 'chat.completion',
+                        'model': body.get('model'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': content},
+                            'finish_reason': 'stop',
+                        }],
+                        'usage': usage,
+                    })
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def send_stream(self, body, content, usage):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                delay = 1 / server.tokens_per_second if server.tokens_per_second else 0
+                words = content.split(' ')
+                try:
+                    for index, word in enumerate(words):
+                        text = word if index == len(words) - 1 else word + ' '
+                        self.send_event({'choices': [{'index': 0, 'delta': {'content': text}}]})
+                        if delay:
+                            time.sleep(delay)
+                    if (body.get('stream_options') or {}).get('include_usage'):
+                        self.send_event({'choices': [], 'usage': usage})
+                    self.send_chunk(b'data: [DONE]\n\n')
+                    self.send_chunk(b'')
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.cancelled += 1
+                    self.close_connection = True
+
+            def send_event(self, payload):
+                self.send_chunk(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+
+            def send_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def send_json(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.cancelled += 1
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeOllamaProcess:
+    """Runs a ``FakeOllamaServer`` in a child process, so benchmarks do not measure the server too.
+
+    Takes the same keyword arguments as ``FakeOllamaServer``. ``url`` and
+    ``stats()`` work as on the server itself.
+    """
+
+    def __init__(self, **server_options):
+        self.server_options = server_options
+        self.url = None
+        self._connection = None
+        self._process = None
+
+    def start(self):
+        # spawn, not fork: the parent may already run threads and hold database connections.
+        context = multiprocessing.get_context('spawn')
+        self._connection, child = context.Pipe()
+        self._process = context.Process(
+            target=_serve_in_child, args=(child, self.server_options), name='fake-ollama', daemon=True
+        )
+        self._process.start()
+        child.close()
+        self.url = self._connection.recv()
+        return self
+
+    def stats(self):
+        self._connection.send('stats')
+        return self._connection.recv()
+
+    def stop(self):
+        self._connection.send('stop')
+        self._process.join()
+        self._connection.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _serve_in_child(connection, server_options):
+    server = FakeOllamaServer(**server_options).start()
+    connection.send(server.url)
+    try:
+        while connection.recv() == 'stats':
+            connection.send(server.stats())
+    except EOFError:
+        pass
+    finally:
+        server.stop()
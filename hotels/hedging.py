@@ -0,0 +1,179 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from hotels.adaptive import prompt_template
+from hotels.llm import RequestAbort
+
+
+class HedgedClient:
+    """Sends a second copy of slow requests and keeps whichever reply comes first.
+
+    Once ``min_samples`` requests have completed, a request still running
+    after the ``percentile`` of the last ``window`` latencies of its prompt
+    template gets a duplicate: a short rating is not slow next to a long
+    review, and must not wait as long as one before it is hedged. Through a ``BalancedClient`` the duplicate usually lands on
+    another backend, which is then the least loaded. The first request runs
+    on the calling thread as usual; a thread is only started for the
+    duplicate, once the delay has passed. The first successful reply wins
+    and the other request is aborted: its connection is shut down, which
+    stops Ollama from generating. At most ``max_rate`` of all requests are
+    hedged, so an overloaded server is not sent twice the work.
+
+    Requests with ``on_token`` are never hedged, since their text is already
+    being passed on as it arrives.
+    """
+
+    def __init__(self, client, percentile=0.95, min_samples=20, window=200, max_rate=0.1):
+        self.client = client
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.window = window
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._timers = Timers()
+
+    def chat(self, prompt, **options):
+        return self.complete(prompt, **options).content
+
+    def threshold(self, template=None):
+        """Seconds after which a ``template`` request is hedged, or None until enough latencies are known."""
+        with self._lock:
+            latencies = self._latencies.get(template, ())
+            if len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        return ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
+
+    def complete(self, prompt, **options):
+        with self._lock:
+            self.requests += 1
+        template = prompt_template(prompt)
+        threshold = self.threshold(template)
+        started = time.perf_counter()
+        if threshold is None or options.get('on_token') is not None:
+            completion = self.client.complete(prompt, **options)
+            self._record(template, time.perf_counter() - started)
+            return completion
+
+        primary = RequestAbort()
+        hedge = Hedge(self, prompt, options, primary)
+        self._timers.call_later(threshold, hedge.start)
+        try:
+            with primary.active():
+                completion = self.client.complete(prompt, **options)
+        except BaseException as e:
+            if not hedge.stop():
+                raise
+            # The primary failed, or was aborted because the duplicate won.
+            try:
+                completion, seconds = hedge.result.result()
+            except BaseException:
+                raise e
+            with self._lock:
+                self.hedge_wins += 1
+            self._record(template, seconds)
+            return completion
+
+        if hedge.stop():
+            hedge.abort.abort()
+        self._record(template, time.perf_counter() - started)
+        return completion
+
+    def _may_hedge(self):
+        with self._lock:
+            if self.hedged + 1 > self.max_rate * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def _record(self, template, seconds):
+        with self._lock:
+            latencies = self._latencies.get(template)
+            if latencies is None:
+                latencies = self._latencies[template] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def hedge_stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'hedged': self.hedged, 'hedge_wins': self.hedge_wins}
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+class Hedge:
+    """The duplicate of one request, started by ``HedgedClient`` once the request is slow."""
+
+    def __init__(self, hedger, prompt, options, primary):
+        self.hedger = hedger
+        self.prompt = prompt
+        self.options = options
+        self.primary = primary
+        self.abort = RequestAbort()
+        self.result = Future()
+        self.state = 'waiting'
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.state != 'waiting':
+                return
+            if not self.hedger._may_hedge():
+                self.state = 'skipped'
+                return
+            self.state = 'running'
+        # A daemon thread rather than a pool: an aborted copy on a stalled
+        # server must not hold up new requests.
+        threading.Thread(target=self._run, name='ollama-hedge', daemon=True).start()
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            with self.abort.active():
+                completion = self.hedger.client.complete(self.prompt, **self.options)
+        except BaseException as e:
+            self.result.set_exception(e)
+            return
+        self.result.set_result((completion, time.perf_counter() - started))
+        self.primary.abort()
+
+    def stop(self):
+        """Called once the primary request is over; return True if the duplicate was started."""
+        with self._lock:
+            if self.state == 'waiting':
+                self.state = 'skipped'
+            return self.state == 'running'
+
+
+class Timers:
+    """Runs callbacks after a delay on one shared thread, started on first use."""
+
+    def __init__(self):
+        self._queue = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay, callback):
+        with self._condition:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._order), callback))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ollama-hedge-timer', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    self._condition.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+                _, _, callback = heapq.heappop(self._queue)
+            callback()
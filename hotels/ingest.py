@@ -0,0 +1,302 @@
+import csv
+import gzip
+import io
+import re
+import time
+from collections import Counter
+from collections.abc import Mapping
+
+import numpy as np
+
+
+ZSTD_SUFFIXES = ('.zst', '.zstd')
+
+
+def check_input(path):
+    """Raise ImportError early if ``path`` needs a codec that is not installed."""
+    if str(path).endswith(ZSTD_SUFFIXES):
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ImportError('Reading .zst input requires the zstandard package (pip install zstandard).')
+
+
+def open_input(path, errors='strict'):
+    """Open a property CSV for reading as text, decompressing .gz and .zst files.
+
+    ``errors`` is the codec error handler; with ``'replace'`` invalid UTF-8
+    becomes U+FFFD instead of stopping the read.
+    """
+    path = str(path)
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8', errors=errors)
+    if path.endswith(ZSTD_SUFFIXES):
+        check_input(path)
+        import zstandard
+        raw = open(path, 'rb')
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8', errors=errors, newline='')
+    return open(path, 'r', newline='', encoding='utf-8', errors=errors)
+
+
+def has_fields(row, fields):
+    """Return True if every one of ``fields`` is present and non-empty in ``row``."""
+    return all(row.get(field) not in (None, '') for field in fields)
+
+
+def has_integer_id(row):
+    """Return True if the row's ``id`` is empty or an integer; any other id cannot be keyed on."""
+    value = row.get('id')
+    if value is None or str(value).strip() == '':
+        return True
+    try:
+        int(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class CSVStream:
+    """Reads a property CSV lazily and yields validated rows in bounded batches.
+
+    Only one batch is held in memory at a time, so memory use does not depend
+    on the size of the file. Rows missing any of ``required_fields``, or
+    whose ``id`` is not an integer, are counted in ``rejected`` and dropped. Throughput is measured over the time
+    spent reading and parsing only, not the time the consumer spends on each
+    batch.
+    """
+
+    def __init__(self, path, batch_size=1000, required_fields=()):
+        self.path = path
+        self.batch_size = batch_size
+        self.required_fields = required_fields
+        self.rows = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def _count_bytes(self, lines):
+        for line in lines:
+            self.bytes += len(line.encode('utf-8'))
+            yield line
+
+    def is_valid(self, row):
+        return has_fields(row, self.required_fields) and has_integer_id(row)
+
+    def batches(self):
+        started = time.perf_counter()
+        with open_input(self.path) as file:
+            reader = csv.DictReader(self._count_bytes(file))
+            batch = []
+            for row in reader:
+                if not self.is_valid(row):
+                    self.rejected += 1
+                    continue
+                self.rows += 1
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self.seconds += time.perf_counter() - started
+                    yield batch
+                    started = time.perf_counter()
+                    batch = []
+            self.seconds += time.perf_counter() - started
+            if batch:
+                yield batch
+
+    def __iter__(self):
+        for batch in self.batches():
+            yield from batch
+
+    def stats(self):
+        return {
+            'rows': self.rows,
+            'rejected': self.rejected,
+            'bytes': self.bytes,
+            'seconds': self.seconds,
+            'rows_per_second': self.rows / self.seconds if self.seconds else 0.0,
+            'bytes_per_second': self.bytes / self.seconds if self.seconds else 0.0,
+        }
+
+
+PROPERTY_COLUMNS = ('id', 'title', 'rating', 'location', 'latitude', 'longitude', 'room_type', 'price', 'description')
+
+# Allowed range of each numeric column; an empty value is allowed, anything
+# else that does not parse or falls outside the range rejects the row.
+NUMERIC_RANGES = {
+    'id': (0, 2 ** 31 - 1),
+    'rating': (0, 5),
+    'latitude': (-90, 90),
+    'longitude': (-180, 180),
+    'price': (0, 1e9),
+}
+# Shown in prompts, so whole numbers stay "150" rather than "150.0".
+WHOLE_NUMBER_COLUMNS = ('id', 'rating', 'price')
+TEXT_COLUMNS = tuple(column for column in PROPERTY_COLUMNS if column not in NUMERIC_RANGES)
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+# pandas parses this many rows at a time; smaller --chunk-size batches are
+# cut from the parsed rows, since every pandas call has a fixed overhead.
+PARSE_CHUNK_ROWS = 20_000
+
+
+class PropertyRecord(Mapping):
+    """One validated input row, with numbers parsed.
+
+    Holds the property CSV columns in slots, which takes a fraction of the
+    memory of a ``csv.DictReader`` dict, and reads like that dict, so the
+    commands need not care which reader produced it. Other columns are
+    dropped.
+    """
+    __slots__ = PROPERTY_COLUMNS
+
+    def __init__(self, id=None, title='', rating=None, location='', latitude=None, longitude=None,
+                 room_type='', price=None, description=''):
+        self.id = id
+        self.title = title
+        self.rating = rating
+        self.location = location
+        self.latitude = latitude
+        self.longitude = longitude
+        self.room_type = room_type
+        self.price = price
+        self.description = description
+
+    def __getitem__(self, key):
+        if key not in PROPERTY_COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(PROPERTY_COLUMNS)
+
+    def __len__(self):
+        return len(PROPERTY_COLUMNS)
+
+    def __repr__(self):
+        return f"PropertyRecord({dict(self)!r})"
+
+
+def parse_numbers(column):
+    """Parse a column of numeric text into ``(float array, mask of non-empty values)``; bad values become NaN."""
+    import pandas as pd
+
+    text = column.to_numpy()
+    present = text != ''
+    try:
+        # The C conversion is several times faster than to_numeric; it only
+        # fails when the chunk holds something that is not a number.
+        return np.where(present, text, 'nan').astype(float), present
+    except ValueError:
+        text = column.str.strip()
+        return pd.to_numeric(text, errors='coerce').to_numpy(dtype=float), (text != '').to_numpy()
+
+
+def python_numbers(values, whole):
+    """A float array as a list of Python numbers, NaN as None and, if ``whole``, whole numbers as ints."""
+    missing = np.isnan(values)
+    result = values.astype(object)
+    if whole:
+        integral = ~missing & (values % 1 == 0)
+        result[integral] = values[integral].astype(np.int64).astype(object)
+    result[missing] = None
+    return result.tolist()
+
+
+class _CleaningReader:
+    """File-like wrapper for pandas that counts the bytes read and drops control characters.
+
+    Cleaning whole blocks of text is much faster than cleaning every field.
+    ``replaced`` records whether any invalid UTF-8 was seen, so the per-row
+    check for it only runs on files that need it.
+    """
+
+    def __init__(self, file, stream):
+        self.file = file
+        self.stream = stream
+        self.replaced = False
+
+    def read(self, size=-1):
+        text = self.file.read(size)
+        self.stream.bytes += len(text.encode('utf-8', 'surrogatepass'))
+        self.replaced = self.replaced or '\ufffd' in text
+        return CONTROL_CHARACTERS.sub('', text)
+
+    def __iter__(self):
+        return iter(self.read, '')
+
+
+class ColumnarStream(CSVStream):
+    """Reads the property CSV in pandas chunks and validates each chunk column by column.
+
+    Control characters are removed and text is stripped of surrounding
+    whitespace. A row is rejected when a required field is empty, when a text field contains
+    bytes that are not valid UTF-8, or when a numeric column (see
+    ``NUMERIC_RANGES``) does not parse or is out of range. ``rejected_reasons``
+    counts rejections by their first reason. Valid rows are handed on as
+    ``PropertyRecord`` objects.
+    """
+
+    def __init__(self, path, batch_size=1000, required_fields=()):
+        super().__init__(path, batch_size, required_fields)
+        self.rejected_reasons = Counter()
+
+    def batches(self):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError('Columnar input requires the pandas package (pip install pandas).')
+
+        started = time.perf_counter()
+        with open_input(self.path, errors='replace') as file:
+            reader = _CleaningReader(file, self)
+            chunks = pd.read_csv(
+                reader, dtype=str, keep_default_na=False, chunksize=max(self.batch_size, PARSE_CHUNK_ROWS),
+            )
+            for chunk in chunks:
+                records = self.validate(chunk, check_encoding=reader.replaced)
+                for start in range(0, len(records), self.batch_size):
+                    self.seconds += time.perf_counter() - started
+                    yield records[start:start + self.batch_size]
+                    started = time.perf_counter()
+        self.seconds += time.perf_counter() - started
+
+    def validate(self, frame, check_encoding=True):
+        """Return the valid rows of ``frame`` as records, counting the rest in ``rejected``."""
+        frame = frame.reindex(columns=PROPERTY_COLUMNS, fill_value='')
+        for column in TEXT_COLUMNS:
+            frame[column] = frame[column].str.strip()
+
+        checks = [(f'empty {field}', frame[field].to_numpy() == '') for field in self.required_fields]
+        if check_encoding:
+            checks.append(('invalid UTF-8', np.logical_or.reduce([
+                frame[column].str.contains('\ufffd', regex=False).to_numpy() for column in TEXT_COLUMNS
+            ])))
+        numbers = {}
+        for column, (low, high) in NUMERIC_RANGES.items():
+            values, present = parse_numbers(frame[column])
+            bad = present & ~((values >= low) & (values <= high))
+            if column == 'id':
+                bad |= present & (values % 1 != 0)
+            checks.append((f'invalid {column}', bad))
+            numbers[column] = values
+
+        rejected = np.zeros(len(frame), dtype=bool)
+        for reason, bad in checks:
+            new = bad & ~rejected
+            count = int(new.sum())
+            if count:
+                self.rejected_reasons[reason] += count
+                rejected |= new
+        valid = ~rejected
+        self.rows += int(valid.sum())
+        self.rejected += int(rejected.sum())
+
+        columns = []
+        for column in PROPERTY_COLUMNS:
+            if column in numbers:
+                columns.append(python_numbers(numbers[column][valid], column in WHOLE_NUMBER_COLUMNS))
+            else:
+                columns.append(frame[column].to_numpy()[valid].tolist())
+        return [PropertyRecord(*values) for values in zip(*columns)]
+
+    def stats(self):
+        return {**super().stats(), 'rejected_reasons': dict(self.rejected_reasons.most_common())}
@@ -0,0 +1,446 @@
+import json
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from hotels import profiling
+from hotels.engine import request_started
+
+
+# Statuses that mean "try again later" rather than "this request is wrong".
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class OllamaError(Exception):
+    """Raised when Ollama returns an error status or an unusable response.
+
+    ``status_code`` is None when no response arrived at all (connection
+    refused, reset or timed out).
+    """
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self):
+        """True for failures that say nothing about the request itself: outages and overload."""
+        return self.status_code is None or self.status_code in RETRY_STATUSES
+
+
+class OllamaTimeout(OllamaError):
+    """Raised when Ollama did not answer within the client's timeout."""
+
+
+class OllamaAborted(OllamaError):
+    """Raised when another thread aborted the request through its ``RequestAbort``."""
+
+    @property
+    def retryable(self):
+        return False
+
+
+# Guards the link between a RequestAbort and the connection its request is on,
+# so an abort never reaches a connection that has moved on to another request.
+_abort_lock = threading.Lock()
+_current_abort = threading.local()
+
+
+class RequestAbort:
+    """Lets another thread abort the request running on this one, e.g. the slower copy of a hedged request.
+
+    Requests sent inside ``active()`` register their connection here.
+    ``abort`` shuts that connection down, so a read blocked on a stalled
+    server fails at once, and the client raises ``OllamaAborted`` instead of
+    retrying.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self._connection = None
+
+    @staticmethod
+    def current():
+        """The handle of the request running on this thread, if any."""
+        return getattr(_current_abort, 'handle', None)
+
+    @contextmanager
+    def active(self):
+        _current_abort.handle = self
+        try:
+            yield self
+        finally:
+            _current_abort.handle = None
+
+    def abort(self):
+        with _abort_lock:
+            self.aborted = True
+            connection = self._connection
+            if connection is None or connection.abort_handle is not self or connection.sock is None:
+                return
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _attach_abort(connection):
+    handle = RequestAbort.current()
+    with _abort_lock:
+        connection.abort_handle = handle
+        if handle is not None:
+            handle._connection = connection
+            if handle.aborted:
+                raise OllamaAborted('Request aborted')
+
+
+def _raise_if_aborted():
+    handle = RequestAbort.current()
+    if handle is not None and handle.aborted:
+        raise OllamaAborted('Request aborted')
+
+
+_retry_listener = threading.local()
+
+
+@contextmanager
+def on_retry(callback):
+    """Call ``callback(error)`` for every error a client on this thread retries.
+
+    Retried errors never reach the caller, so this is how a wrapper sees
+    a 429 or timeout the client recovered from by itself.
+    """
+    previous = getattr(_retry_listener, 'callback', None)
+    _retry_listener.callback = callback
+    try:
+        yield
+    finally:
+        _retry_listener.callback = previous
+
+
+def retrying(error):
+    """Tell the listener installed by ``on_retry`` that ``error`` is about to be retried."""
+    callback = getattr(_retry_listener, 'callback', None)
+    if callback is not None:
+        callback(error)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+    Retry ``n`` (counting from 0) waits a random time between 0 and
+    ``backoff * 2 ** n`` seconds, capped at ``max_backoff``. A ``Retry-After``
+    header sent by the server is honoured up to the same cap.
+    """
+
+    def __init__(self, max_retries=None, backoff=None, max_backoff=None):
+        self.max_retries = settings.OLLAMA_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.OLLAMA_RETRY_BACKOFF if backoff is None else backoff
+        self.max_backoff = settings.OLLAMA_RETRY_MAX_BACKOFF if max_backoff is None else max_backoff
+
+    def delay(self, retry, retry_after=None):
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** retry))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class Completion:
+    """Reply text of one chat request plus what it cost."""
+
+    def __init__(self, content, status_code=200, ttfb=0.0, seconds=0.0, usage=None, retries=0,
+                 stopped_early=False):
+        usage = usage or {}
+        self.content = content
+        self.status_code = status_code
+        self.ttfb = ttfb
+        self.seconds = seconds
+        self.prompt_tokens = usage.get('prompt_tokens')
+        self.completion_tokens = usage.get('completion_tokens')
+        self.retries = retries
+        self.stopped_early = stopped_early
+
+
+class ConnectionStats:
+    """Counts how often pooled connections are reused for another request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.requests = 0
+        self.reused_requests = 0
+        self.max_requests_per_connection = 0
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def request_sent(self, requests_on_connection):
+        with self._lock:
+            self.requests += 1
+            if requests_on_connection > 1:
+                self.reused_requests += 1
+            self.max_requests_per_connection = max(self.max_requests_per_connection, requests_on_connection)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'connections_opened': self.connections_opened,
+                'requests': self.requests,
+                'reused_requests': self.reused_requests,
+                'requests_per_connection': self.requests / self.connections_opened if self.connections_opened else 0.0,
+                'max_requests_per_connection': self.max_requests_per_connection,
+            }
+
+
+def _tracked_pool_classes(stats):
+    """Build urllib3 pool classes whose connections report to ``stats``."""
+
+    class TrackedMixin:
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.requests_on_connection = 0
+            self.abort_handle = None
+
+        def connect(self):
+            super().connect()
+            self.requests_on_connection = 0
+            stats.connection_opened()
+
+        def request(self, *args, **kwargs):
+            _attach_abort(self)
+            request_started()
+            super().request(*args, **kwargs)
+            self.requests_on_connection += 1
+            stats.request_sent(self.requests_on_connection)
+
+    class TrackedHTTPConnection(TrackedMixin, HTTPConnection):
+        pass
+
+    class TrackedHTTPSConnection(TrackedMixin, HTTPSConnection):
+        pass
+
+    class TrackedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TrackedHTTPConnection
+
+    class TrackedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TrackedHTTPSConnection
+
+    return {'http': TrackedHTTPConnectionPool, 'https': TrackedHTTPSConnectionPool}
+
+
+class OllamaClient:
+    """Chat-completion client backed by one keep-alive connection pool.
+
+    The client is safe to share between the worker threads of a command; the
+    pool holds at most ``pool_size`` connections and callers beyond that wait
+    for a free one instead of opening throwaway connections.
+    """
+    chat_path = '/v1/chat/completions'
+    tags_path = '/api/tags'
+    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, base_url=None, model=None, pool_size=None, connect_timeout=None, read_timeout=None,
+                 retry=None):
+        self.base_url = (base_url or settings.OLLAMA_URL).rstrip('/')
+        self.model = model or settings.OLLAMA_MODEL
+        self.pool_size = pool_size or settings.OLLAMA_POOL_SIZE
+        self.timeout = (
+            connect_timeout or settings.OLLAMA_CONNECT_TIMEOUT,
+            read_timeout or settings.OLLAMA_READ_TIMEOUT,
+        )
+        self.retry = retry or RetryPolicy()
+        self.connection_stats = ConnectionStats()
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+        adapter.poolmanager.pool_classes_by_scheme = _tracked_pool_classes(self.connection_stats)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def chat(self, prompt, **options):
+        """Send ``prompt`` as a single user message and return the reply text."""
+        return self.complete(prompt, **options).content
+
+    def complete(self, prompt, stream=False, stop_when=None, on_token=None, **options):
+        """Like ``chat``, but return a ``Completion`` with timings and token usage.
+
+        With ``stream=True`` the reply is read token by token. If ``stop_when``
+        is given, it is called with the text so far after every chunk. Once it
+        returns True the connection is closed, which makes Ollama stop
+        generating, and the partial text is returned. ``on_token`` is called
+        with each piece of text as it arrives.
+
+        Connection errors, timeouts and 429/5xx responses are retried
+        according to ``self.retry``; the last error is raised once retries run
+        out, or as soon as any text has been passed to ``on_token``.
+        """
+        data = {
+            'model': self.model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            **options,
+        }
+        if stream:
+            data['stream'] = True
+            data['stream_options'] = {'include_usage': True}
+        started = time.perf_counter()
+        retries = 0
+        emitted = False
+
+        def forward(text):
+            nonlocal emitted
+            emitted = True
+            on_token(text)
+
+        while True:
+            try:
+                completion = self._send(data, stream, stop_when, forward if on_token is not None else None)
+            except OllamaError as e:
+                # Text already passed to on_token cannot be taken back, so never start over after it.
+                if not e.retryable or retries >= self.retry.max_retries or emitted:
+                    raise
+                retrying(e)
+                time.sleep(self.retry.delay(retries, e.retry_after))
+                retries += 1
+                continue
+            completion.retries = retries
+            completion.seconds = time.perf_counter() - started
+            return completion
+
+    def _send(self, data, stream, stop_when, on_token=None):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.base_url + self.chat_path, headers=self.headers, json=data, timeout=self.timeout, stream=stream
+            )
+        except requests.Timeout as e:
+            raise OllamaTimeout(f"Timed out: {e}")
+        except requests.RequestException as e:
+            _raise_if_aborted()
+            raise OllamaError(f"Request failed: {e}")
+        if response.status_code != 200:
+            raise OllamaError(
+                f"{response.status_code} - {response.text}",
+                status_code=response.status_code, retry_after=_retry_after(response),
+            )
+
+        if stream:
+            return self._read_stream(response, started, stop_when, on_token)
+
+        try:
+            with profiling.phase('decode_json'):
+                body = response.json()
+            content = body['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise OllamaError(f"Malformed response: {e!r}", status_code=response.status_code)
+
+        elapsed = getattr(response, 'elapsed', None)
+        usage = body.get('usage')
+        return Completion(
+            content,
+            status_code=response.status_code,
+            ttfb=elapsed.total_seconds() if isinstance(elapsed, timedelta) else 0.0,
+            seconds=time.perf_counter() - started,
+            usage=usage if isinstance(usage, dict) else None,
+        )
+
+    def _read_stream(self, response, started, stop_when, on_token=None):
+        parts = []
+        usage = None
+        ttfb = None
+        stopped_early = False
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    # Keep reading to the end of the body so the connection can be reused.
+                    continue
+                try:
+                    with profiling.phase('decode_json'):
+                        chunk = json.loads(payload)
+                except ValueError as e:
+                    raise OllamaError(f"Malformed stream chunk: {e!r}", status_code=response.status_code)
+
+                if chunk.get('usage'):
+                    usage = chunk['usage']
+                for choice in chunk.get('choices') or []:
+                    text = (choice.get('delta') or {}).get('content')
+                    if text:
+                        if ttfb is None:
+                            ttfb = time.perf_counter() - started
+                        parts.append(text)
+                        if on_token is not None:
+                            on_token(text)
+                if stop_when is not None and parts and stop_when(''.join(parts)):
+                    stopped_early = True
+                    break
+        except requests.Timeout as e:
+            raise OllamaTimeout(f"Timed out while streaming: {e}")
+        except requests.RequestException as e:
+            _raise_if_aborted()
+            raise OllamaError(f"Stream interrupted: {e}")
+        finally:
+            response.close()
+
+        return Completion(
+            ''.join(parts),
+            status_code=response.status_code,
+            ttfb=ttfb or 0.0,
+            seconds=time.perf_counter() - started,
+            usage=usage,
+            stopped_early=stopped_early,
+        )
+
+    def ping(self, timeout=2.0):
+        """Return True if Ollama answers its model list within ``timeout`` seconds."""
+        try:
+            response = self.session.get(self.base_url + self.tags_path, timeout=timeout)
+        except requests.RequestException:
+            return False
+        return response.status_code == 200
+
+    def stats(self):
+        return self.connection_stats.as_dict()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client, creating it from settings on first use.
+
+    With ``OLLAMA_BACKENDS`` set this is a ``BalancedClient`` over all of them,
+    otherwise a single ``OllamaClient`` for ``OLLAMA_URL``.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if settings.OLLAMA_BACKENDS:
+                from hotels.balancer import BalancedClient, parse_backends
+                _client = BalancedClient(parse_backends(settings.OLLAMA_BACKENDS)).start()
+            else:
+                _client = OllamaClient()
+        return _client
@@ -0,0 +1,733 @@
+import hashlib
+import signal
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from hotels.adaptive import AdaptiveClient, AIMDLimiter
+from hotels.apicache import invalidate_model
+from hotels.breaker import BreakerClient, CircuitBreaker
+from hotels.cache import CachedClient, ResponseCache, cache_if_accepted
+from hotels.claims import WorkClaimer, parse_shard, shard_of
+from hotels.dedupe import DuplicateIndex
+from hotels.engine import run_ordered
+from hotels.hedging import HedgedClient
+from hotels.ingest import ColumnarStream, CSVStream, check_input
+from hotels.llm import OllamaError, get_client
+from hotels.metrics import InstrumentedClient, MetricsRegistry
+from hotels.models import FailedGeneration
+from hotels.profiling import PROFILERS, PhasedClient, RunProfile, phase, timed_iter
+from hotels.writer import BufferedWriter
+
+
+class GenerationCommand(BaseCommand):
+    """Base class for the commands that turn CSV rows into generated content.
+
+    Subclasses implement ``generate`` (runs on a worker thread and should only
+    talk to Ollama) and ``save`` (runs on the main thread and does the ORM
+    work, queueing instances on ``self.writer``), and set ``model``,
+    ``task_name`` and ``success_message``. ``generate`` raises OllamaError or
+    ValueError when it cannot produce a result; the row is then stored in
+    ``FailedGeneration`` for ``--replay-failed`` instead of being saved with a
+    made-up value. Commands with short replies can
+    also set ``batchable`` and implement ``request_batch`` to pack several
+    properties into one prompt with ``--prompt-batch``. ``dedupe_fields``
+    are the row fields that decide the generated content, for ``--dedupe``
+    and for the ``source_fingerprint`` that ``--changed-only`` compares.
+    """
+    model = None
+    task_name = None
+    required_fields = ('title', 'description')
+    success_message = 'Done.'
+    stream = False
+    batchable = False
+    prompt_batch = 1
+    dedupe_fields = ('title', 'description')
+    requests_per_row = 1
+    _client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input', default='hotel_datas.csv',
+            help='Property CSV to read; .gz and .zst files are decompressed on the fly (default: hotel_datas.csv).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of CSV rows parsed and validated per batch (default: 1000).',
+        )
+        parser.add_argument(
+            '--columnar', action='store_true',
+            help='Read the input in pandas chunks, parse numbers and reject rows with empty fields, out-of-range '
+                 'numbers or invalid UTF-8 before any of them reaches Ollama.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Maximum number of Ollama requests in flight at once (default: 1).',
+        )
+        parser.add_argument(
+            '--adaptive', action='store_true',
+            help='Adjust the number of requests in flight to Ollama latency and overload, up to --concurrency.',
+        )
+        parser.add_argument(
+            '--target-latency', type=float, default=None,
+            help='With --adaptive, back off when requests take longer than this many seconds '
+                 '(default: twice the fastest latency seen).',
+        )
+        parser.add_argument(
+            '--hedge', type=float, default=None, metavar='PERCENTILE',
+            help='Send a second copy of any request that runs longer than this percentile of recent '
+                 'latencies, e.g. 95, and keep the first reply (default: off).',
+        )
+        parser.add_argument(
+            '--stream', action='store_true',
+            help='Stream replies, cap their length and stop generating once the answer is complete.',
+        )
+        if self.batchable:
+            parser.add_argument(
+                '--prompt-batch', type=int, default=1,
+                help='Ask for this many properties in one prompt and JSON reply (default: 1, no batching).',
+            )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of generated rows written per transaction (default: 100).',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Skip properties that already have a generated row.',
+        )
+        parser.add_argument(
+            '--changed-only', action='store_true',
+            help='Only generate properties that are new or whose prompt fields changed since their row was '
+                 'generated, and mark rows of properties no longer in the input as stale.',
+        )
+        parser.add_argument(
+            '--dedupe', choices=('exact', 'near'), default=None,
+            help='Generate once per group of duplicate rows and copy the result to the others: '
+                 '"exact" matches normalized text, "near" also matches similar text (MinHash/LSH).',
+        )
+        parser.add_argument(
+            '--dedupe-threshold', type=float, default=0.85,
+            help='Estimated Jaccard similarity above which --dedupe near treats rows as duplicates (default: 0.85).',
+        )
+        parser.add_argument(
+            '--replay-failed', action='store_true',
+            help='Instead of reading the input, retry the rows earlier runs failed to generate.',
+        )
+        parser.add_argument(
+            '--shard', default=None,
+            help='Only process properties whose id modulo N equals i, given as i/N.',
+        )
+        parser.add_argument(
+            '--claim', action='store_true',
+            help='Coordinate with other workers through the WorkClaim table instead of a fixed shard.',
+        )
+        parser.add_argument(
+            '--run-id', default=None,
+            help='With --claim, a name shared by every worker of this run, e.g. the date of the input export. '
+                 'Properties finished under another run id are generated again.',
+        )
+        parser.add_argument(
+            '--lease-seconds', type=int, default=600,
+            help='How long a claimed property stays reserved without progress (default: 600).',
+        )
+        parser.add_argument(
+            '--worker-id', default=None,
+            help='Name recorded on claimed properties (default: hostname:pid).',
+        )
+        parser.add_argument(
+            '--metrics-dir', default=None,
+            help='Write metrics.prom (Prometheus text format) and metrics.json here at the end of the run.',
+        )
+        parser.add_argument(
+            '--profile', default=None, metavar='PATH',
+            help='Write the wall and CPU time spent in each phase of the run (reading the input, generating, '
+                 'Ollama requests, JSON decoding, reply parsing, database writes) to PATH.',
+        )
+        parser.add_argument(
+            '--profiler', choices=PROFILERS, default=None,
+            help='With --profile, also run cProfile (written to PATH.prof) or a sampling profiler '
+                 '(PATH.folded, for flame graphs) over the whole run.',
+        )
+        parser.add_argument(
+            '--cache', dest='cache_path', default=settings.OLLAMA_CACHE_PATH,
+            help='SQLite file used to cache Ollama replies (default: OLLAMA_CACHE_PATH, unset disables it).',
+        )
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Do not read or write the response cache.',
+        )
+        parser.add_argument(
+            '--refresh', action='store_true',
+            help='Ignore cached replies but store the new ones.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            check_input(options['input'])
+        except ImportError as e:
+            raise CommandError(e)
+        if options['profiler'] and not options['profile']:
+            raise CommandError('--profiler needs --profile PATH for its report.')
+
+        self.metrics = MetricsRegistry()
+        self.hedger = None
+        if options['hedge'] is not None:
+            if not 0 < options['hedge'] < 100:
+                raise CommandError('--hedge must be a percentile between 0 and 100.')
+            self.hedger = HedgedClient(self.client, percentile=options['hedge'] / 100)
+            self._client = self.hedger
+        self._client = InstrumentedClient(self.client, self.metrics)
+        self.limiter = None
+        if options['adaptive']:
+            self.limiter = AIMDLimiter(options['concurrency'], target_latency=options['target_latency'])
+            self._client = AdaptiveClient(self.client, self.limiter)
+        self.breaker = CircuitBreaker()
+        self._client = BreakerClient(self.client, self.breaker)
+        cache = self.open_cache(options)
+        self.profile = None
+        if options['profile']:
+            self.profile = RunProfile(options['profile'], options['profiler'])
+            self._client = PhasedClient(self.client)
+        self.setup(options)
+        reader = ColumnarStream if options['columnar'] else CSVStream
+        self.reader = reader(options['input'], options['chunk_size'], self.required_fields)
+        try:
+            writer = BufferedWriter(options['batch_size'], on_flush=self.flushed, metrics=self.metrics)
+            queue_wait = self.metrics.histogram(
+                'queue_wait_seconds',
+                'Time from a row being read until its first Ollama request went out.',
+            )
+            with self.profile or nullcontext(), interrupt_on_sigterm(), writer as self.writer:
+                work = run_ordered(
+                    self.process, self.work_items(), options['concurrency'],
+                    on_wait=queue_wait.observe, limiter=self.limiter,
+                )
+                for item, result in work:
+                    self.store(item, result)
+            # Only a complete pass over the input shows which properties are gone.
+            if options['changed_only'] and not self.replay_failed:
+                self.mark_stale()
+        finally:
+            self.teardown()
+            if cache is not None:
+                stats = cache.stats()
+                self.metrics.counter('cache_hits_total', 'Replies served from the response cache.').inc(stats['hits'])
+                self.metrics.counter('cache_misses_total', 'Prompts not found in the response cache.').inc(stats['misses'])
+                self.stdout.write(f"Cache: {stats['hits']} hits, {stats['misses']} misses")
+                cache.close()
+            self.report(options)
+
+        self.stdout.write(self.style.SUCCESS(self.success_message))
+
+    def setup(self, options):
+        """Prepare for a run; subclasses extend this to read their own options."""
+        self.skipped = 0
+        self.failed = 0
+        self.replay_failed = options['replay_failed']
+        self.chunk_size = options['chunk_size']
+        self.has_failures = FailedGeneration.objects.filter(task=self.task_name).exists()
+        # FailedGeneration pks of replayed rows, by id(row), and those settled since the last flush.
+        self.replayed = {}
+        self.settled_failures = []
+        self.stream = options['stream']
+        self.prompt_batch = options.get('prompt_batch') or 1
+        if self.prompt_batch < 1:
+            raise CommandError('--prompt-batch must be at least 1.')
+        self.resume = options['resume']
+        self.completed = set()
+        self.changed_only = options['changed_only']
+        self.fingerprints = {}
+        # Stamped on the stored rows of every property this run reads, for mark_stale.
+        self.run_stamp = uuid.uuid4().hex
+        self.run_started = timezone.now()
+        self.unchanged = 0
+        self.marked_stale = 0
+        self.revived = 0
+        try:
+            self.shard = parse_shard(options['shard']) if options['shard'] else None
+        except ValueError as e:
+            raise CommandError(e)
+        self.dedupe = None
+        if options['dedupe']:
+            self.dedupe = DuplicateIndex(
+                self.dedupe_fields, near=options['dedupe'] == 'near', threshold=options['dedupe_threshold']
+            )
+        self.claimer = None
+        if options['claim']:
+            if not options['run_id']:
+                raise CommandError('--claim needs a --run-id shared by every worker of the run.')
+            self.claimer = WorkClaimer(
+                self.task_name, options['run_id'], options['worker_id'], options['lease_seconds']
+            )
+
+    def teardown(self):
+        if self.claimer is not None:
+            self.claimer.release()
+
+    def stream_options(self, max_tokens=None, stop_when=None):
+        """Extra ``chat`` options for streamed, length-bounded replies when --stream is on."""
+        if not self.stream:
+            return {}
+        options = {'stream': True}
+        if max_tokens:
+            options['max_tokens'] = max_tokens
+        if stop_when is not None:
+            options['stop_when'] = stop_when
+        return options
+
+    def open_cache(self, options):
+        if options['no_cache'] or not options['cache_path']:
+            return None
+        cache = ResponseCache(options['cache_path'], max_bytes=settings.OLLAMA_CACHE_MAX_BYTES)
+        # Replayed rows failed last time, possibly on the cached reply itself.
+        refresh = options['refresh'] or options['replay_failed']
+        self._client = CachedClient(self.client, cache, refresh=refresh)
+        return cache
+
+    def completed_ids(self, property_ids):
+        """The ones among ``property_ids`` that already have a generated row."""
+        # The unique index on property_id answers this in one query per batch.
+        return set(
+            self.model.objects.filter(property_id__in=property_ids).values_list('property_id', flat=True)
+        )
+
+    def stored_fingerprints(self, property_ids):
+        """``{property_id: source_fingerprint}`` of the generated rows of ``property_ids``.
+
+        Also stamps those rows with this run, so ``mark_stale`` can tell
+        which properties were in the input without keeping their ids.
+        """
+        rows = self.model.objects.filter(property_id__in=property_ids)
+        fingerprints = dict(rows.values_list('property_id', 'source_fingerprint'))
+        rows.update(last_seen_run=self.run_stamp)
+        return fingerprints
+
+    def fingerprint(self, row):
+        return source_fingerprint(row, self.dedupe_fields)
+
+    def should_generate(self, row):
+        """Return False for rows that must not be sent to Ollama in this run."""
+        property_id = get_property_id(row)
+        if property_id in self.completed:
+            self.skipped += 1
+            return False
+        stored = self.fingerprints.get(property_id)
+        if stored is not None and stored == self.fingerprint(row):
+            self.unchanged += 1
+            return False
+        return True
+
+    def in_shard(self, row):
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return shard_of(get_property_id(row), row, count) == index
+
+    def select_rows(self, batch):
+        """Return the rows of ``batch`` this worker should generate."""
+        property_ids = [property_id for property_id in map(get_property_id, batch) if property_id is not None]
+        if self.changed_only:
+            self.fingerprints = self.stored_fingerprints(property_ids)
+        if self.resume:
+            self.completed = self.completed_ids(property_ids)
+        rows = [row for row in batch if self.in_shard(row) and self.should_generate(row)]
+        if self.claimer is None:
+            return rows
+        self.claimer.renew()
+        claimed = self.claimer.claim(get_property_id(row) for row in rows if get_property_id(row) is not None)
+        return [row for row in rows if get_property_id(row) in claimed]
+
+    def row_batches(self):
+        """Batches of input rows: the CSV, or earlier failures with --replay-failed."""
+        if not self.replay_failed:
+            return self.reader.batches()
+        return self.failed_rows()
+
+    def failed_rows(self):
+        failures = list(
+            FailedGeneration.objects.filter(task=self.task_name).order_by('pk').values_list('pk', 'row')
+        )
+        rows = []
+        for pk, row in failures:
+            self.replayed[id(row)] = pk
+            rows.append(row)
+        for start in range(0, len(rows), self.chunk_size):
+            yield rows[start:start + self.chunk_size]
+
+    def settle_replayed(self, row, failed):
+        """Queue the failure a replayed row came from for deletion with the next flush.
+
+        A row with a property id that fails again updates its own failure
+        instead; one without an id would otherwise be replayed forever.
+        """
+        pk = self.replayed.pop(id(row), None)
+        if pk is not None and not (failed and get_property_id(row) is not None):
+            self.settled_failures.append(pk)
+
+    def work_items(self):
+        for batch in timed_iter('read_input', self.row_batches()):
+            yield from self.plan(self.select_rows(batch))
+
+    def plan(self, rows):
+        """Turn selected rows into work items: prompt batches or single rows, then duplicates."""
+        if self.dedupe is None:
+            yield from self.group_rows(rows)
+            return
+        unique = []
+        duplicates = []
+        for row in rows:
+            match = self.dedupe.match(row)
+            if match is None:
+                unique.append(row)
+            else:
+                duplicates.append(DuplicateRow(row, *match))
+        # Representatives go first, so their results are stored before their duplicates'.
+        yield from self.group_rows(unique)
+        yield from duplicates
+
+    def group_rows(self, rows):
+        """Yield single rows, or lists of up to ``prompt_batch`` rows that share one prompt."""
+        if self.prompt_batch <= 1:
+            yield from rows
+            return
+        for start in range(0, len(rows), self.prompt_batch):
+            yield rows[start:start + self.prompt_batch]
+
+    def process(self, item):
+        if isinstance(item, DuplicateRow):
+            return None
+        with phase(f"generate:{self.task_name}"):
+            if isinstance(item, list):
+                return self.generate_batch(item)
+            return self.attempt(item)
+
+    def attempt(self, row):
+        try:
+            with cache_if_accepted():
+                return self.generate(row)
+        except (OllamaError, ValueError) as e:
+            return GenerationFailure(e)
+
+    def store(self, item, result):
+        with phase('store'):
+            self.store_result(item, result)
+
+    def store_result(self, item, result):
+        if isinstance(item, DuplicateRow):
+            self.store_duplicate(item)
+            return
+        pairs = zip(item, result) if isinstance(item, list) else [(item, result)]
+        for row, row_result in pairs:
+            if self.dedupe is not None:
+                self.dedupe.remember(row, row_result)
+            if isinstance(row_result, GenerationFailure):
+                self.record_failure(row, row_result.error)
+            else:
+                self.save(row, row_result)
+                self.settle_replayed(row, failed=False)
+
+    def store_duplicate(self, item):
+        result = self.dedupe.result(item.key)
+        if isinstance(result, GenerationFailure):
+            self.record_failure(item.row, f"Duplicate of a row that failed: {result.error}")
+            return
+        self.metrics.counter(
+            'dedupe_rows_total', 'Rows whose result was copied from a duplicate row.', task=self.task_name, kind=item.kind
+        ).inc()
+        self.metrics.counter(
+            'dedupe_requests_avoided_total', 'Ollama requests not sent thanks to --dedupe.', task=self.task_name
+        ).inc(self.requests_per_row)
+        self.save(item.row, result)
+        self.settle_replayed(item.row, failed=False)
+
+    def record_failure(self, row, error):
+        property_id = get_property_id(row)
+        self.failed += 1
+        self.has_failures = True
+        self.settle_replayed(row, failed=True)
+        self.writer.add(FailedGeneration(
+            task=self.task_name,
+            property_id=property_id,
+            row={key: value for key, value in row.items() if key is not None},
+            error=str(error),
+        ))
+        self.stdout.write(self.style.WARNING(f"Could not generate {self.task_name} for property {property_id}: {error}"))
+
+    def generate_batch(self, rows):
+        """Generate ``rows`` with one prompt; returns their results in order.
+
+        Rows the batched reply does not cover, or covers with an invalid
+        entry, are generated again one by one, as is the whole batch if the
+        request fails or the reply cannot be parsed at all.
+        """
+        keys = [batch_key(row, index) for index, row in enumerate(rows)]
+        try:
+            with cache_if_accepted():
+                results = self.request_batch(list(zip(keys, rows)))
+        except (OllamaError, ValueError):
+            results = {}
+
+        retried = sum(1 for key in keys if key not in results)
+        self.metrics.counter(
+            'prompt_batch_requests_total', 'Prompts that asked for several properties at once.',
+            task=self.task_name,
+        ).inc()
+        rows_total = 'Properties sent in batched prompts, by whether the batched reply covered them.'
+        self.metrics.counter('prompt_batch_rows_total', rows_total, task=self.task_name, outcome='ok').inc(len(rows) - retried)
+        self.metrics.counter('prompt_batch_rows_total', rows_total, task=self.task_name, outcome='retried').inc(retried)
+        return [results[key] if key in results else self.retry_row(row) for key, row in zip(keys, rows)]
+
+    def retry_row(self, row):
+        """Generate a row the batched reply did not cover."""
+        return self.attempt(row)
+
+    def rows_in(self, item):
+        """Number of input rows a work item stands for, for per-task throughput."""
+        return len(item) if isinstance(item, list) else 1
+
+    def request_batch(self, keyed_rows):
+        """Send one prompt for ``(key, row)`` pairs and return ``{key: result}`` for valid entries."""
+        raise NotImplementedError
+
+    def mark_stale(self):
+        """Mark rows of properties missing from the input as stale, and unmark those that are back.
+
+        Regenerated rows are already unmarked by their upsert; this catches
+        the unchanged ones, and the rows whose property disappeared. Rows
+        written by this run were in the input even though their upsert
+        cleared the stamp ``stored_fingerprints`` put on them.
+        """
+        rows = self.model.objects.filter(property_id__isnull=False)
+        with transaction.atomic():
+            self.marked_stale = rows.filter(stale=False).exclude(last_seen_run=self.run_stamp).exclude(
+                generated_at__gte=self.run_started
+            ).update(stale=True)
+            self.revived = rows.filter(stale=True, last_seen_run=self.run_stamp).update(stale=False)
+            if self.marked_stale or self.revived:
+                transaction.on_commit(lambda: invalidate_model(self.model))
+
+    def flushed(self, instances):
+        """Called by the writer inside the transaction that saved ``instances``."""
+        if any(isinstance(instance, self.model) for instance in instances):
+            transaction.on_commit(lambda: invalidate_model(self.model))
+        if self.has_failures:
+            saved = [
+                instance.property_id for instance in instances
+                if isinstance(instance, self.model) and instance.property_id is not None
+            ]
+            FailedGeneration.objects.filter(task=self.task_name, property_id__in=saved).delete()
+        if self.settled_failures:
+            # Every row settled so far is part of this flush.
+            settled = list(self.settled_failures)
+            FailedGeneration.objects.filter(pk__in=settled).delete()
+
+            def forget():
+                del self.settled_failures[:len(settled)]
+            transaction.on_commit(forget)
+        if self.claimer is not None:
+            self.claimer.complete(
+                instance.property_id for instance in instances if isinstance(instance, self.model)
+            )
+            self.claimer.renew()
+
+    def report(self, options):
+        stats = self.reader.stats()
+        self.stdout.write(
+            f"Read {stats['rows']} rows ({stats['rejected']} rejected) in {stats['seconds']:.2f}s: "
+            f"{stats['rows_per_second']:.0f} rows/s, {stats['bytes_per_second'] / 1e6:.2f} MB/s"
+        )
+        if stats.get('rejected_reasons'):
+            self.stdout.write('Rejected: ' + ', '.join(
+                f"{count} {reason}" for reason, count in stats['rejected_reasons'].items()
+            ))
+        if options['resume']:
+            self.stdout.write(f"Resumed: skipped {self.skipped} already generated properties")
+        if options['changed_only']:
+            self.stdout.write(
+                f"Changed only: skipped {self.unchanged} unchanged properties; "
+                f"marked {self.marked_stale} rows stale, {self.revived} back in the input"
+            )
+        if self.failed:
+            self.stdout.write(self.style.WARNING(
+                f"Failed: {self.failed} rows could not be generated; rerun with --replay-failed to retry them"
+            ))
+        if self.breaker.opened:
+            self.stdout.write(
+                f"Ollama was unavailable {self.breaker.opened} times; requests paused for "
+                f"{self.breaker.paused_seconds:.0f}s in total"
+            )
+        backend_stats = getattr(self.client, 'backend_stats', None)
+        if backend_stats is not None:
+            self.stdout.write('Ollama backends: ' + '; '.join(
+                f"{backend['url']} {backend['requests']} requests, {backend['errors']} errors"
+                + (f", ejected {backend['ejections']} times" if backend['ejections'] else '')
+                for backend in backend_stats()
+            ))
+
+        latency = self.metrics.get('ollama_request_seconds', status='ok')
+        if latency is not None:
+            summary = latency.summary()
+            self.stdout.write(
+                f"Ollama: {summary['count']} requests, p50 {summary['p50']:.2f}s, p99 {summary['p99']:.2f}s"
+            )
+        self.report_connections()
+        if self.hedger is not None:
+            self.report_hedging(self.hedger.hedge_stats())
+        if self.limiter is not None:
+            limiter = self.limiter
+            for kind, count in limiter.decreases.items():
+                self.metrics.counter(
+                    'adaptive_limit_decreases_total', 'Times the adaptive concurrency limit backed off.', reason=kind
+                ).inc(count)
+            self.stdout.write(
+                f"Adaptive concurrency: limit between {limiter.lowest} and {limiter.highest}, ended at {limiter.limit}; "
+                f"backed off {limiter.decreases.get('latency', 0)} times for latency, "
+                f"{limiter.decreases.get('overload', 0)} for overload"
+            )
+        self.report_prompt_batches(self.task_name)
+        self.report_dedupe(self.task_name)
+        if options['metrics_dir']:
+            self.metrics.write(options['metrics_dir'])
+            self.stdout.write(f"Metrics written to {options['metrics_dir']}")
+        if self.profile is not None:
+            self.stdout.write(f"Profile written to {', '.join(self.profile.write())}")
+
+    def report_connections(self):
+        """Show whether keep-alive works: how many connections were opened and how often one was reused."""
+        stats = getattr(self.client, 'stats', None)
+        stats = stats() if callable(stats) else None
+        if not isinstance(stats, dict) or not stats.get('requests'):
+            return
+        self.metrics.counter('ollama_connections_opened_total', 'Connections opened to Ollama.').inc(
+            stats['connections_opened']
+        )
+        self.metrics.counter(
+            'ollama_connections_reused_total', 'Requests sent on a connection that had already served one.'
+        ).inc(stats['reused_requests'])
+        self.stdout.write(
+            f"Connections: {stats['connections_opened']} opened, {stats['reused_requests']} of "
+            f"{stats['requests']} requests reused one (up to {stats['max_requests_per_connection']} per connection)"
+        )
+
+    def report_hedging(self, stats):
+        self.metrics.counter('ollama_hedged_requests_total', 'Requests that got a second copy.').inc(stats['hedged'])
+        self.metrics.counter('ollama_hedge_wins_total', 'Hedged requests where the copy answered first.').inc(
+            stats['hedge_wins']
+        )
+        requests = stats['requests'] or 1
+        hedged = stats['hedged'] or 1
+        self.stdout.write(
+            f"Hedging: {stats['hedged']} of {stats['requests']} requests hedged ({stats['hedged'] / requests:.1%}); "
+            f"the copy answered first {stats['hedge_wins']} times ({stats['hedge_wins'] / hedged:.0%})"
+        )
+
+    def report_prompt_batches(self, task_name):
+        requests = self.metrics.get('prompt_batch_requests_total', task=task_name)
+        if requests is None:
+            return
+        ok = self.metrics.get('prompt_batch_rows_total', task=task_name, outcome='ok').value
+        retried = self.metrics.get('prompt_batch_rows_total', task=task_name, outcome='retried').value
+        self.stdout.write(
+            f"Prompt batching ({task_name}): {requests.value} batched requests for {ok + retried} rows, "
+            f"{retried} retried individually"
+        )
+
+    def report_dedupe(self, task_name):
+        avoided = self.metrics.get('dedupe_requests_avoided_total', task=task_name)
+        if avoided is None:
+            return
+        counts = {
+            kind: getattr(self.metrics.get('dedupe_rows_total', task=task_name, kind=kind), 'value', 0)
+            for kind in ('exact', 'near')
+        }
+        self.stdout.write(
+            f"Dedupe ({task_name}): reused results for {counts['exact']} exact and {counts['near']} near duplicates, "
+            f"avoiding about {avoided.value} Ollama requests"
+        )
+
+    def generate(self, row):
+        raise NotImplementedError
+
+    def save(self, row, result):
+        raise NotImplementedError
+
+
+def source_fingerprint(row, fields):
+    """Hash of the row's ``fields`` as they go into the prompt; equal hashes mean an equal prompt."""
+    values = (row.get(field) for field in fields)
+    text = '\x1f'.join(fingerprint_text(value) for value in values)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def fingerprint_text(value):
+    """``value`` as the CSV reader would give it: ``Decimal('150.00')`` and ``150.0`` become ``'150'``.
+
+    Typed records (see --columnar) and Property rows give numbers and None
+    where the CSV reader gives strings.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (Decimal, float)):
+        number = Decimal(str(value))
+        if number.is_finite():
+            return format(number.normalize(), 'f')
+    return str(value).strip()
+
+
+def get_property_id(row):
+    """Return the row's source property id as an int, or None if it has none."""
+    value = row.get('id')
+    if value is None or str(value).strip() == '':
+        return None
+    return int(value)
+
+
+class GenerationFailure:
+    """Result of a row whose generation failed, recorded instead of a fallback value."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class DuplicateRow:
+    """Work item for a row that reuses the result of the earlier row ``key`` (see ``DuplicateIndex``)."""
+
+    def __init__(self, row, key, kind):
+        self.row = row
+        self.key = key
+        self.kind = kind
+
+
+def batch_key(row, index):
+    """Id a row is known by inside a batched prompt: its property id, else its position."""
+    property_id = get_property_id(row)
+    return str(property_id) if property_id is not None else f"row{index + 1}"
+
+
+@contextmanager
+def interrupt_on_sigterm():
+    """Turn SIGTERM into KeyboardInterrupt so buffered rows are still flushed."""
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    previous = signal.signal(signal.SIGTERM, interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from hotels.benchmark import run_command, write_synthetic_csv
+from hotels.fakeollama import FakeOllamaProcess
+from hotels.llm import OllamaClient
+from hotels.management.commands import generate_rating_review, rewrite_titles_description, write_summary
+from hotels.management.commands.fake_ollama import add_fake_server_arguments, fake_server_options
+
+COMMANDS = {
+    'rewrite_titles_description': rewrite_titles_description.Command,
+    'write_summary': write_summary.Command,
+    'generate_rating_review': generate_rating_review.Command,
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the generation commands end to end against a local fake Ollama server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,100000',
+                            help='Comma-separated synthetic CSV sizes (default: 1000,100000).')
+        parser.add_argument('--commands', default=','.join(COMMANDS),
+                            help=f"Comma-separated commands to run (default: {','.join(COMMANDS)}).")
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='--concurrency passed to each command (default: 16).')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='--batch-size passed to each command (default: 100).')
+        parser.add_argument('--adaptive', action='store_true',
+                            help='Pass --adaptive to each command, with --concurrency as the upper limit.')
+        parser.add_argument('--hedge', type=float, default=None, metavar='PERCENTILE',
+                            help='--hedge passed to each command (default: off).')
+        parser.add_argument('--prompt-batch', type=int, default=1,
+                            help='--prompt-batch passed to the commands that support it (default: 1).')
+        parser.add_argument('--output', default=None, help='Also write the results as JSON to this file.')
+        add_fake_server_arguments(parser)
+        parser.set_defaults(latency_ms=20.0)
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['commands'].split(',') if name.strip()]
+        unknown = sorted(set(names) - set(COMMANDS))
+        if unknown:
+            raise CommandError(f"Unknown commands: {', '.join(unknown)}. Choose from {', '.join(COMMANDS)}.")
+        sizes = [int(size) for size in options['rows'].split(',')]
+
+        results = []
+        # The server runs in its own process, so its work does not count against rows/s or peak RSS.
+        with tempfile.TemporaryDirectory() as workdir, FakeOllamaProcess(**fake_server_options(options)) as server:
+            client = OllamaClient(base_url=server.url, pool_size=options['concurrency'])
+            for rows in sizes:
+                input_path = os.path.join(workdir, f"properties_{rows}.csv")
+                write_synthetic_csv(input_path, rows, seed=options['seed'] or 0)
+                for name in names:
+                    command = COMMANDS[name]()
+                    extra = {'prompt_batch': options['prompt_batch']} if command.batchable else {}
+                    result = run_command(
+                        command, client, rows, input_path,
+                        concurrency=options['concurrency'], batch_size=options['batch_size'],
+                        adaptive=options['adaptive'], hedge=options['hedge'], **extra,
+                    )
+                    result['command'] = name
+                    results.append(result)
+                    self.stdout.write(
+                        f"{name} x {rows}: {result['rows_per_second']:.1f} rows/s, "
+                        f"p50 {result['p50_latency'] * 1000:.0f} ms, p99 {result['p99_latency'] * 1000:.0f} ms, "
+                        f"peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MiB"
+                    )
+            client.close()
+            server_stats = server.stats()
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'options': {k: options[k] for k in ('concurrency', 'adaptive', 'hedge', 'batch_size', 'prompt_batch',
+                                                               'latency', 'latency_ms', 'tokens_per_second', 'error_rate',
+                                                               'max_concurrency')},
+                           'server': server_stats, 'results': results}, file, indent=2)
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
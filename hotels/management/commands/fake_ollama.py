@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from hotels.fakeollama import FakeOllamaServer
+
+
+def add_fake_server_arguments(parser):
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'lognormal'], default='lognormal',
+                        help='Distribution of time-to-first-token (default: lognormal).')
+    parser.add_argument('--latency-ms', type=float, default=200.0,
+                        help='Median (lognormal) or mean time-to-first-token in milliseconds (default: 200).')
+    parser.add_argument('--tokens-per-second', type=float, default=0.0,
+                        help='Simulated generation speed; 0 returns the whole reply at once (default: 0).')
+    parser.add_argument('--reply-tokens', type=int, default=60,
+                        help='Approximate number of tokens in each reply (default: 60).')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with a 500 (default: 0).')
+    parser.add_argument('--max-concurrency', type=int, default=0,
+                        help='Requests served at once, like OLLAMA_NUM_PARALLEL; 0 means unlimited (default: 0).')
+    parser.add_argument('--max-queue', type=int, default=512,
+                        help='Requests allowed to wait for a slot before getting a 503 (default: 512).')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs.')
+
+
+def fake_server_options(options, port=0):
+    """``FakeOllamaServer`` keyword arguments from the options of ``add_fake_server_arguments``."""
+    return {
+        'port': port,
+        'latency': options['latency'],
+        'latency_ms': options['latency_ms'],
+        'tokens_per_second': options['tokens_per_second'],
+        'reply_tokens': options['reply_tokens'],
+        'error_rate': options['error_rate'],
+        'max_concurrency': options['max_concurrency'],
+        'max_queue': options['max_queue'],
+        'seed': options['seed'],
+    }
+
+
+def fake_server_from_options(options, port=0):
+    return FakeOllamaServer(**fake_server_options(options, port))
+
+
+class Command(BaseCommand):
+    help = 'Serve a fake Ollama chat-completions endpoint with configurable latency and errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=11435, help='Port to listen on (default: 11435).')
+        add_fake_server_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = fake_server_from_options(options, port=options['port'])
+        self.stdout.write(self.style.SUCCESS(f"Fake Ollama listening on {server.url} (Ctrl-C to stop)"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
+            self.stdout.write(f"Served {server.stats()}")
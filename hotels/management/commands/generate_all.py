@@ -0,0 +1,156 @@
+import threading
+import time
+from django.core.management.base import CommandError
+from hotels.ingest import has_fields
+from hotels.management.base import GenerationCommand
+from hotels.profiling import timed_iter
+from hotels.management.commands import generate_rating_review, rewrite_titles_description, write_summary
+
+TASKS = {
+    command.task_name: command
+    for command in (
+        rewrite_titles_description.Command,
+        write_summary.Command,
+        generate_rating_review.Command,
+    )
+}
+
+
+class TaskStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.seconds = 0.0
+
+    def record(self, seconds, rows=1):
+        with self._lock:
+            self.rows += rows
+            self.seconds += seconds
+
+
+class Command(GenerationCommand):
+    help = 'Rewrite titles, write summaries and generate ratings/reviews in one pass over the input'
+    required_fields = ('title', 'description')
+    success_message = 'Successfully ran all generation tasks'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--tasks', default=','.join(TASKS),
+            help=f"Comma-separated tasks to run (default: {','.join(TASKS)}).",
+        )
+        parser.add_argument(
+            '--structured', action='store_true',
+            help='Use one JSON reply for rating and review (see generate_rating_review --structured).',
+        )
+        parser.add_argument(
+            '--prompt-batch', default='',
+            help='Properties per prompt, either one number for every task that supports it '
+                 'or per task, e.g. rewrite=8,rating_review=4 (default: no batching).',
+        )
+
+    def setup(self, options):
+        names = [name.strip() for name in options['tasks'].split(',') if name.strip()]
+        unknown = sorted(set(names) - set(TASKS))
+        if unknown or not names:
+            raise CommandError(f"Unknown tasks: {', '.join(unknown) or '(none given)'}. Choose from {', '.join(TASKS)}.")
+
+        prompt_batches = self.parse_prompt_batch(options['prompt_batch'])
+        self.tasks = {}
+        for name in dict.fromkeys(names):
+            task = TASKS[name](stdout=self.stdout, stderr=self.stderr)
+            task._client = self.client
+            task.metrics = self.metrics
+            task.setup({**options, 'prompt_batch': prompt_batches.get(name, prompt_batches.get(None, 1))})
+            self.tasks[name] = task
+        self.replay_failed = options['replay_failed']
+        self.task_stats = {name: TaskStats() for name in self.tasks}
+        self.started = time.perf_counter()
+
+    def parse_prompt_batch(self, value):
+        """Turn "8" or "rewrite=8,rating_review=4" into ``{task or None: size}``."""
+        sizes = {}
+        for part in filter(None, (part.strip() for part in value.split(','))):
+            name, _, size = part.rpartition('=')
+            name = name.strip() or None
+            if name is not None and not getattr(TASKS.get(name), 'batchable', False):
+                batchable = ', '.join(task for task, command in TASKS.items() if command.batchable)
+                raise CommandError(f"--prompt-batch: {name} cannot be batched. Choose from {batchable}.")
+            try:
+                sizes[name] = int(size)
+            except ValueError:
+                raise CommandError(f"--prompt-batch: {size!r} is not a number.")
+        if None in sizes:
+            # A bare number only applies to the tasks that can batch.
+            default = sizes.pop(None)
+            sizes = {**{name: default for name, command in TASKS.items() if command.batchable}, **sizes}
+        return sizes
+
+    def teardown(self):
+        for task in self.tasks.values():
+            task.teardown()
+
+    def work_items(self):
+        if self.replay_failed:
+            # Each task replays its own failures.
+            for name, task in self.tasks.items():
+                for batch in task.failed_rows():
+                    for item in task.plan(task.select_rows(batch)):
+                        yield name, item
+            return
+
+        # Each row is read once and fanned out to every task that wants it.
+        for batch in timed_iter('read_input', self.reader.batches()):
+            selected = {}
+            for name, task in self.tasks.items():
+                rows = task.select_rows([row for row in batch if has_fields(row, task.required_fields)])
+                selected[name] = {id(row) for row in rows}
+            if all(task.prompt_batch <= 1 and task.dedupe is None for task in self.tasks.values()):
+                for row in batch:
+                    for name in self.tasks:
+                        if id(row) in selected[name]:
+                            yield name, row
+                continue
+            for name, task in self.tasks.items():
+                rows = [row for row in batch if id(row) in selected[name]]
+                for item in task.plan(rows):
+                    yield name, item
+
+    def flushed(self, instances):
+        for task in self.tasks.values():
+            task.flushed(instances)
+
+    def mark_stale(self):
+        for task in self.tasks.values():
+            task.mark_stale()
+
+    def process(self, item):
+        name, rows = item
+        started = time.perf_counter()
+        result = self.tasks[name].process(rows)
+        self.task_stats[name].record(time.perf_counter() - started, self.tasks[name].rows_in(rows))
+        return result
+
+    def store(self, item, result):
+        name, rows = item
+        task = self.tasks[name]
+        task.writer = self.writer
+        task.store(rows, result)
+
+    def report(self, options):
+        self.skipped = sum(task.skipped for task in self.tasks.values())
+        self.failed = sum(task.failed for task in self.tasks.values())
+        for counter in ('unchanged', 'marked_stale', 'revived'):
+            setattr(self, counter, sum(getattr(task, counter) for task in self.tasks.values()))
+        super().report(options)
+        for name in self.tasks:
+            self.report_prompt_batches(name)
+            self.report_dedupe(name)
+
+        elapsed = time.perf_counter() - self.started
+        for name, stats in self.task_stats.items():
+            mean = stats.seconds / stats.rows if stats.rows else 0.0
+            self.stdout.write(
+                f"{name}: {stats.rows} rows, {stats.rows / elapsed if elapsed else 0.0:.2f} rows/s, "
+                f"{mean:.2f}s mean per row"
+            )
@@ -1,15 +1,70 @@
-from django.core.management.base import BaseCommand
-import requests
-import csv
 import re
-import json
+from hotels import profiling, utils
+from hotels.cache import cache_if_accepted
+from hotels.llm import OllamaError
+from django.core.management.base import CommandError
+from hotels.management.base import GenerationCommand, GenerationFailure, get_property_id
 from hotels.models import GeneratePropertyRatingReview
 
 
-class Command(BaseCommand):
+class ReviewRequest:
+    """Work item for the review of a row whose rating is asked for in a batched prompt."""
+
+    def __init__(self, row):
+        self.row = row
+
+
+class Command(GenerationCommand):
     help = 'Generate and save ratings and reviews for properties'
+    model = GeneratePropertyRatingReview
+    task_name = 'rating_review'
+    batchable = True
+    required_fields = ('id', 'title', 'description', 'location', 'price', 'room_type')
+    dedupe_fields = ('title', 'description', 'location', 'price', 'room_type')
+    success_message = 'Successfully generated ratings and reviews for properties.'
+    structured = False
+    rating_max_tokens = 128
+    review_max_tokens = 600
+
+    # A rating is complete once a character that cannot belong to the number follows it.
+    complete_rating_pattern = re.compile(r'Rating:\s*\d+\.\d+[^\d]')
+
+    rating_review_schema = {
+        'type': 'object',
+        'properties': {
+            'rating': {'type': 'number', 'minimum': 0, 'maximum': 5},
+            'review': {'type': 'string'},
+        },
+        'required': ['rating', 'review'],
+    }
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--structured', action='store_true',
+            help='Ask for rating and review together as one JSON reply (one request per property).',
+        )
+
+    @property
+    def requests_per_row(self):
+        return 1 if self.structured else 2
+
+    def setup(self, options):
+        super().setup(options)
+        self.structured = options['structured']
+        if self.structured and self.prompt_batch > 1:
+            raise CommandError('--prompt-batch only batches the rating request and cannot be used with --structured.')
+        self.processed_properties = set()
+        # Ratings from batched prompts, by id(row), until the row's review is stored.
+        self.batch_ratings = {}
 
     def generate_rating_review_with_ollama(self, title, description, location, room_type, price):
+        return (
+            self.generate_rating(title, description, location, room_type, price),
+            self.generate_review(title, description, location, room_type, price),
+        )
+
+    def generate_rating(self, title, description, location, room_type, price):
         rating_prompt = f"Assign a rating out of 5 stars (use one decimal place) for this property based on the following details:\n" \
                         f"Title: {title},\n" \
                         f"Description: {description},\n" \
@@ -18,6 +73,21 @@ class Command(BaseCommand):
                         f"Price: {price}\n" \
                         f"Please provide the rating in decimal format."
 
+        # Request for rating
+        content_rating = self.client.chat(
+            rating_prompt,
+            **self.stream_options(max_tokens=self.rating_max_tokens, stop_when=self.rating_is_complete)
+        )
+        print(f"Rating Content: {content_rating}")
+
+        # Match decimal rating
+        with profiling.phase('parse_reply'):
+            rating_match = re.search(r'Rating:\s*(\d+\.\d+)', content_rating)
+        if not rating_match:
+            raise ValueError(f"Rating extraction failed for property {title}: {content_rating[:200]!r}")
+        return utils.parse_rating(rating_match.group(1))
+
+    def generate_review(self, title, description, location, room_type, price):
         review_prompt = f"Generate a detailed review for the following property:\n" \
                         f"Title: {title},\n" \
                         f"Description: {description},\n" \
@@ -26,91 +96,126 @@ class Command(BaseCommand):
                         f"Price: {price}\n" \
                         f"Please provide a comprehensive review describing the property's features, amenities, and overall experience."
 
-        url = "http://127.0.0.1:11434/v1/chat/completions"
-        headers = {"Content-Type": "application/json"}
-
-        # Request for rating
-        data_rating = {"model": "tinyllama:latest", "messages": [{"role": "user", "content": rating_prompt}]}
-        response_rating = requests.post(url, headers=headers, json=data_rating)
-
-        if response_rating.status_code == 200:
-            try:
-                response_data_rating = response_rating.json()
-                content_rating = response_data_rating['choices'][0]['message']['content']
-                print(f"Rating Content: {content_rating}")
-
-                # Match decimal rating
-                rating_match = re.search(r'Rating:\s*(\d+\.\d+)', content_rating)
-                if rating_match:
-                    rating = float(rating_match.group(1))
-                else:
-                    print(f"Rating extraction failed for property {title}, defaulting to 4.5.")
-                    rating = 4.5
-            except (IndexError, ValueError, KeyError) as e:
-                print(f"Error processing rating response: {e}")
-                rating = 4.5
-        else:
-            print(f"Error generating rating: {response_rating.status_code} - {response_rating.text}")
-            rating = 4.5
-
-        # Request for review
-        data_review = {"model": "tinyllama:latest", "messages": [{"role": "user", "content": review_prompt}]}
-        response_review = requests.post(url, headers=headers, json=data_review)
-
-        if response_review.status_code == 200:
+        content_review = self.client.chat(
+            review_prompt, **self.stream_options(max_tokens=self.review_max_tokens)
+        )
+        print(f"Review Content: {content_review}")
+
+        with profiling.phase('parse_reply'):
+            return re.sub(r'Rating.*?stars?', '', content_review, flags=re.IGNORECASE).strip()
+
+    def group_rows(self, rows):
+        # Only the short rating is batched. Reviews do not depend on it, so each
+        # one is a work item of its own that runs on another worker meanwhile.
+        for item in super().group_rows(rows):
+            yield item
+            if isinstance(item, list):
+                yield from (ReviewRequest(row) for row in item)
+
+    def process(self, item):
+        if not isinstance(item, ReviewRequest):
+            return super().process(item)
+        row = item.row
+        with profiling.phase(f"generate:{self.task_name}"):
             try:
-                response_data_review = response_review.json()
-                content_review = response_data_review['choices'][0]['message']['content']
-                print(f"Review Content: {content_review}")
-
-                
-                review = re.sub(r'Rating.*?stars?', '', content_review, flags=re.IGNORECASE).strip()
-            except (IndexError, ValueError, KeyError) as e:
-                print(f"Error processing review response: {e}")
-                review = "Default review: This is a great property!"
-        else:
-            print(f"Error generating review: {response_review.status_code} - {response_review.text}")
-            review = "Default review: This is a great property!"
-
-        return rating, review
-
-
-
-    def handle(self, *args, **kwargs):
-        processed_properties = set()  
-
-        with open('hotel_datas.csv', 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                property_id = row['id']
-                if property_id in processed_properties:
-                    continue  
-                processed_properties.add(property_id)
-    
-                title = row['title']
-                description = row['description']
-                location = row['location']
-                room_type = row['room_type']
-                price = row['price']
-    
-                # Generate rating and review
-                generated_rating, generated_review = self.generate_rating_review_with_ollama(
-                    title, description, location, room_type, price
-                )
-    
-                # Save to the database
-                GeneratePropertyRatingReview.objects.create(
-                    property_id=property_id,
-                    rating=generated_rating,
-                    review=generated_review
-                )
-    
-                # Print for debugging
-                self.stdout.write(
-                    self.style.SUCCESS(f"Review for Property {property_id} - Rating: {generated_rating}")
+                with cache_if_accepted():
+                    return self.generate_review(
+                        row['title'], row['description'], row['location'], row['room_type'], row['price']
+                    )
+            except OllamaError as e:
+                return GenerationFailure(e)
+
+    def rows_in(self, item):
+        # A review's row is already counted with its batch.
+        return 0 if isinstance(item, ReviewRequest) else super().rows_in(item)
+
+    def request_batch(self, keyed_rows):
+        listing = "\n\n".join(
+            f"id: {key}\n"
+            f"Title: {row['title']},\n"
+            f"Description: {row['description']},\n"
+            f"Location: {row['location']},\n"
+            f"Room Type: {row['room_type']},\n"
+            f"Price: {row['price']}"
+            for key, row in keyed_rows
+        )
+        prompt = f"Assign a rating out of 5 stars (use one decimal place) to each of the following {len(keyed_rows)} properties.\n\n" \
+                 f"{listing}\n\n" \
+                 f"Reply with a JSON array containing one object per property, each with the keys " \
+                 f"\"id\" (the id given above) and \"rating\", a number from 0 to 5."
+        content = self.client.chat(
+            prompt, **self.stream_options(max_tokens=self.rating_max_tokens * len(keyed_rows))
+        )
+        return utils.parse_batch_reply(
+            content, [key for key, _ in keyed_rows], lambda entry: utils.parse_rating(entry.get('rating'))
+        )
+
+    def retry_row(self, row):
+        # The review is requested by the row's own ReviewRequest.
+        try:
+            with cache_if_accepted():
+                return self.generate_rating(
+                    row['title'], row['description'], row['location'], row['room_type'], row['price']
                 )
+        except (OllamaError, ValueError) as e:
+            return GenerationFailure(e)
+
+    def store_result(self, item, result):
+        if isinstance(item, list):
+            # Ratings of a batch wait for the reviews, which come after it in input order.
+            self.batch_ratings.update((id(row), rating) for row, rating in zip(item, result))
+            return
+        if isinstance(item, ReviewRequest):
+            rating = self.batch_ratings.pop(id(item.row))
+            failed = [part for part in (rating, result) if isinstance(part, GenerationFailure)]
+            super().store_result(item.row, failed[0] if failed else (rating, result))
+            return
+        super().store_result(item, result)
+
+    def rating_is_complete(self, text):
+        return self.complete_rating_pattern.search(text) is not None
+
+    def generate_structured_rating_review(self, title, description, location, room_type, price):
+        prompt = f"Rate and review the following property:\n" \
+                 f"Title: {title},\n" \
+                 f"Description: {description},\n" \
+                 f"Location: {location},\n" \
+                 f"Room Type: {room_type},\n" \
+                 f"Price: {price}\n" \
+                 f"Reply with a JSON object with two keys: \"rating\", a number from 0 to 5 with one decimal place, " \
+                 f"and \"review\", a comprehensive review describing the property's features, amenities, and overall experience."
+
+        response_format = {
+            'type': 'json_schema',
+            'json_schema': {'name': 'rating_review', 'schema': self.rating_review_schema},
+        }
+        content = self.client.chat(
+            prompt, response_format=response_format, **self.stream_options(max_tokens=self.review_max_tokens)
+        )
+        return utils.parse_rating_review(content)
+
+    def should_generate(self, row):
+        property_id = get_property_id(row)
+        if property_id in self.processed_properties:
+            return False
+        self.processed_properties.add(property_id)
+        return super().should_generate(row)
+
+    def generate(self, row):
+        generate = self.generate_structured_rating_review if self.structured else self.generate_rating_review_with_ollama
+        return generate(row['title'], row['description'], row['location'], row['room_type'], row['price'])
+
+    def save(self, row, result):
+        property_id = get_property_id(row)
+        generated_rating, generated_review = result
+
+        self.writer.add(GeneratePropertyRatingReview(
+            property_id=property_id,
+            rating=generated_rating,
+            review=generated_review,
+            source_fingerprint=self.fingerprint(row),
+        ))
 
         self.stdout.write(
-            self.style.SUCCESS('Successfully generated ratings and reviews for properties.')
+            self.style.SUCCESS(f"Review for Property {property_id} - Rating: {generated_rating}")
         )
-
@@ -0,0 +1,204 @@
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from hotels.apicache import invalidate_model
+from hotels.ingest import CSVStream, check_input, open_input
+from hotels.models import Property
+
+COLUMNS = ('id', 'title', 'location', 'latitude', 'longitude', 'room_type', 'price', 'description')
+UPDATE_COLUMNS = COLUMNS[1:]
+REQUIRED_COLUMNS = ('id', 'title')
+COPY_CHUNK_BYTES = 1 << 20
+
+# What each staging column becomes in hotels_property. Staging columns are
+# text, so malformed numbers turn into NULL instead of failing the whole COPY.
+NUMBER = r"'^\s*-?\d+(\.\d+)?\s*$'"
+CASTS = {
+    'id': "trim({0})::integer",
+    'title': "left(trim({0}), 255)",
+    'location': "left(coalesce(trim({0}), ''), 255)",
+    'latitude': f"CASE WHEN {{0}} ~ {NUMBER} THEN trim({{0}})::double precision END",
+    'longitude': f"CASE WHEN {{0}} ~ {NUMBER} THEN trim({{0}})::double precision END",
+    'room_type': "left(coalesce(trim({0}), ''), 64)",
+    'price': r"CASE WHEN {0} ~ '^\s*\d{{1,10}}(\.\d+)?\s*$' THEN round(trim({0})::numeric, 2) END",
+    'description': "coalesce({0}, '')",
+}
+# Values of optional columns the file does not have. They are typed, because
+# the CTE they go through resolves a bare NULL to text.
+DEFAULTS = {
+    'location': "''::text",
+    'latitude': 'NULL::double precision',
+    'longitude': 'NULL::double precision',
+    'room_type': "''::text",
+    'price': 'NULL::numeric',
+    'description': "''::text",
+}
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def staging_select(header):
+    """SELECT list turning the text columns of the staging table into Property columns."""
+    return ', '.join(
+        (CASTS[name].format(quote(name)) if name in header else DEFAULTS[name]) + f" AS {name}"
+        for name in COLUMNS
+    )
+
+
+def parse_number(value, kind=float):
+    try:
+        return kind(str(value).strip())
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+
+
+def property_from_row(row):
+    """Build a Property from a CSV row, or return None if its id is not an integer."""
+    try:
+        property_id = int(str(row['id']).strip())
+    except (TypeError, ValueError):
+        return None
+    price = parse_number(row.get('price'), Decimal)
+    return Property(
+        id=property_id,
+        title=row['title'].strip()[:255],
+        location=(row.get('location') or '').strip()[:255],
+        latitude=parse_number(row.get('latitude')),
+        longitude=parse_number(row.get('longitude')),
+        room_type=(row.get('room_type') or '').strip()[:64],
+        price=round(price, 2) if price is not None and price.is_finite() else None,
+        description=row.get('description') or '',
+    )
+
+
+class Command(BaseCommand):
+    help = 'Load the property CSV into the Property table, updating properties that are already there'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input', default='hotel_datas.csv',
+            help='Property CSV to read; .gz and .zst files are decompressed on the fly (default: hotel_datas.csv).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows per bulk insert when the database does not support COPY (default: 5000).',
+        )
+        parser.add_argument('--database', default='default', help='Database alias to load into (default: default).')
+
+    def handle(self, *args, **options):
+        check_input(options['input'])
+        connection = connections[options['database']]
+        started = time.perf_counter()
+        if connection.vendor == 'postgresql':
+            stats = self.copy_import(connection, options['input'])
+        else:
+            stats = self.bulk_import(options['database'], options['input'], options['batch_size'])
+        seconds = time.perf_counter() - started
+        invalidate_model(Property)
+
+        rate = stats['read'] / seconds if seconds else 0.0
+        self.stdout.write(
+            f"Read {stats['read']} rows in {seconds:.1f}s ({rate:.0f} rows/s); "
+            f"{stats['rejected']} rejected without a numeric id or a title"
+        )
+        if 'inserted' in stats:
+            self.stdout.write(
+                f"Properties: {stats['inserted']} new, {stats['updated']} updated, {stats['unchanged']} unchanged"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Imported {stats['written']} properties"))
+
+    def copy_import(self, connection, path):
+        """COPY the file into a temporary text table, then upsert it with one INSERT ... SELECT.
+
+        The CSV is streamed to the server as is, without parsing it in Python.
+        Rows with an id that is not an integer or an empty title are skipped;
+        if an id appears more than once, its last row wins. Existing
+        properties are only rewritten if one of their columns changed.
+        """
+        with open_input(path) as file:
+            header = next(csv.reader([file.readline()]), [])
+            header = [name.lstrip('\ufeff').strip() for name in header]
+            missing = [name for name in REQUIRED_COLUMNS if name not in header]
+            if missing:
+                raise CommandError(f"{path} has no {', '.join(missing)} column")
+            if len(set(header)) != len(header):
+                raise CommandError(f"{path} has repeated column names")
+
+            staging = 'property_staging'
+            staged_columns = ', '.join(quote(name) for name in header)
+            select = staging_select(header)
+            table = quote(Property._meta.db_table)
+            columns = ', '.join(COLUMNS)
+            changed = ', '.join(f"EXCLUDED.{name}" for name in UPDATE_COLUMNS)
+
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE {staging} "
+                    f"(line bigserial, {', '.join(f'{quote(name)} text' for name in header)}) ON COMMIT DROP"
+                )
+                copy_sql = f"COPY {staging} ({staged_columns}) FROM STDIN (FORMAT csv)"
+                raw = cursor.cursor
+                if hasattr(raw, 'copy'):  # psycopg 3
+                    with raw.copy(copy_sql) as copy:
+                        while chunk := file.read(COPY_CHUNK_BYTES):
+                            copy.write(chunk)
+                else:  # psycopg2
+                    raw.copy_expert(copy_sql, file, size=COPY_CHUNK_BYTES)
+                cursor.execute(f"SELECT count(*) FROM {staging}")
+                read = cursor.fetchone()[0]
+
+                cursor.execute(f"""
+                    WITH valid AS MATERIALIZED (
+                        SELECT line, {select}
+                        FROM {staging}
+                        WHERE {quote('id')} ~ '^\\s*\\d{{1,9}}\\s*$' AND coalesce(trim({quote('title')}), '') <> ''
+                    ), upserted AS (
+                        INSERT INTO {table} AS p ({columns})
+                        SELECT DISTINCT ON (id) {columns} FROM valid
+                        ORDER BY id, line DESC
+                        ON CONFLICT (id) DO UPDATE SET {', '.join(f'{name} = EXCLUDED.{name}' for name in UPDATE_COLUMNS)}
+                        WHERE ({', '.join(f'p.{name}' for name in UPDATE_COLUMNS)}) IS DISTINCT FROM ({changed})
+                        RETURNING xmax = 0 AS inserted
+                    )
+                    SELECT
+                        (SELECT count(*) FROM valid),
+                        (SELECT count(DISTINCT id) FROM valid),
+                        count(*) FILTER (WHERE inserted),
+                        count(*) FILTER (WHERE NOT inserted)
+                    FROM upserted
+                """)
+                valid, distinct, inserted, updated = cursor.fetchone()
+
+        return {
+            'read': read,
+            'rejected': read - valid,
+            'written': distinct,
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': distinct - inserted - updated,
+        }
+
+    def bulk_import(self, using, path, batch_size):
+        """Upsert the file in batches with ``bulk_create``, for databases without COPY."""
+        reader = CSVStream(path, batch_size=batch_size, required_fields=REQUIRED_COLUMNS)
+        written = rejected = 0
+        for batch in reader.batches():
+            properties = {}
+            for row in batch:
+                prop = property_from_row(row)
+                if prop is None:
+                    rejected += 1
+                else:
+                    properties[prop.id] = prop
+            with transaction.atomic(using=using):
+                Property.objects.using(using).bulk_create(
+                    list(properties.values()), update_conflicts=True,
+                    unique_fields=['id'], update_fields=list(UPDATE_COLUMNS),
+                )
+            written += len(properties)
+        return {'read': reader.rows + reader.rejected, 'rejected': reader.rejected + rejected, 'written': written}
@@ -1,46 +1,27 @@
-from django.core.management.base import BaseCommand
-import pandas as pd
-import requests
-import csv
+from hotels.management.base import GenerationCommand, get_property_id
 from hotels.models import GeneratedPropertySummary
+from hotels.utils import summary_prompt
 
-class Command(BaseCommand):
+class Command(GenerationCommand):
     help = 'Generate and save summaries for properties'
+    model = GeneratedPropertySummary
+    task_name = 'summary'
+    required_fields = ('id', 'title', 'description', 'location', 'price', 'room_type')
+    dedupe_fields = ('title', 'description', 'location', 'price', 'room_type')
+    success_message = 'Successfully generated summary and saved to the database'
+    max_tokens = 400
 
     def Generate_Summary_with_Ollama(self, title, description, location, price, room_type):
-        prompt = f"Generate a summary for the following property: Title: {title}, Description: {description}, Location: {location}, Price: {price}, Room Type: {room_type}"
-        url = "http://127.0.0.1:11434/v1/chat/completions"
-        headers = {
-            "Content-Type": "application/json"
-        }
-        data = {
-            "model": "tinyllama:latest",
-            "messages": [{"role": "user", "content": prompt}]
-        }
+        prompt = summary_prompt(title, description, location, price, room_type)
 
-        response = requests.post(url, headers=headers, json=data)
-        response_data = response.json()
+        return self.client.chat(prompt, **self.stream_options(max_tokens=self.max_tokens))
 
-        if response.status_code == 200:
+    def generate(self, row):
+        return self.Generate_Summary_with_Ollama(
+            row['title'], row['description'], row['location'], row['price'], row['room_type']
+        )
 
-            return response_data['choices'][0]['message']['content']
-        else:
-            return "Error generating summary"
-
-    def handle(self, *args, **kwargs):
-        with open('hotel_datas.csv', 'r') as file:
-            reader = csv.DictReader(file)
-
-            for row in reader:
-                property_id = int(row['id'])
-                title = row['title']
-                description = row['description']
-                location = row['location']
-                price = row['price']
-                room_type = row['room_type']
-
-                summary = self.Generate_Summary_with_Ollama(title, description, location, price, room_type)
-
-                GeneratedPropertySummary.objects.create(property_id=property_id,summary=summary)
-
-        self.stdout.write(self.style.SUCCESS('Successfully generated summary and saved to the database'))
+    def save(self, row, summary):
+        self.writer.add(GeneratedPropertySummary(
+            property_id=get_property_id(row), summary=summary, source_fingerprint=self.fingerprint(row)
+        ))
@@ -0,0 +1,187 @@
+import json
+import math
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+ROW_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 5000)
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in items) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    return
+            self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile by interpolating inside its bucket."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            lower = 0.0
+            for index, bound in enumerate(self.buckets):
+                in_bucket = self.counts[index]
+                if seen + in_bucket >= rank and in_bucket:
+                    return lower + (bound - lower) * (rank - seen) / in_bucket
+                seen += in_bucket
+                lower = bound
+            return self.buckets[-1] if self.buckets else 0.0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class MetricsRegistry:
+    """Histograms and counters for one run, exportable as Prometheus text or JSON."""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _child(self, kind, name, help_text, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, {'kind': kind, 'help': help_text, 'series': {}})
+            series = family['series']
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, **labels):
+        return self._child('histogram', name, help_text, labels, lambda: Histogram(buckets))
+
+    def counter(self, name, help_text, **labels):
+        return self._child('counter', name, help_text, labels, Counter)
+
+    def to_prometheus(self):
+        lines = []
+        for name, family in sorted(self._families.items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for labels, metric in sorted(family['series'].items()):
+                if family['kind'] == 'counter':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), metric.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': _format_value(bound)})} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(metric.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        result = {}
+        for name, family in sorted(self._families.items()):
+            for labels, metric in sorted(family['series'].items()):
+                key = name + _format_labels(labels)
+                result[key] = metric.value if family['kind'] == 'counter' else metric.summary()
+        return result
+
+    def get(self, name, **labels):
+        family = self._families.get(name)
+        if family is None:
+            return None
+        return family['series'].get(tuple(sorted(labels.items())))
+
+    def write(self, directory):
+        """Write ``metrics.prom`` and ``metrics.json`` into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'metrics.prom'), 'w') as file:
+            file.write(self.to_prometheus())
+        with open(os.path.join(directory, 'metrics.json'), 'w') as file:
+            json.dump(self.summary(), file, indent=2, sort_keys=True)
+
+
+class InstrumentedClient:
+    """Wraps an ``OllamaClient`` and records every request in a registry."""
+
+    def __init__(self, client, metrics):
+        self.client = client
+        self.metrics = metrics
+
+    def chat(self, prompt, **options):
+        started = time.perf_counter()
+        try:
+            completion = self.client.complete(prompt, **options)
+        except Exception as e:
+            status = getattr(e, 'status_code', None) or type(e).__name__
+            self.metrics.counter('ollama_requests_total', 'Requests sent to Ollama.', status=status).inc()
+            self.metrics.histogram(
+                'ollama_request_seconds', 'Total time per Ollama request, including retries.', status='error'
+            ).observe(time.perf_counter() - started)
+            raise
+
+        self.record(completion)
+        return completion.content
+
+    def record(self, completion):
+        metrics = self.metrics
+        metrics.counter('ollama_requests_total', 'Requests sent to Ollama.', status=completion.status_code).inc()
+        metrics.histogram(
+            'ollama_request_seconds', 'Total time per Ollama request, including retries.', status='ok'
+        ).observe(completion.seconds)
+        metrics.histogram(
+            'ollama_time_to_first_byte_seconds', 'Time until Ollama sent the response headers.'
+        ).observe(completion.ttfb)
+        if completion.stopped_early:
+            metrics.counter('ollama_early_stops_total', 'Streamed replies cut off once they were usable.').inc()
+        if completion.retries:
+            metrics.counter('ollama_retries_total', 'Requests that were retried.').inc(completion.retries)
+        if completion.prompt_tokens is not None:
+            metrics.histogram(
+                'ollama_prompt_tokens', 'Prompt tokens per request.', buckets=TOKEN_BUCKETS
+            ).observe(completion.prompt_tokens)
+        if completion.completion_tokens is not None:
+            metrics.histogram(
+                'ollama_completion_tokens', 'Completion tokens per request.', buckets=TOKEN_BUCKETS
+            ).observe(completion.completion_tokens)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
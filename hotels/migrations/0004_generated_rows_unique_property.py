@@ -0,0 +1,42 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:31
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicate_rows(apps, schema_editor):
+    # Earlier runs could insert a property more than once; keep the newest row.
+    for model_name in ('GeneratedPropertySummary', 'GeneratePropertyRatingReview'):
+        model = apps.get_model('hotels', model_name)
+        latest = (
+            model.objects.values('property_id')
+            .annotate(latest_id=Max('id'))
+            .values_list('latest_id', flat=True)
+        )
+        model.objects.exclude(id__in=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0003_generatepropertyratingreview'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_rows, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='generatedhoteltd',
+            name='property_id',
+            field=models.IntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='generatedpropertysummary',
+            name='property_id',
+            field=models.IntegerField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='generatepropertyratingreview',
+            name='property_id',
+            field=models.IntegerField(unique=True),
+        ),
+    ]
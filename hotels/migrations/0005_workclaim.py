@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0004_generated_rows_unique_property'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=32)),
+                ('property_id', models.IntegerField()),
+                ('owner', models.CharField(blank=True, max_length=128)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('done', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', 'owner', 'done'], name='work_claim_owner_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'property_id'), name='unique_work_claim')],
+            },
+        ),
+    ]
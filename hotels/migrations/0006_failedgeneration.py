@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0005_workclaim'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailedGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=32)),
+                ('property_id', models.IntegerField(blank=True, null=True)),
+                ('row', models.JSONField()),
+                ('error', models.TextField()),
+                ('failed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('task', 'property_id'), name='unique_failed_generation')],
+            },
+        ),
+    ]
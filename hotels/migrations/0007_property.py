@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_to_property(model_name, related_name, null=False):
+    # property_id keeps its column and unique index; only the model state
+    # changes, so existing rows stay where they are.
+    field = models.OneToOneField(
+        blank=null, null=null, db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING,
+        related_name=related_name, to='hotels.property',
+    )
+    return migrations.SeparateDatabaseAndState(state_operations=[
+        migrations.RemoveField(model_name=model_name, name='property_id'),
+        migrations.AddField(model_name=model_name, name='property', field=field),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0006_failedgeneration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Property',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('room_type', models.CharField(blank=True, max_length=64)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('description', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name_plural': 'properties',
+                'indexes': [
+                    models.Index(fields=['location'], name='property_location_idx'),
+                    models.Index(fields=['room_type', 'price'], name='property_room_type_price_idx'),
+                ],
+            },
+        ),
+        link_to_property('generatedhoteltd', 'rewrite', null=True),
+        link_to_property('generatedpropertysummary', 'summary'),
+        link_to_property('generatepropertyratingreview', 'rating_review'),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0007_property'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedhoteltd',
+            name='generated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generatedpropertysummary',
+            name='generated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generatepropertyratingreview',
+            name='generated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+    ]
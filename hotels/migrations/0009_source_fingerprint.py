@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0008_generated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedhoteltd',
+            name='source_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='generatedhoteltd',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='generatedpropertysummary',
+            name='source_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='generatedpropertysummary',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='generatepropertyratingreview',
+            name='source_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='generatepropertyratingreview',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0009_source_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workclaim',
+            name='run',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
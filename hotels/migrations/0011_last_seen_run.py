@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0010_workclaim_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedhoteltd',
+            name='last_seen_run',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='generatedpropertysummary',
+            name='last_seen_run',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='generatepropertyratingreview',
+            name='last_seen_run',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
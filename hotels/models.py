@@ -1,25 +1,115 @@
 
 from django.db import models
 
+
+class Property(models.Model):
+    """A source listing, loaded from the property CSV with ``import_properties``."""
+    id = models.IntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    location = models.CharField(max_length=255, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    room_type = models.CharField(max_length=64, blank=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    description = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name_plural = 'properties'
+        indexes = [
+            models.Index(fields=['location'], name='property_location_idx'),
+            models.Index(fields=['room_type', 'price'], name='property_room_type_price_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+# The generated rows point at Property without a database constraint, so the
+# generation commands keep working from the CSV alone, before (or without)
+# import_properties. The column is still property_id and stays unique.
+# source_fingerprint hashes the input fields the row was generated from, for
+# --changed-only; stale marks rows whose property left the input, and
+# last_seen_run stamps the rows a --changed-only run found in its input.
+def property_link(related_name, **options):
+    return models.OneToOneField(
+        Property, on_delete=models.DO_NOTHING, db_constraint=False, related_name=related_name, **options
+    )
+
+
 class GeneratedHotelTD(models.Model):
+    property = property_link('rewrite', null=True, blank=True)
     title = models.CharField(max_length=255)  
     description = models.TextField() 
+    generated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
+    source_fingerprint = models.CharField(max_length=32, blank=True, default='')
+    stale = models.BooleanField(default=False)
+    last_seen_run = models.CharField(max_length=32, blank=True, default='')
+
     def __str__(self):
         return self.title
 
 
 class GeneratedPropertySummary(models.Model):
-    property_id = models.IntegerField()  
+    property = property_link('summary')
     summary = models.TextField()
+    generated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
+    source_fingerprint = models.CharField(max_length=32, blank=True, default='')
+    stale = models.BooleanField(default=False)
+    last_seen_run = models.CharField(max_length=32, blank=True, default='')
 
     def __str__(self):
         return f"Summary for propertyID {self.property_id}"
 
 
 class GeneratePropertyRatingReview(models.Model):
-    property_id = models.IntegerField()  
+    property = property_link('rating_review')
     rating = models.DecimalField(max_digits=3, decimal_places=1) 
     review = models.TextField() 
+    generated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
+    source_fingerprint = models.CharField(max_length=32, blank=True, default='')
+    stale = models.BooleanField(default=False)
+    last_seen_run = models.CharField(max_length=32, blank=True, default='')
+
+    def __str__(self):
+        return f"Review for Property {self.property_id} - Rating: {self.rating}"
+
+class WorkClaim(models.Model):
+    """Lease on one (task, property) pair, so several workers can share a run.
+
+    ``done`` only holds for the run named in ``run``; a later run claims the
+    property afresh.
+    """
+    task = models.CharField(max_length=32)
+    property_id = models.IntegerField()
+    run = models.CharField(max_length=64, blank=True)
+    owner = models.CharField(max_length=128, blank=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    done = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'property_id'], name='unique_work_claim'),
+        ]
+        indexes = [
+            models.Index(fields=['task', 'owner', 'done'], name='work_claim_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} claim for property {self.property_id} by {self.owner or 'nobody'}"
+
+
+class FailedGeneration(models.Model):
+    """A row a task could not generate, kept so it can be replayed with --replay-failed."""
+    task = models.CharField(max_length=32)
+    property_id = models.IntegerField(null=True, blank=True)
+    row = models.JSONField()
+    error = models.TextField()
+    failed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'property_id'], name='unique_failed_generation'),
+        ]
 
     def __str__(self):
-        return f"Review for Property {self.property_id} - Rating: {self.rating}"
\ No newline at end of file
+        return f"{self.task} failed for property {self.property_id}: {self.error[:80]}"
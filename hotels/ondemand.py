@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from hotels.apicache import invalidate_model
+from hotels.llm import get_client
+from hotels.management.base import source_fingerprint
+from hotels.management.commands.write_summary import Command as WriteSummary
+from hotels.models import GeneratedPropertySummary
+from hotels.utils import summary_prompt
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """One in-flight generation. Every caller waiting for the same key reads its text from here."""
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.error = None
+        self._update = asyncio.Event()
+
+    def push(self, text):
+        self.parts.append(text)
+        self._notify()
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        update, self._update = self._update, asyncio.Event()
+        update.set()
+
+    async def wait_started(self):
+        """Wait until the first text arrives or the generation ends."""
+        while not self.parts and not self.done:
+            await self._update.wait()
+
+    async def tokens(self):
+        """Yield all text from the start, then new text as it arrives; raise the error if it failed."""
+        seen = 0
+        while True:
+            while seen < len(self.parts):
+                yield self.parts[seen]
+                seen += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._update.wait()
+
+
+class SingleFlight:
+    """Runs at most one generation per key and lets concurrent callers share it.
+
+    ``join`` returns the running ``Flight`` for a key if there is one, and
+    otherwise starts ``generate(flight)`` as a background task. That task
+    keeps running when the callers go away, so its result is still saved.
+    At most ``max_in_flight`` generations run at once; later ones wait their
+    turn. Must be used from a single event loop per process, as under ASGI.
+    """
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self.started = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._tasks = set()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphores[loop]
+
+    def join(self, key, generate):
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight
+        self.started += 1
+        flight = self._flights[key] = Flight()
+        task = asyncio.get_running_loop().create_task(self._run(key, flight, generate))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return flight
+
+    async def _run(self, key, flight, generate):
+        try:
+            async with self._semaphore():
+                await generate(flight)
+        except Exception as e:
+            logger.warning("On-demand generation for %s failed: %s", key, e)
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            del self._flights[key]
+
+
+summaries = SingleFlight(settings.ONDEMAND_MAX_IN_FLIGHT)
+
+
+def summary_generator(prop, client=None):
+    """Return a ``generate(flight)`` coroutine function that streams and saves the summary of ``prop``."""
+    async def generate(flight):
+        loop = asyncio.get_running_loop()
+        fields = {
+            'title': prop.title, 'description': prop.description, 'location': prop.location,
+            'price': prop.price, 'room_type': prop.room_type,
+        }
+        prompt = summary_prompt(**fields)
+
+        def on_token(text):
+            loop.call_soon_threadsafe(flight.push, text)
+
+        completion = await asyncio.to_thread(
+            (client or get_client()).complete, prompt,
+            stream=True, max_tokens=settings.ONDEMAND_MAX_TOKENS, on_token=on_token,
+        )
+        await GeneratedPropertySummary.objects.aupdate_or_create(
+            property_id=prop.id,
+            defaults={
+                'summary': completion.content,
+                # Same hash write_summary stores, so --changed-only can tell whether the input moved on.
+                'source_fingerprint': source_fingerprint(fields, WriteSummary.dedupe_fields),
+                'stale': False,
+            },
+        )
+        await sync_to_async(invalidate_model)(GeneratedPropertySummary)
+    return generate
@@ -0,0 +1,294 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
+
+PROFILERS = ('cprofile', 'sample')
+
+# From Python 3.12 cProfile is built on sys.monitoring, which takes one
+# profiler per process: a second one started in a worker thread fails with
+# "Another profiling tool is already active".
+PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+
+# The timer of the run being profiled. None outside --profile, so that
+# ``phase`` costs a global lookup and nothing else.
+_active = None
+_NOTHING = nullcontext()
+
+
+def phase(name):
+    """Context manager timing a block as ``name`` when a run is being profiled."""
+    if _active is None:
+        return _NOTHING
+    return _Phase(_active, name)
+
+
+def profiled(name):
+    """Decorator timing every call of a function as phase ``name``."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with _Phase(_active, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iter(name, iterable):
+    """Yield from ``iterable``, timing the work of producing each item as ``name``."""
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'wall', 'cpu', 'child_wall', 'child_cpu')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.child_wall = self.child_cpu = 0.0
+        self.timer._stack().append(self)
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        stack = self.timer._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.timer._add(self.name, wall, cpu, wall - self.child_wall, cpu - self.child_cpu)
+
+
+class PhaseTimer:
+    """Wall and CPU time spent in each named phase, over all threads.
+
+    Phases nest: a phase's self time leaves out the phases started inside it
+    on the same thread, so ``generate`` self time is what the command did
+    around its Ollama requests (building prompts, parsing replies).
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, name, wall, cpu, self_wall, self_cpu):
+        with self._lock:
+            totals = self.phases.setdefault(name, [0, 0.0, 0.0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            totals[3] += self_wall
+            totals[4] += self_cpu
+
+    def summary(self):
+        """``{phase: {calls, wall, cpu, self_wall, self_cpu}}``, in seconds."""
+        with self._lock:
+            return {
+                name: dict(zip(('calls', 'wall', 'cpu', 'self_wall', 'self_cpu'), totals))
+                for name, totals in self.phases.items()
+            }
+
+
+class ThreadedProfile:
+    """cProfile over the main thread and every thread started while it runs.
+
+    Before Python 3.12 only; later versions profile the main thread alone
+    (see ``PER_THREAD_CPROFILE``), and ``--profiler sample`` covers workers.
+    """
+
+    def __init__(self):
+        self.main = cProfile.Profile()
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def _bootstrap(self, frame, event, arg):
+        # Installed with threading.setprofile, so it runs once in each new
+        # thread and replaces itself with a profiler of that thread's own.
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            self.threads.append((threading.current_thread(), profile))
+        profile.enable()
+
+    def start(self):
+        if PER_THREAD_CPROFILE:
+            threading.setprofile(self._bootstrap)
+        self.main.enable()
+
+    def stop(self):
+        self.main.disable()
+        if PER_THREAD_CPROFILE:
+            threading.setprofile(None)
+
+    def stats(self):
+        stats = pstats.Stats(self.main)
+        with self._lock:
+            threads = list(self.threads)
+        # A profile can only be read safely once its thread has exited;
+        # background threads (health probes, hedges) that are still running are left out.
+        for thread, profile in threads:
+            if not thread.is_alive():
+                stats.add(profile)
+        return stats
+
+    def write(self, path, out):
+        if not PER_THREAD_CPROFILE:
+            out.write(
+                f"cProfile covers the main thread only on Python {sys.version_info.major}.{sys.version_info.minor}; "
+                "use --profiler sample to see worker threads.\n\n"
+            )
+        stats = self.stats()
+        stats.dump_stats(f"{path}.prof")
+        stats.stream = out
+        stats.sort_stats('cumulative').print_stats(40)
+        stats.sort_stats('tottime').print_stats(25)
+        return [f"{path}.prof"]
+
+
+class StackSampler:
+    """Samples the Python stack of every thread every ``interval`` seconds.
+
+    Much cheaper than cProfile on a busy run, and its cost does not grow with
+    the number of function calls. Idle threads are sampled too, so waiting
+    on a socket or a lock shows up next to the code that burns CPU.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def write(self, path, out):
+        with open(f"{path}.folded", 'w', encoding='utf-8') as folded:
+            for stack, count in self.stacks.most_common():
+                folded.write(f"{';'.join(stack)} {count}\n")
+
+        inclusive = Counter()
+        innermost = Counter()
+        for stack, count in self.stacks.items():
+            innermost[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        total = sum(self.stacks.values()) or 1
+        out.write(f"{self.samples} samples every {self.interval * 1000:.0f} ms, {total} thread stacks\n\n")
+        for title, counts in (('On top of the stack', innermost), ('Anywhere on the stack', inclusive)):
+            out.write(f"{title}:\n")
+            for function, count in counts.most_common(30):
+                out.write(f"  {count / total:6.1%}  {function}\n")
+            out.write('\n')
+        return [f"{path}.folded"]
+
+
+class RunProfile:
+    """Everything ``--profile`` records for one command run."""
+
+    def __init__(self, path, profiler=None):
+        self.path = path
+        self.timer = PhaseTimer()
+        self.profiler = {'cprofile': ThreadedProfile, 'sample': StackSampler}[profiler]() if profiler else None
+
+    def __enter__(self):
+        global _active
+        _active = self.timer
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        if self.profiler is not None:
+            self.profiler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        if self.profiler is not None:
+            self.profiler.stop()
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        _active = None
+
+    def write(self):
+        """Write the report to ``path`` and return the paths of the files written."""
+        out = io.StringIO()
+        out.write(f"Run: {self.wall:.2f}s wall, {self.cpu:.2f}s CPU (all threads)\n\n")
+        out.write(f"{'phase':<24}{'calls':>9}{'wall s':>11}{'cpu s':>11}{'self wall':>11}{'self cpu':>11}\n")
+        phases = sorted(self.timer.summary().items(), key=lambda item: -item[1]['self_wall'])
+        for name, totals in phases:
+            out.write(
+                f"{name:<24}{totals['calls']:>9}{totals['wall']:>11.3f}{totals['cpu']:>11.3f}"
+                f"{totals['self_wall']:>11.3f}{totals['self_cpu']:>11.3f}\n"
+            )
+        out.write(
+            "\nWall and CPU are summed over threads, so with --concurrency they can exceed the run time.\n"
+            "Self time leaves out nested phases: generate self time is prompt building and reply handling,\n"
+            "ollama self time is the HTTP request and waiting for the model.\n\n"
+        )
+        written = [self.path]
+        if self.profiler is not None:
+            written += self.profiler.write(self.path, out)
+        with open(self.path, 'w', encoding='utf-8') as report:
+            report.write(out.getvalue())
+        return written
+
+
+class PhasedClient:
+    """Wraps an Ollama client and times every request as phase ``name``."""
+
+    def __init__(self, client, name='ollama'):
+        self.client = client
+        self.name = name
+
+    def chat(self, prompt, **options):
+        with phase(self.name):
+            return self.client.chat(prompt, **options)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
@@ -2,14 +2,17 @@ from django.test import TestCase
 from django.core.management import call_command
 from unittest.mock import patch, Mock
 from io import StringIO
-from hotels.models import GeneratedHotelTD
+from django.conf import settings
+from hotels.llm import OllamaError
+from hotels.models import FailedGeneration, GeneratedHotelTD
 from hotels.management.commands.rewrite_titles_description import Command
+from hotels.utils import parse_batch_reply
 
 class RewriteHotelsCommandTests(TestCase):
     def setUp(self):
         self.command = Command()
         
-    @patch('hotels.management.commands.rewrite_titles_description.requests.post')
+    @patch('hotels.llm.requests.Session.post')
     def test_rewrite_with_ollama_successful(self, mock_post):
         # Mock successful API response
         mock_response = Mock()
@@ -39,29 +42,23 @@ class RewriteHotelsCommandTests(TestCase):
         self.assertEqual(call_args[1]['json']['model'], 'tinyllama:latest')
 
 
-    @patch('hotels.management.commands.rewrite_titles_description.requests.post')
-    def test_rewrite_with_ollama_api_failure(self, mock_post):
+    @patch('hotels.llm.time.sleep')
+    @patch('hotels.llm.requests.Session.post')
+    def test_rewrite_with_ollama_api_failure(self, mock_post, mock_sleep):
         # Mock failed API response
         mock_response = Mock()
         mock_response.status_code = 500
         mock_post.return_value = mock_response
 
-        original_title = "Original Hotel"
-        original_description = "Original description"
-        
-        title, description = self.command.rewrite_with_ollama(
-            original_title, 
-            original_description
-        )
-
-        # Should return original content on API failure
-        self.assertEqual(title, original_title)
-        self.assertEqual(description, original_description)
+        # The error surfaces after the retries instead of returning the original text
+        with self.assertRaises(OllamaError):
+            self.command.rewrite_with_ollama("Original Hotel", "Original description")
+        self.assertEqual(mock_post.call_count, 1 + settings.OLLAMA_MAX_RETRIES)
 
 
     @patch('builtins.open')
     @patch('csv.DictReader')
-    @patch('hotels.management.commands.rewrite_titles_description.requests.post')
+    @patch('hotels.llm.requests.Session.post')
     def test_handle_command(self, mock_post, mock_reader, mock_open):
         # Mock CSV data
         mock_reader.return_value = [
@@ -91,5 +88,91 @@ class RewriteHotelsCommandTests(TestCase):
         # Verify output message
         self.assertIn('Successfully processed', out.getvalue())
 
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_replayed_row_without_id_is_generated_once(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO("id,title,description\n,Hotel 3,Desc 3\n")
+        rejected = Mock(status_code=400, text='bad request')
+        ok = Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': 'New Title. Description: New'}}]})
+        mock_post.return_value = rejected
+        call_command('rewrite_titles_description', stdout=StringIO())
+        self.assertEqual(FailedGeneration.objects.get().property_id, None)
+
+        # Failing again replaces its failure instead of adding one
+        call_command('rewrite_titles_description', replay_failed=True, stdout=StringIO())
+        self.assertEqual(FailedGeneration.objects.count(), 1)
+
+        mock_post.return_value = ok
+        for _ in range(2):
+            call_command('rewrite_titles_description', replay_failed=True, stdout=StringIO())
+        self.assertEqual(GeneratedHotelTD.objects.count(), 1)
+        self.assertFalse(FailedGeneration.objects.exists())
+        self.assertEqual(mock_post.call_count, 3)
+
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_row_with_non_integer_id_is_rejected(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description\n"
+            "1,Hotel 1,Desc 1\n"
+            "A-7,Hotel 2,Desc 2\n"
+            ",Hotel 3,Desc 3\n"
+        )
+        mock_post.return_value = Mock(
+            status_code=200, json=lambda: {'choices': [{'message': {'content': 'New Title. Description: New'}}]}
+        )
+
+        out = StringIO()
+        call_command('rewrite_titles_description', stdout=out)
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(sorted(GeneratedHotelTD.objects.values_list('property_id', flat=True), key=str), [1, None])
+        self.assertIn('Read 2 rows (1 rejected)', out.getvalue())
+
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_prompt_batch_retries_items_missing_from_reply(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description\n"
+            "1,Hotel 1,Desc 1\n"
+            "2,Hotel 2,Desc 2\n"
+            "3,Hotel 3,Desc 3\n"
+        )
+
+        def reply(url, **kwargs):
+            prompt = kwargs['json']['messages'][0]['content']
+            if 'each of the following 3 properties' in prompt:
+                # Property 3 is missing and property 2 has no description.
+                content = '[{"id": 1, "title": "Batched 1", "description": "New 1"}, {"id": "2", "title": "Batched 2"}]'
+            else:
+                content = 'Single. Description: Retried'
+            return Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': content}}]})
+
+        mock_post.side_effect = reply
+        out = StringIO()
+        call_command('rewrite_titles_description', prompt_batch=3, stdout=out)
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(GeneratedHotelTD.objects.get(property_id=1).title, 'Batched 1')
+        self.assertEqual(GeneratedHotelTD.objects.get(property_id=2).description, 'Retried')
+        self.assertEqual(GeneratedHotelTD.objects.get(property_id=3).title, 'Single.')
+        self.assertIn('1 batched requests for 3 rows, 2 retried individually', out.getvalue())
+
+
+class ParseBatchReplyTest(TestCase):
+    def parse_title(self, entry):
+        if not entry.get('title'):
+            raise ValueError('no title')
+        return entry['title']
+
+    def test_maps_entries_back_to_ids(self):
+        content = 'Sure:\n```json\n{"results": [{"ID": 7, "title": "B"}, {"id": "5", "title": "A"}]}\n```'
+        self.assertEqual(parse_batch_reply(content, ['5', '7'], self.parse_title), {'5': 'A', '7': 'B'})
+
+    def test_drops_unknown_repeated_and_invalid_entries(self):
+        content = '[{"id": 1, "title": "A"}, {"id": 1, "title": "A2"}, {"id": 2}, {"id": 9, "title": "X"}, {"id": 3, "title": "C"}]'
+        self.assertEqual(parse_batch_reply(content, ['1', '2', '3'], self.parse_title), {'3': 'C'})
 
-    
\ No newline at end of file
+    def test_reply_without_array_raises(self):
+        with self.assertRaises(ValueError):
+            parse_batch_reply('{"id": 1, "title": "A"}', ['1'], self.parse_title)
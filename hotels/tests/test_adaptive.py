@@ -0,0 +1,157 @@
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from hotels.adaptive import AdaptiveClient, AIMDLimiter, prompt_template
+from hotels.engine import run_ordered
+from hotels.llm import OllamaClient, OllamaError, OllamaTimeout, RetryPolicy
+from hotels.models import GeneratedPropertySummary
+
+
+class AIMDLimiterTests(SimpleTestCase):
+    def test_grows_up_to_max_while_within_target(self):
+        limiter = AIMDLimiter(max_limit=8, target_latency=1.0)
+        with self.assertLogs('hotels.adaptive', 'INFO'):
+            for _ in range(50):
+                limiter.on_success(time.monotonic(), 0.1)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_backs_off_once_per_overload_burst(self):
+        limiter = AIMDLimiter(max_limit=16, target_latency=1.0)
+        with self.assertLogs('hotels.adaptive', 'INFO'):
+            for _ in range(20):
+                limiter.on_success(time.monotonic(), 0.1)
+        self.assertEqual(limiter.limit, 16)
+
+        started = time.monotonic()
+        with self.assertLogs('hotels.adaptive', 'INFO') as logs:
+            for _ in range(5):
+                limiter.on_overload(started, 'HTTP 503')
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(limiter.decreases, {'overload': 1})
+        self.assertIn('Concurrency limit 16 -> 8: HTTP 503', logs.output[0])
+
+        # Once out of slow start, growth is about one per round of requests.
+        with self.assertLogs('hotels.adaptive', 'INFO'):
+            for _ in range(9):
+                limiter.on_success(time.monotonic(), 0.1)
+        self.assertEqual(limiter.limit, 9)
+
+    def test_backs_off_when_latency_rises_above_baseline(self):
+        limiter = AIMDLimiter(max_limit=16, smoothing=1.0)
+        with self.assertLogs('hotels.adaptive', 'INFO') as logs:
+            for _ in range(4):
+                limiter.on_success(time.monotonic(), 0.1)
+            self.assertEqual(limiter.limit, 5)
+
+            limiter.on_success(time.monotonic(), 0.5)
+        self.assertIn('latency 0.50s over target 0.20s', logs.output[-1])
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.decreases, {'latency': 1})
+
+    def test_mixed_prompt_lengths_do_not_pin_the_limit(self):
+        """Test that alternating fast and slow prompts are each held to their own target"""
+        limiter = AIMDLimiter(max_limit=8)
+        with self.assertLogs('hotels.adaptive', 'INFO'):
+            for _ in range(20):
+                limiter.on_success(time.monotonic(), 0.2, 'rating')
+                limiter.on_success(time.monotonic(), 6.0, 'review')
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(limiter.decreases, {})
+
+        with self.assertLogs('hotels.adaptive', 'INFO') as logs:
+            for _ in range(5):
+                limiter.on_success(time.monotonic(), 20.0, 'review')
+        self.assertIn('over target 12.00s', logs.output[0])
+
+    def test_prompt_template(self):
+        rating = prompt_template('Assign a rating out of 5 stars for this property:\nTitle: Inn')
+        self.assertEqual(rating, prompt_template('Assign a rating out of 5 stars for this property:\nTitle: Lodge'))
+        self.assertEqual(rating, 'Assign a rating out of # stars for this property')
+        self.assertEqual(
+            prompt_template('Rewrite each of the following 8 properties.\n\nid: 1'),
+            prompt_template('Rewrite each of the following 3 properties.\n\nid: 9'),
+        )
+        self.assertNotEqual(rating, prompt_template('Generate a detailed review for the following property:\n'))
+
+
+class AdaptiveClientTests(SimpleTestCase):
+    def test_overload_and_timeouts_are_reported(self):
+        limiter = Mock()
+        inner = Mock()
+        inner.chat.side_effect = [OllamaError('busy', status_code=503), OllamaTimeout('slow'), OllamaError('bad', 400), 'ok']
+        client = AdaptiveClient(inner, limiter)
+
+        for error in (OllamaError, OllamaTimeout, OllamaError):
+            with self.assertRaises(error):
+                client.chat('prompt')
+        self.assertEqual(client.chat('prompt'), 'ok')
+
+        reasons = [call[0][1] for call in limiter.on_overload.call_args_list]
+        self.assertEqual(reasons, ['HTTP 503', 'timeout'])
+        limiter.on_success.assert_called_once()
+
+
+    @patch('hotels.llm.requests.Session.post')
+    def test_overloads_retried_by_the_client_are_reported(self, mock_post):
+        busy = Mock(status_code=429, text='busy', headers={})
+        ok = Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': 'ok'}}]})
+        mock_post.side_effect = [busy, busy, ok]
+        limiter = AIMDLimiter(max_limit=16, target_latency=10.0)
+        client = AdaptiveClient(OllamaClient(retry=RetryPolicy(max_retries=3, backoff=0)), limiter)
+        self.addCleanup(client.close)
+
+        with self.assertLogs('hotels.adaptive', 'INFO'):
+            for _ in range(7):
+                limiter.on_success(time.monotonic(), 0.1)
+            self.assertEqual(limiter.limit, 8)
+            self.assertEqual(client.chat('prompt'), 'ok')
+
+        self.assertEqual(mock_post.call_count, 3)
+        # Both 429s came from one request, so the limit backs off once.
+        self.assertEqual(limiter.decreases, {'overload': 1})
+        self.assertLess(limiter.limit, 8)
+
+
+class AdaptiveEngineTests(SimpleTestCase):
+    def test_in_flight_follows_the_limiter(self):
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+        limiter = Mock(limit=2)
+
+        def work(n):
+            with lock:
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+            time.sleep(0.005)
+            with lock:
+                state['current'] -= 1
+            return n
+
+        results = [result for _, result in run_ordered(work, range(20), concurrency=8, limiter=limiter)]
+        self.assertEqual(results, list(range(20)))
+        self.assertLessEqual(state['peak'], 2)
+
+
+class AdaptiveCommandTests(TestCase):
+    @patch('hotels.llm.requests.Session.post')
+    def test_adaptive_run_reports_the_limit(self, mock_post):
+        mock_post.return_value = Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': 'A summary'}}]})
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'hotels.csv')
+            with open(input_path, 'w') as file:
+                file.write('id,title,description,location,price,room_type\n')
+                for n in range(1, 11):
+                    file.write(f'{n},Hotel {n},Desc,Town,100,Suite\n')
+
+            out = StringIO()
+            with self.assertLogs('hotels.adaptive', 'INFO'):
+                call_command('write_summary', input=input_path, concurrency=4, adaptive=True, stdout=out)
+
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 10)
+        self.assertIn('Adaptive concurrency: limit between 1 and 4', out.getvalue())
@@ -0,0 +1,69 @@
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from hotels.apicache import invalidate_model
+from hotels.models import GeneratedHotelTD, GeneratedPropertySummary, GeneratePropertyRatingReview, Property
+
+
+class ReadApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for n in range(1, 6):
+            Property.objects.create(id=n, title=f'Hotel {n}', location='Dhaka', room_type='Suite', price=Decimal('100'))
+        GeneratedHotelTD.objects.create(property_id=1, title='New Title', description='New Description')
+        GeneratedPropertySummary.objects.create(property_id=1, summary='A summary')
+        GeneratePropertyRatingReview.objects.create(property_id=1, rating=Decimal('4.5'), review='Great')
+
+    def test_properties_are_paged_by_id(self):
+        with self.assertNumQueries(1):
+            page = self.client.get('/api/properties/', {'limit': 2}).json()
+        self.assertEqual([row['id'] for row in page['results']], [1, 2])
+        self.assertEqual(page['results'][0]['rewrite'], {'title': 'New Title', 'description': 'New Description'})
+        self.assertEqual(page['results'][0]['summary'], 'A summary')
+        self.assertEqual(page['results'][0]['rating_review'], {'rating': '4.5', 'review': 'Great'})
+        self.assertIsNone(page['results'][1]['summary'])
+
+        ids = [row['id'] for row in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            ids += [row['id'] for row in page['results']]
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+
+    def test_generated_lists_and_detail(self):
+        self.assertEqual(self.client.get('/api/summaries/').json()['results'], [{'property_id': 1, 'summary': 'A summary'}])
+        self.assertEqual(self.client.get('/api/reviews/').json()['results'][0]['rating'], '4.5')
+        self.assertEqual(self.client.get('/api/rewrites/').json()['results'][0]['title'], 'New Title')
+        self.assertEqual(self.client.get('/api/properties/3/').json()['title'], 'Hotel 3')
+        self.assertEqual(self.client.get('/api/properties/99/').status_code, 404)
+        self.assertEqual(self.client.get('/api/properties/', {'limit': 'many'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/properties/').status_code, 405)
+
+    def test_conditional_get_and_caching(self):
+        first = self.client.get('/api/summaries/')
+        self.assertEqual(self.client.get('/api/summaries/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        GeneratedPropertySummary.objects.create(property_id=2, summary='Another')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/summaries/').content, first.content)
+
+        invalidate_model(GeneratedPropertySummary)
+        second = self.client.get('/api/summaries/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json()['results']), 2)
+
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_generation_commit_invalidates_the_views(self, mock_post, mock_open):
+        self.assertEqual(self.client.get('/api/properties/2/').json()['summary'], None)
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,price,room_type\n2,Hotel 2,Desc,Dhaka,100,Suite\n"
+        )
+        mock_post.return_value = Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': 'Fresh'}}]})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('write_summary', stdout=StringIO())
+
+        self.assertEqual(self.client.get('/api/properties/2/').json()['summary'], 'Fresh')
@@ -0,0 +1,105 @@
+import time
+from unittest.mock import patch
+from django.test import SimpleTestCase, override_settings
+from hotels import llm
+from hotels.balancer import BalancedClient, Backend, parse_backends
+from hotels.engine import run_ordered
+from hotels.fakeollama import FakeOllamaServer
+from hotels.llm import OllamaError, RetryPolicy
+
+
+class ParseBackendsTests(SimpleTestCase):
+    def test_urls_with_options(self):
+        backends = parse_backends('http://gpu1:11434 weight=2 max_in_flight=8, http://gpu2:11434/')
+        self.assertEqual([b.url for b in backends], ['http://gpu1:11434', 'http://gpu2:11434'])
+        self.assertEqual((backends[0].weight, backends[0].max_in_flight), (2.0, 8))
+        self.assertEqual(backends[1].weight, 1.0)
+        with self.assertRaises(ValueError):
+            parse_backends('http://gpu1:11434 speed=2')
+
+
+class BalancedClientTests(SimpleTestCase):
+    def start_servers(self, count, latency_ms=0):
+        servers = [FakeOllamaServer(latency='fixed', latency_ms=latency_ms).start() for _ in range(count)]
+        for server in servers:
+            self.addCleanup(server.stop)
+        return servers
+
+    def balanced(self, backends, **options):
+        client = BalancedClient(backends, retry=RetryPolicy(max_retries=2), probe_interval=0, **options)
+        self.addCleanup(client.close)
+        return client
+
+    def test_requests_follow_weights(self):
+        first, second = self.start_servers(2)
+        client = self.balanced([Backend(first.url, weight=2), Backend(second.url)])
+        for _ in range(30):
+            client.chat('Generate a summary')
+        self.assertEqual((first.stats()['requests'], second.stats()['requests']), (20, 10))
+
+    def test_in_flight_stays_within_each_backend_limit(self):
+        servers = self.start_servers(2, latency_ms=20)
+        client = self.balanced([Backend(server.url, max_in_flight=2) for server in servers])
+
+        list(run_ordered(lambda n: client.chat('Generate a summary'), range(24), concurrency=8))
+
+        requests = [server.stats()['requests'] for server in servers]
+        self.assertEqual(sum(requests), 24)
+        self.assertGreaterEqual(min(requests), 8)
+        self.assertTrue(all(server.stats()['peak_in_flight'] <= 2 for server in servers))
+
+    @patch('hotels.balancer.time.sleep')
+    def test_failing_backend_is_ejected_and_readmitted(self, mock_sleep):
+        good, bad = self.start_servers(2)
+        bad.available = False
+        client = self.balanced([Backend(good.url), Backend(bad.url)], eject_after=2)
+
+        with self.assertLogs('hotels.balancer', 'WARNING') as logs:
+            for _ in range(10):
+                self.assertTrue(client.chat('Generate a summary'))
+        self.assertIn('Ejecting Ollama backend', logs.output[0])
+        self.assertEqual(bad.stats()['requests'], 0)
+        self.assertEqual(good.stats()['requests'], 10)
+        self.assertEqual([b['healthy'] for b in client.backend_stats()], [True, False])
+
+        bad.available = True
+        with self.assertLogs('hotels.balancer', 'WARNING') as logs:
+            client.probe()
+        self.assertIn('re-admitting', logs.output[0])
+        for _ in range(4):
+            client.chat('Generate a summary')
+        self.assertEqual(bad.stats()['requests'], 2)
+
+    @patch('hotels.balancer.time.sleep')
+    def test_no_healthy_backend(self, mock_sleep):
+        (server,) = self.start_servers(1)
+        server.available = False
+        client = self.balanced([Backend(server.url)], eject_after=1)
+
+        with self.assertLogs('hotels.balancer', 'WARNING'), self.assertRaises(OllamaError) as error:
+            client.chat('Generate a summary')
+        self.assertIn('No healthy Ollama backend', str(error.exception))
+        self.assertTrue(error.exception.retryable)
+
+    def test_probe_thread_ejects_unreachable_backends(self):
+        (server,) = self.start_servers(1)
+        client = BalancedClient([Backend(server.url), Backend('http://127.0.0.1:9')], probe_interval=0.01,
+                                eject_after=1, probe_timeout=0.5)
+        self.addCleanup(client.close)
+        with self.assertLogs('hotels.balancer', 'WARNING'):
+            client.start()
+            for _ in range(200):
+                if not client.backend_stats()[1]['healthy']:
+                    break
+                time.sleep(0.01)
+        self.assertEqual([b['healthy'] for b in client.backend_stats()], [True, False])
+
+    def test_get_client_uses_the_configured_backends(self):
+        first, second = self.start_servers(2)
+        self.addCleanup(setattr, llm, '_client', None)
+        llm._client = None
+        with override_settings(OLLAMA_BACKENDS=f"{first.url}, {second.url} weight=3", OLLAMA_PROBE_INTERVAL=0):
+            client = llm.get_client()
+        self.assertIsInstance(client, BalancedClient)
+        self.assertEqual([b.weight for b in client.backends], [1.0, 3.0])
+        client.close()
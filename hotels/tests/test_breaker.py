@@ -0,0 +1,66 @@
+import threading
+import time
+from unittest.mock import Mock
+from django.test import SimpleTestCase
+from hotels.breaker import BreakerClient, CircuitBreaker, CircuitOpen, CLOSED, OPEN
+from hotels.llm import OllamaError
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_consecutive_outage_failures(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=0.05)
+        inner = Mock()
+        inner.chat.side_effect = OllamaError('refused')
+        client = BreakerClient(inner, breaker)
+
+        with self.assertLogs('hotels.breaker', 'WARNING'):
+            for _ in range(3):
+                with self.assertRaises(OllamaError):
+                    client.chat('prompt')
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.opened, 1)
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        breaker = CircuitBreaker(threshold=2)
+        inner = Mock()
+        inner.chat.side_effect = OllamaError('bad request', status_code=400)
+        client = BreakerClient(inner, breaker)
+
+        for _ in range(5):
+            with self.assertRaises(OllamaError):
+                client.chat('prompt')
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_callers_wait_for_a_successful_probe(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0.1)
+        with self.assertLogs('hotels.breaker', 'WARNING') as logs:
+            breaker.on_failure(OllamaError('refused'))
+
+            released = []
+
+            def caller():
+                breaker.before_request()
+                released.append(time.monotonic())
+
+            started = time.monotonic()
+            threads = [threading.Thread(target=caller) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.2)
+            # Only the probe got through after the cooldown; the others wait on it.
+            self.assertEqual(len(released), 1)
+            self.assertGreaterEqual(released[0] - started, 0.09)
+
+            breaker.on_success()
+            for thread in threads:
+                thread.join(1)
+        self.assertEqual(len(released), 3)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertIn('Ollama is back', logs.output[-1])
+
+    def test_gives_up_after_max_wait(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=10, max_wait=0.05)
+        with self.assertLogs('hotels.breaker', 'WARNING'):
+            breaker.on_failure(OllamaError('refused'))
+        with self.assertRaises(CircuitOpen):
+            breaker.before_request()
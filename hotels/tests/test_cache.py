@@ -0,0 +1,137 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from hotels.cache import CachedClient, ResponseCache, cache_if_accepted
+from hotels.models import FailedGeneration, GeneratePropertyRatingReview
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def open_cache(self, **kwargs):
+        cache = ResponseCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_key_depends_on_model_prompt_and_options(self):
+        """Test that every part of the request changes the cache key"""
+        key = ResponseCache.make_key('m', 'p', {'temperature': 0})
+        self.assertEqual(key, ResponseCache.make_key('m', 'p', {'temperature': 0}))
+        self.assertNotEqual(key, ResponseCache.make_key('other', 'p', {'temperature': 0}))
+        self.assertNotEqual(key, ResponseCache.make_key('m', 'other', {'temperature': 0}))
+        self.assertNotEqual(key, ResponseCache.make_key('m', 'p', {'temperature': 1}))
+
+    def test_entries_survive_reopening(self):
+        """Test that replies persist on disk between runs"""
+        self.open_cache().set('k', 'value')
+        cache = self.open_cache()
+        self.assertEqual(cache.get('k'), 'value')
+        self.assertEqual(cache.get('missing'), None)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test that the cache stays under max_bytes by dropping the oldest reads"""
+        cache = self.open_cache(max_bytes=25)
+        cache.set('a', 'x' * 10)
+        cache.set('b', 'x' * 10)
+        cache.get('a')
+        cache.set('c', 'x' * 10)
+
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 'x' * 10)
+        self.assertEqual(cache.get('c'), 'x' * 10)
+        self.assertLessEqual(cache.stats()['bytes'], 25)
+
+
+class CachedClientTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache(':memory:')
+        self.addCleanup(self.cache.close)
+        self.inner = Mock(model='tinyllama:latest')
+        self.inner.chat.return_value = 'generated'
+
+    def test_repeated_prompt_is_served_from_cache(self):
+        """Test that an identical prompt only reaches Ollama once"""
+        client = CachedClient(self.inner, self.cache)
+        self.assertEqual(client.chat('prompt'), 'generated')
+        self.assertEqual(client.chat('prompt'), 'generated')
+        self.inner.chat.assert_called_once_with('prompt')
+
+    def test_refresh_bypasses_reads(self):
+        """Test that refresh mode always asks Ollama and updates the cache"""
+        CachedClient(self.inner, self.cache).chat('prompt')
+        self.inner.chat.return_value = 'newer'
+        self.assertEqual(CachedClient(self.inner, self.cache, refresh=True).chat('prompt'), 'newer')
+        self.assertEqual(CachedClient(self.inner, self.cache).chat('prompt'), 'newer')
+
+    def test_rejected_replies_are_not_cached(self):
+        """Test that a reply is only stored once the block using it succeeds"""
+        client = CachedClient(self.inner, self.cache)
+        with self.assertRaises(ValueError):
+            with cache_if_accepted():
+                client.chat('prompt')
+                raise ValueError('unparseable')
+        self.assertEqual(len(self.cache), 0)
+
+        with cache_if_accepted():
+            client.chat('prompt')
+            self.assertEqual(len(self.cache), 0)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_rejected_cached_replies_are_deleted(self):
+        """Test that a cached reply the caller cannot use is dropped"""
+        client = CachedClient(self.inner, self.cache)
+        client.chat('prompt')
+        with self.assertRaises(ValueError):
+            with cache_if_accepted():
+                client.chat('prompt')
+                raise ValueError('unparseable')
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats()['bytes'], 0)
+
+    def test_nested_blocks_keep_replies_until_the_outer_one_succeeds(self):
+        client = CachedClient(self.inner, self.cache)
+        with self.assertRaises(ValueError):
+            with cache_if_accepted():
+                with cache_if_accepted():
+                    client.chat('prompt')
+                raise ValueError('unparseable')
+        self.assertEqual(len(self.cache), 0)
+
+
+class CommandCacheTests(TestCase):
+    @patch('builtins.open')
+    @patch('requests.Session.post')
+    def test_unparseable_reply_is_asked_again_on_replay(self, mock_post, mock_open):
+        """Test that a reply the command rejected is neither cached nor replayed from the cache"""
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        replies = {'rating': 'I would rather not say.'}
+
+        def reply(url, **kwargs):
+            prompt = kwargs['json']['messages'][0]['content']
+            content = replies['rating'] if prompt.startswith('Assign a rating') else 'A fine place.'
+            return Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': content}}]})
+
+        mock_post.side_effect = reply
+        mock_open.side_effect = lambda *args, **kwargs: StringIO(
+            "id,title,description,location,room_type,price\n1,Hotel 1,Nice hotel,Downtown,Suite,200\n"
+        )
+        call_command('generate_rating_review', cache_path=path, stdout=StringIO())
+        self.assertTrue(FailedGeneration.objects.filter(property_id=1).exists())
+        cache = ResponseCache(path)
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+        replies['rating'] = 'Rating: 4.2 stars'
+        call_command('generate_rating_review', cache_path=path, replay_failed=True, stdout=StringIO())
+        self.assertEqual(str(GeneratePropertyRatingReview.objects.get(property_id=1).rating), '4.2')
+        self.assertFalse(FailedGeneration.objects.exists())
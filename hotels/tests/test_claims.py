@@ -0,0 +1,68 @@
+from datetime import timedelta
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from hotels.claims import WorkClaimer, parse_shard, shard_of
+from hotels.models import WorkClaim
+
+
+class WorkClaimerTests(TestCase):
+    def test_live_leases_are_not_shared(self):
+        """Test that two workers never claim the same property"""
+        first = WorkClaimer('summary', 'run-1', owner='worker-1')
+        second = WorkClaimer('summary', 'run-1', owner='worker-2')
+
+        self.assertEqual(first.claim([1, 2, 3]), {1, 2, 3})
+        self.assertEqual(second.claim([2, 3, 4]), {4})
+
+    def test_expired_lease_can_be_taken_over(self):
+        """Test that properties of a dead worker become claimable again"""
+        WorkClaimer('summary', 'run-1', owner='worker-1').claim([1])
+        WorkClaim.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(WorkClaimer('summary', 'run-1', owner='worker-2').claim([1]), {1})
+        self.assertEqual(WorkClaim.objects.get(property_id=1).owner, 'worker-2')
+
+    def test_completed_properties_are_not_reclaimed_in_the_same_run(self):
+        """Test that finished work is skipped by every worker of the run"""
+        first = WorkClaimer('summary', 'run-1', owner='worker-1')
+        first.claim([1, 2])
+        first.complete([1])
+        first.release()
+
+        self.assertEqual(WorkClaimer('summary', 'run-1', owner='worker-2').claim([1, 2]), {2})
+
+    def test_a_new_run_claims_completed_properties_again(self):
+        """Test that done claims of an earlier run do not hold back a new one"""
+        first = WorkClaimer('summary', 'run-1', owner='worker-1')
+        first.claim([1, 2])
+        first.complete([1, 2])
+        first.release()
+
+        second = WorkClaimer('summary', 'run-2', owner='worker-1')
+        self.assertEqual(second.claim([1, 2]), {1, 2})
+        self.assertFalse(WorkClaim.objects.filter(done=True).exists())
+        self.assertEqual(set(WorkClaim.objects.values_list('run', flat=True)), {'run-2'})
+
+    def test_a_new_run_waits_for_live_leases_of_an_old_one(self):
+        """Test that a straggler of the previous run keeps its lease until it expires"""
+        WorkClaimer('summary', 'run-1', owner='worker-1').claim([1])
+
+        self.assertEqual(WorkClaimer('summary', 'run-2', owner='worker-2').claim([1]), set())
+
+    def test_tasks_are_claimed_independently(self):
+        """Test that the same property can be claimed once per task"""
+        self.assertEqual(WorkClaimer('summary', 'run-1', owner='worker-1').claim([1]), {1})
+        self.assertEqual(WorkClaimer('rewrite', 'run-1', owner='worker-2').claim([1]), {1})
+
+
+class ShardTests(SimpleTestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('1/4'), (1, 4))
+        for value in ['4/4', '-1/2', '1', 'a/b', '0/0']:
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_every_property_lands_on_exactly_one_shard(self):
+        shards = [shard_of(property_id, {}, 3) for property_id in range(30)]
+        self.assertEqual(sorted(set(shards)), [0, 1, 2])
+        self.assertEqual(shards.count(0), 10)
@@ -0,0 +1,109 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from hotels.dedupe import DuplicateIndex, MinHasher, normalize
+from hotels.models import GeneratedHotelTD, GeneratedPropertySummary
+
+HOTEL = {
+    'title': 'Hilton Garden Inn Downtown',
+    'description': 'Modern rooms with free wifi, a fitness center and an indoor pool close to the convention center.',
+    'location': 'Denver', 'price': '180', 'room_type': 'Double',
+}
+SIMILAR = {
+    **HOTEL,
+    'title': 'Hilton Garden Inn - Downtown!',
+    'description': 'Modern rooms with free WiFi, a fitness centre and an indoor pool close to the convention center.',
+}
+OTHER = {**HOTEL, 'title': 'Cozy cabin', 'description': 'A small cabin in the woods with a fireplace.'}
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_case_punctuation_and_spacing_are_ignored(self):
+        self.assertEqual(normalize('  Sea View, Suite!\n'), normalize('sea   view suite'))
+        self.assertEqual(normalize('ＣＡＦÉ'), 'café')
+
+
+class MinHasherTests(SimpleTestCase):
+    def test_similar_texts_have_similar_signatures(self):
+        hasher = MinHasher(num_perm=128)
+        base = hasher.signature(normalize(HOTEL['description']))
+        self.assertGreater((base == hasher.signature(normalize(SIMILAR['description']))).mean(), 0.7)
+        self.assertLess((base == hasher.signature(normalize(OTHER['description']))).mean(), 0.2)
+
+
+class DuplicateIndexTests(SimpleTestCase):
+    def test_exact_and_near_matches(self):
+        index = DuplicateIndex(('title', 'description'), near=True)
+        self.assertIsNone(index.match(HOTEL))
+        self.assertEqual(index.match({**HOTEL, 'title': 'HILTON garden inn downtown.'}), (0, 'exact'))
+        self.assertEqual(index.match(SIMILAR), (0, 'near'))
+        self.assertIsNone(index.match(OTHER))
+
+    def test_exact_mode_ignores_similar_rows(self):
+        index = DuplicateIndex(('title', 'description'))
+        index.match(HOTEL)
+        self.assertIsNone(index.match(SIMILAR))
+
+    def test_other_fields_must_match_exactly(self):
+        index = DuplicateIndex(('title', 'description', 'price'), near=True)
+        index.match(HOTEL)
+        self.assertIsNone(index.match({**SIMILAR, 'price': '95'}))
+
+    def test_followers_get_the_representative_result(self):
+        index = DuplicateIndex(('title', 'description'), max_results=1)
+        first = dict(HOTEL)
+        index.match(first)
+        key, _ = index.match(dict(HOTEL))
+        index.remember(first, 'rewritten')
+
+        # Storing another result would evict the first, but it still has a follower.
+        other = dict(OTHER)
+        index.match(other)
+        index.remember(other, 'other')
+        self.assertEqual(index.result(key), 'rewritten')
+
+        # Once the follower is served, the next result evicts it and a later duplicate is generated again.
+        third = {**OTHER, 'title': 'Third'}
+        index.match(third)
+        index.remember(third, 'third')
+        self.assertIsNone(index.match(dict(HOTEL)))
+
+
+class DedupeCommandTests(TestCase):
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_rewrite_generates_once_per_duplicate_group(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description\n"
+            "1,Sea View Suite,Bright suite facing the harbour.\n"
+            "2,Garden Room,Quiet room facing the garden.\n"
+            "3,Sea view suite!,Bright suite facing the harbour\n"
+        )
+        mock_post.return_value = Mock(status_code=200, json=lambda: {
+            'choices': [{'message': {'content': 'New Title. Description: New Description'}}]
+        })
+
+        out = StringIO()
+        call_command('rewrite_titles_description', dedupe='exact', stdout=out)
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(GeneratedHotelTD.objects.count(), 3)
+        self.assertEqual(GeneratedHotelTD.objects.get(property_id=3).title, 'New Title.')
+        self.assertIn('reused results for 1 exact and 0 near duplicates, avoiding about 1 Ollama requests', out.getvalue())
+
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_summary_does_not_reuse_across_prices(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,price,room_type\n"
+            "1,Sea View Suite,Bright suite,Harbour,200,Suite\n"
+            "2,Sea View Suite,Bright suite,Harbour,120,Suite\n"
+            "3,Sea View Suite,Bright suite,Harbour,200,Suite\n"
+        )
+        mock_post.return_value = Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': 'A summary'}}]})
+
+        call_command('write_summary', dedupe='near', stdout=StringIO())
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 3)
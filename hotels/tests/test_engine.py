@@ -0,0 +1,83 @@
+import threading
+import time
+from django.test import SimpleTestCase
+from hotels.engine import request_started, run_ordered
+
+
+class RunOrderedTests(SimpleTestCase):
+    def test_results_keep_input_order(self):
+        """Test that results come back in input order even when later items finish first"""
+        def slow_for_small(n):
+            time.sleep(0.01 * (5 - n))
+            return n * 10
+
+        results = list(run_ordered(slow_for_small, range(5), concurrency=4))
+        self.assertEqual(results, [(n, n * 10) for n in range(5)])
+
+    def test_in_flight_is_bounded(self):
+        """Test that no more than `concurrency` calls run at the same time"""
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+
+        def work(n):
+            with lock:
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+            time.sleep(0.005)
+            with lock:
+                state['current'] -= 1
+            return n
+
+        results = [result for _, result in run_ordered(work, range(40), concurrency=3)]
+        self.assertEqual(results, list(range(40)))
+        self.assertLessEqual(state['peak'], 3)
+
+    def test_sequential_when_concurrency_is_one(self):
+        """Test that concurrency=1 calls func on the caller's thread"""
+        caller = threading.current_thread()
+        threads = [thread for _, thread in run_ordered(lambda n: threading.current_thread(), range(3))]
+        self.assertTrue(all(thread is caller for thread in threads))
+
+    def test_worker_errors_are_raised_to_the_caller(self):
+        """Test that an exception in a worker surfaces when its result is consumed"""
+        def fail_on_two(n):
+            if n == 2:
+                raise ValueError('boom')
+            return n
+
+        with self.assertRaises(ValueError):
+            list(run_ordered(fail_on_two, range(5), concurrency=2))
+
+    def test_queue_wait_runs_until_the_request_starts(self):
+        """Test that waiting for a shared resource inside the call counts as queue wait"""
+        connection = threading.Lock()
+        waits = []
+
+        def work(n):
+            with connection:
+                request_started()
+                time.sleep(0.05)
+            return n
+
+        list(run_ordered(work, range(2), concurrency=2, on_wait=waits.append))
+        self.assertEqual(len(waits), 2)
+        self.assertGreater(max(waits), 0.04)
+
+    def test_items_without_a_request_report_no_wait(self):
+        """Test that rows answered without an HTTP request are left out"""
+        waits = []
+        list(run_ordered(lambda n: n, range(3), on_wait=waits.append))
+        self.assertEqual(waits, [])
+
+    def test_closing_does_not_wait_for_calls_in_flight(self):
+        """Test that stopping early returns at once instead of waiting for slow requests"""
+        def work(n):
+            if n:
+                time.sleep(0.5)
+            return n
+
+        results = run_ordered(work, range(4), concurrency=2)
+        self.assertEqual(next(results), (0, 0))
+        started = time.perf_counter()
+        results.close()
+        self.assertLess(time.perf_counter() - started, 0.3)
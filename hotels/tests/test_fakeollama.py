@@ -0,0 +1,80 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase, TestCase
+from hotels.benchmark import percentile, run_command, write_synthetic_csv
+from hotels.fakeollama import FakeOllamaProcess, FakeOllamaServer
+from hotels.llm import OllamaClient, OllamaError, RetryPolicy
+from hotels.management.commands import generate_rating_review
+from hotels.models import GeneratePropertyRatingReview
+
+
+class FakeOllamaServerTests(SimpleTestCase):
+    def start(self, **kwargs):
+        server = FakeOllamaServer(latency='fixed', latency_ms=0, seed=1, **kwargs).start()
+        self.addCleanup(server.stop)
+        client = OllamaClient(base_url=server.url, pool_size=8, retry=RetryPolicy(max_retries=0))
+        self.addCleanup(client.close)
+        return server, client
+
+    def test_replies_match_the_prompt(self):
+        """Test that replies look like what each command expects to parse"""
+        server, client = self.start()
+        self.assertRegex(client.chat('Assign a rating out of 5 stars\nTitle: x'), r'^Rating: \d\.\d$')
+        self.assertIn('Description:', client.chat('Rewrite the following: Title: x'))
+        self.assertIn('"review"', client.chat('Rate and review', response_format={'type': 'json_object'}))
+        self.assertEqual(server.stats()['requests'], 3)
+
+    def test_error_rate(self):
+        """Test that simulated failures come back as HTTP 500"""
+        server, client = self.start(error_rate=1.0)
+        with self.assertRaises(OllamaError) as ctx:
+            client.chat('hello')
+        self.assertEqual(ctx.exception.status_code, 500)
+        self.assertEqual(server.stats()['errors'], 1)
+
+    def test_concurrency_limit_and_queue(self):
+        """Test that at most max_concurrency requests are served at once and overflow gets 503"""
+        server, client = self.start(max_concurrency=2, max_queue=2)
+        server.latency_ms = 50
+
+        def call(i):
+            try:
+                client.chat(f"prompt {i}")
+                return 200
+            except OllamaError as e:
+                return e.status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(call, range(8)))
+
+        self.assertLessEqual(server.stats()['peak_in_flight'], 2)
+        self.assertIn(503, statuses)
+        self.assertEqual(statuses.count(200) + statuses.count(503), 8)
+
+
+class BenchmarkTests(TestCase):
+    def test_run_command_measures_and_rolls_back(self):
+        """Test that a benchmark run reports throughput and leaves no rows behind"""
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        write_synthetic_csv(path, 10)
+
+        with FakeOllamaProcess(latency='fixed', latency_ms=0) as server:
+            client = OllamaClient(base_url=server.url)
+            self.addCleanup(client.close)
+            result = run_command(generate_rating_review.Command(), client, 10, path, concurrency=4)
+            served = server.stats()
+
+        self.assertEqual(result['requests'], 20)
+        self.assertEqual(served['requests'], 20)
+        self.assertGreater(result['rows_per_second'], 0)
+        self.assertGreater(result['peak_rss_bytes'], 0)
+        self.assertFalse(GeneratePropertyRatingReview.objects.exists())
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.5), 51)
+        self.assertEqual(percentile(samples, 0.99), 100)
+        self.assertEqual(percentile([], 0.5), 0.0)
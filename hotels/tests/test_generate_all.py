@@ -0,0 +1,76 @@
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from unittest.mock import patch, Mock
+from io import StringIO
+from hotels.management.commands.generate_all import Command
+from hotels.models import GeneratedHotelTD, GeneratedPropertySummary, GeneratePropertyRatingReview
+
+CSV_DATA = (
+    "id,title,description,location,room_type,price\n"
+    "1,Test Hotel,Nice hotel,Downtown,Suite,200\n"
+    "2,Other Hotel,Quiet hotel,Uptown,Single,90\n"
+)
+
+
+def reply(content):
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {'choices': [{'message': {'content': content}}]}
+    return response
+
+
+def fake_ollama(url, **kwargs):
+    prompt = kwargs['json']['messages'][0]['content']
+    if prompt.startswith('Rewrite'):
+        return reply('New Title. Description: New Description')
+    if prompt.startswith('Generate a summary'):
+        return reply('A summary')
+    if prompt.startswith('Assign a rating'):
+        return reply('Rating: 4.1')
+    return reply('A review')
+
+
+class GenerateAllCommandTests(TestCase):
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post', side_effect=fake_ollama)
+    def test_all_tasks_from_one_read(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO(CSV_DATA)
+
+        out = StringIO()
+        call_command('generate_all', concurrency=4, stdout=out)
+
+        mock_open.assert_called_once()
+        self.assertEqual(GeneratedHotelTD.objects.count(), 2)
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 2)
+        self.assertEqual(GeneratePropertyRatingReview.objects.count(), 2)
+        self.assertEqual(GeneratedHotelTD.objects.get(property_id=2).title, 'New Title.')
+        self.assertEqual(str(GeneratePropertyRatingReview.objects.get(property_id=1).rating), '4.1')
+        # one rewrite + one summary + two rating/review requests per row
+        self.assertEqual(mock_post.call_count, 8)
+        self.assertIn('summary: 2 rows', out.getvalue())
+
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post', side_effect=fake_ollama)
+    def test_selected_tasks_only(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO(CSV_DATA)
+
+        call_command('generate_all', tasks='summary', stdout=StringIO())
+
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 2)
+        self.assertFalse(GeneratedHotelTD.objects.exists())
+        self.assertFalse(GeneratePropertyRatingReview.objects.exists())
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_all', tasks='summary,translate', stdout=StringIO())
+
+    def test_prompt_batch_per_task(self):
+        command = Command()
+        self.assertEqual(command.parse_prompt_batch(''), {})
+        self.assertEqual(command.parse_prompt_batch('4'), {'rewrite': 4, 'rating_review': 4})
+        self.assertEqual(command.parse_prompt_batch('4,rewrite=8'), {'rewrite': 8, 'rating_review': 4})
+        with self.assertRaises(CommandError):
+            command.parse_prompt_batch('summary=4')
+        with self.assertRaises(CommandError):
+            command.parse_prompt_batch('rewrite=lots')
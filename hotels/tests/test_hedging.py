@@ -0,0 +1,146 @@
+import threading
+import time
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from hotels.adaptive import prompt_template
+from hotels.fakeollama import FakeOllamaServer
+from hotels.hedging import HedgedClient
+from hotels.llm import Completion, OllamaAborted, OllamaClient, OllamaError, RequestAbort
+
+
+class StreamingStub:
+    """Works for the next scheduled duration in 5 ms steps, giving up once its request is aborted."""
+
+    def __init__(self, durations):
+        self.durations = list(durations)
+        self.cancelled = 0
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, **options):
+        with self._lock:
+            duration = self.durations.pop(0) if self.durations else 0.01
+            self.threads.append(threading.current_thread())
+        if isinstance(duration, Exception):
+            raise duration
+        abort = RequestAbort.current()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            time.sleep(0.005)
+            if abort is not None and abort.aborted:
+                with self._lock:
+                    self.cancelled += 1
+                raise OllamaAborted('Request aborted')
+        return Completion('done')
+
+
+class HedgedClientTests(SimpleTestCase):
+    def warm_up(self, client, count=20):
+        for _ in range(count):
+            client.chat('Generate a summary')
+
+    def test_slow_request_is_hedged_and_the_loser_cancelled(self):
+        stub = StreamingStub([0.01] * 20 + [2.0, 0.02])
+        client = HedgedClient(stub, percentile=0.95, max_rate=0.5)
+        self.warm_up(client)
+
+        started = time.perf_counter()
+        self.assertEqual(client.chat('Generate a summary'), 'done')
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(client.hedge_stats(), {'requests': 21, 'hedged': 1, 'hedge_wins': 1})
+        for _ in range(100):
+            if stub.cancelled:
+                break
+            time.sleep(0.01)
+        self.assertEqual(stub.cancelled, 1)
+
+    def test_primary_runs_on_the_calling_thread(self):
+        """Test that requests finishing before the hedge delay start no thread and are not streamed"""
+        # The measured request returns at once, so it never outlasts the hedge delay however loaded the machine is.
+        inner = StreamingStub([0.05] * 20 + [0])
+        stub = Mock(wraps=inner, model='fake')
+        client = HedgedClient(stub)
+        self.warm_up(client)
+        hedge_threads = lambda: [t for t in threading.enumerate() if t.name == 'ollama-hedge']
+
+        client.chat('Generate a summary', max_tokens=10)
+
+        self.assertEqual(set(inner.threads), {threading.current_thread()})
+        self.assertEqual(stub.complete.call_args, (('Generate a summary',), {'max_tokens': 10}))
+        self.assertEqual(hedge_threads(), [])
+        self.assertEqual(client.hedge_stats()['hedged'], 0)
+
+    def test_each_prompt_template_has_its_own_delay(self):
+        stub = StreamingStub([0.2] * 5 + [0.01] * 5 + [0.15, 0.01])
+        client = HedgedClient(stub, min_samples=5, max_rate=1.0)
+        for _ in range(5):
+            client.chat('Write a review of property 1:\nLong text')
+        for _ in range(5):
+            client.chat('Assign a rating to property 2:\nShort text')
+        self.assertGreater(client.threshold(prompt_template('Write a review of property 3:')), 0.1)
+
+        # Slow for a rating though quick next to the reviews
+        client.chat('Assign a rating to property 3:\nShort text')
+        self.assertEqual(client.hedge_stats()['hedged'], 1)
+
+    def test_hedges_stay_within_the_budget(self):
+        stub = StreamingStub([0.01] * 20 + [0.3] * 4)
+        client = HedgedClient(stub, percentile=0.5, max_rate=0.05)
+        self.warm_up(client)
+        for _ in range(2):
+            client.chat('Generate a summary')
+        self.assertEqual(client.hedge_stats()['hedged'], 1)
+
+    def test_errors_are_not_hedged(self):
+        stub = StreamingStub([0.01] * 20 + [OllamaError('bad request', status_code=400)])
+        client = HedgedClient(stub)
+        self.warm_up(client)
+        with self.assertRaises(OllamaError):
+            client.chat('Generate a summary')
+        self.assertEqual(client.hedge_stats()['hedged'], 0)
+
+    def test_first_success_wins_when_the_other_copy_fails(self):
+        stub = StreamingStub([0.01] * 20 + [0.2, OllamaError('503 - busy', status_code=503)])
+        client = HedgedClient(stub, max_rate=1.0)
+        self.warm_up(client)
+        self.assertEqual(client.chat('Generate a summary'), 'done')
+        self.assertEqual(client.hedge_stats()['hedge_wins'], 0)
+
+
+class RequestAbortTests(SimpleTestCase):
+    def test_abort_cuts_off_a_stalled_request_without_retrying(self):
+        """Test that aborting from another thread ends a request still waiting for its first byte"""
+        server = FakeOllamaServer(latency='fixed', latency_ms=3000).start()
+        self.addCleanup(server.stop)
+        client = OllamaClient(base_url=server.url, pool_size=1)
+        self.addCleanup(client.close)
+        abort = RequestAbort()
+        threading.Timer(0.1, abort.abort).start()
+
+        started = time.perf_counter()
+        with self.assertRaises(OllamaAborted), abort.active():
+            client.complete('Generate a summary')
+        self.assertLess(time.perf_counter() - started, 2.0)
+        self.assertEqual(client.stats()['requests'], 1)
+        for _ in range(400):
+            if server.stats()['cancelled']:
+                break
+            time.sleep(0.01)
+        self.assertEqual(server.stats()['cancelled'], 1)
+
+
+class HedgeCommandTests(TestCase):
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_report_shows_hedge_rate(self, mock_post, mock_open):
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,price,room_type\n1,Hotel,Desc,Town,100,Suite\n"
+        )
+        mock_post.return_value = Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': 'A summary'}}]})
+
+        out = StringIO()
+        call_command('write_summary', hedge=95, stdout=out)
+
+        self.assertIn('Hedging: 0 of 1 requests hedged (0.0%)', out.getvalue())
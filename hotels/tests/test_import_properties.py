@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from hotels.management.commands.import_properties import COLUMNS, REQUIRED_COLUMNS, staging_select
+from hotels.models import GeneratedPropertySummary, Property
+
+
+class ImportPropertiesTests(TestCase):
+    def import_csv(self, text):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'hotels.csv')
+            with open(path, 'w') as file:
+                file.write(text)
+            out = StringIO()
+            call_command('import_properties', input=path, batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def test_loads_and_updates_properties(self):
+        header = 'id,title,rating,location,latitude,longitude,room_type,price,description\n'
+        out = self.import_csv(
+            header
+            + '1,Sea View Suite,4.5,Dhaka,23.81,90.41,Suite,120.50,Bright suite\n'
+            + '2,Garden Room,4.0,Sylhet,,not a number,Double,,Quiet room\n'
+            + 'x,Bad id,3,Nowhere,0,0,Single,10,Skipped\n'
+            + '3,,3,Nowhere,0,0,Single,10,No title\n'
+        )
+        self.assertIn('Read 4 rows', out)
+        self.assertIn('2 rejected', out)
+        self.assertIn('Imported 2 properties', out)
+
+        suite = Property.objects.get(id=1)
+        self.assertEqual((suite.location, suite.room_type, suite.price), ('Dhaka', 'Suite', Decimal('120.50')))
+        self.assertAlmostEqual(suite.latitude, 23.81)
+        garden = Property.objects.get(id=2)
+        self.assertIsNone(garden.latitude)
+        self.assertIsNone(garden.longitude)
+        self.assertIsNone(garden.price)
+
+        self.import_csv(header + '1,Sea View Suite,4.5,Dhaka,23.81,90.41,Suite,99,Renovated suite\n')
+        suite.refresh_from_db()
+        self.assertEqual((suite.price, suite.description), (Decimal('99.00'), 'Renovated suite'))
+        self.assertEqual(Property.objects.count(), 2)
+
+    def test_generated_rows_link_to_their_property(self):
+        self.import_csv('id,title,description\n7,Lake House,Quiet\n')
+        GeneratedPropertySummary.objects.create(property_id=7, summary='A summary')
+        GeneratedPropertySummary.objects.create(property_id=8, summary='Not imported yet')
+
+        self.assertEqual(Property.objects.get(id=7).summary.summary, 'A summary')
+        self.assertEqual(
+            list(GeneratedPropertySummary.objects.filter(property__title='Lake House').values_list('property_id', flat=True)),
+            [7],
+        )
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'COPY import needs PostgreSQL')
+    def test_copy_import_without_optional_columns(self):
+        out = self.import_csv('id,title\n1,Harbour Inn\n')
+
+        self.assertIn('Imported 1 properties', out)
+        prop = Property.objects.get(id=1)
+        self.assertEqual((prop.location, prop.latitude, prop.price), ('', None, None))
+
+
+class StagingSelectTests(SimpleTestCase):
+    def test_missing_columns_get_typed_defaults(self):
+        select = staging_select(['id', 'title'])
+
+        self.assertIn('NULL::double precision AS latitude', select)
+        self.assertIn('NULL::double precision AS longitude', select)
+        self.assertIn('NULL::numeric AS price', select)
+        self.assertIn("''::text AS location", select)
+        self.assertNotRegex(select, r'NULL AS')
+
+    def test_every_column_is_selected_once(self):
+        for header in (list(REQUIRED_COLUMNS), list(COLUMNS)):
+            select = staging_select(header)
+            for name in COLUMNS:
+                self.assertEqual(select.count(f' AS {name},') + select.endswith(f' AS {name}'), 1)
@@ -0,0 +1,106 @@
+import gzip
+import os
+import tempfile
+from django.test import SimpleTestCase
+from hotels.ingest import ColumnarStream, CSVStream, PropertyRecord
+
+CSV_DATA = (
+    "id,title,rating,location,latitude,longitude,room_type,price,description\n"
+    "1,Hotel Sunshine,4.5,Los Angeles,34.0522,-118.2437,Private Room,150,Cozy private room.\n"
+    "2,,4.7,Miami,25.7617,-80.1918,Entire House,220,Missing its title.\n"
+    "3,Mountain Retreat,4.8,Denver,39.7392,-104.9903,Shared Room,80,\"A peaceful retreat,\nin the mountains.\"\n"
+    "4,Lakeside Resort,4.6,Chicago,41.8781,-87.6298,Private Room,175,By the lake.\n"
+)
+
+
+class CSVStreamTests(SimpleTestCase):
+    def write_file(self, suffix, opener):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with opener(path, 'wt', encoding='utf-8', newline='') as file:
+            file.write(CSV_DATA)
+        return path
+
+    def test_rows_come_in_bounded_batches(self):
+        """Test that valid rows are grouped into batches of at most batch_size"""
+        path = self.write_file('.csv', open)
+        stream = CSVStream(path, batch_size=2, required_fields=('title', 'description'))
+
+        batches = [[row['id'] for row in batch] for batch in stream.batches()]
+
+        self.assertEqual(batches, [['1', '3'], ['4']])
+        self.assertEqual(stream.rows, 3)
+        self.assertEqual(stream.rejected, 1)
+
+    def test_rows_with_a_non_integer_id_are_rejected(self):
+        """Test that an id that is not an integer rejects the row instead of failing later"""
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(CSV_DATA + "A-7,Bad Id Inn,4.1,Boston,42.36,-71.06,Private Room,99,Id is not a number.\n")
+        stream = CSVStream(path, required_fields=('title',))
+
+        self.assertEqual([row['id'] for row in stream], ['1', '3', '4'])
+        self.assertEqual(stream.rejected, 2)
+
+    def test_gzip_input_is_decompressed(self):
+        """Test that .gz files are read transparently, including quoted newlines"""
+        path = self.write_file('.csv.gz', gzip.open)
+        rows = list(CSVStream(path, required_fields=('title',)))
+
+        self.assertEqual([row['id'] for row in rows], ['1', '3', '4'])
+        self.assertEqual(rows[1]['description'], 'A peaceful retreat,\nin the mountains.')
+
+    def test_stats_report_throughput(self):
+        """Test that bytes and rows read are reported"""
+        path = self.write_file('.csv', open)
+        stream = CSVStream(path)
+        list(stream)
+
+        stats = stream.stats()
+        self.assertEqual(stats['rows'], 4)
+        self.assertEqual(stats['bytes'], len(CSV_DATA.encode('utf-8')))
+        self.assertGreater(stats['rows_per_second'], 0)
+
+
+class ColumnarStreamTests(SimpleTestCase):
+    def write_bytes(self, data):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+    def test_bad_rows_are_rejected_by_reason(self):
+        """Test that out-of-range numbers, blank fields and invalid UTF-8 are rejected before batching"""
+        path = self.write_bytes(
+            CSV_DATA.encode('utf-8')
+            + b"5,Bad Latitude,4.5,Miami,95,-80.19,Entire House,220,Too far north.\n"
+            + b"6,Caf\xe9 Latin-1,4.5,Paris,48.85,2.35,Private Room,90,Not UTF-8.\n"
+            + b"7,Blank,4.5,Paris,48.85,2.35,Private Room,90,   \n"
+            + b"8,Free,4.5,Paris,48.85,2.35,Private Room,-1,Negative price.\n"
+        )
+        stream = ColumnarStream(path, batch_size=2, required_fields=('title', 'description'))
+
+        batches = [[row['id'] for row in batch] for batch in stream.batches()]
+
+        self.assertEqual(batches, [[1, 3], [4]])
+        self.assertEqual(stream.stats()['rejected_reasons'], {
+            'empty title': 1, 'empty description': 1, 'invalid latitude': 1, 'invalid UTF-8': 1, 'invalid price': 1,
+        })
+        self.assertEqual(stream.rows, 3)
+
+    def test_records_are_typed_and_read_like_dicts(self):
+        """Test that records carry parsed numbers and support the dict reads the commands use"""
+        path = self.write_bytes(CSV_DATA.encode('utf-8'))
+        first, retreat = list(ColumnarStream(path, required_fields=('title',)))[:2]
+
+        self.assertIsInstance(first, PropertyRecord)
+        self.assertEqual((first['id'], first['price'], first['latitude']), (1, 150, 34.0522))
+        self.assertEqual(retreat['description'], 'A peaceful retreat,\nin the mountains.')
+        self.assertEqual(first.get('missing', 'default'), 'default')
+        self.assertEqual(dict(first)['room_type'], 'Private Room')
+        self.assertFalse(hasattr(first, '__dict__'))
@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+from unittest.mock import Mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import SimpleTestCase
+from hotels.fakeollama import FakeOllamaServer
+from hotels.llm import OllamaClient, OllamaError, OllamaTimeout, RetryPolicy
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    status = 200
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        payload = json.dumps({
+            'choices': [{'message': {'content': f"echo: {body['messages'][0]['content']}"}}]
+        }).encode()
+        self.send_response(self.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FailingHandler(ChatHandler):
+    status = 503
+
+
+class FlakyHandler(ChatHandler):
+    """Answers 503 to the first two requests, then recovers."""
+    calls = 0
+
+    def do_POST(self):
+        FlakyHandler.calls += 1
+        self.status = 503 if FlakyHandler.calls <= 2 else 200
+        super().do_POST()
+
+
+class BadRequestHandler(ChatHandler):
+    status = 400
+
+
+class SlowHandler(ChatHandler):
+    def do_POST(self):
+        time.sleep(0.3)
+        try:
+            super().do_POST()
+        except BrokenPipeError:
+            # The client gave up waiting.
+            pass
+
+
+class OllamaClientTests(SimpleTestCase):
+    def start_server(self, handler):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def test_chat_returns_message_content(self):
+        """Test that chat() sends the prompt and returns the reply text"""
+        client = OllamaClient(base_url=self.start_server(ChatHandler), model='test-model')
+        self.addCleanup(client.close)
+        self.assertEqual(client.chat('hello'), 'echo: hello')
+
+    def test_connections_are_reused(self):
+        """Test that sequential requests share one keep-alive connection"""
+        client = OllamaClient(base_url=self.start_server(ChatHandler), pool_size=2)
+        self.addCleanup(client.close)
+        for i in range(5):
+            client.chat(f"prompt {i}")
+
+        stats = client.stats()
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['reused_requests'], 4)
+        self.assertEqual(stats['max_requests_per_connection'], 5)
+
+    def test_error_status_raises(self):
+        """Test that a non-200 response raises OllamaError with the status code"""
+        client = OllamaClient(base_url=self.start_server(FailingHandler), retry=RetryPolicy(max_retries=0))
+        self.addCleanup(client.close)
+        with self.assertRaises(OllamaError) as ctx:
+            client.chat('hello')
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    def test_transient_errors_are_retried(self):
+        """Test that 503s are retried with backoff and the retries are reported"""
+        FlakyHandler.calls = 0
+        client = OllamaClient(base_url=self.start_server(FlakyHandler), retry=RetryPolicy(max_retries=3, backoff=0.01))
+        self.addCleanup(client.close)
+
+        completion = client.complete('hello')
+        self.assertEqual(completion.content, 'echo: hello')
+        self.assertEqual(completion.retries, 2)
+        self.assertEqual(FlakyHandler.calls, 3)
+
+    def test_client_errors_are_not_retried(self):
+        """Test that a 400 fails at once, since retrying the same request cannot help"""
+        client = OllamaClient(base_url=self.start_server(BadRequestHandler), retry=RetryPolicy(max_retries=3, backoff=0.01))
+        self.addCleanup(client.close)
+        with self.assertRaises(OllamaError) as ctx:
+            client.chat('hello')
+        self.assertFalse(ctx.exception.retryable)
+        self.assertEqual(client.stats()['requests'], 1)
+
+    def test_transport_errors_become_ollama_errors(self):
+        """Test that timeouts and refused connections raise OllamaError without a status code"""
+        client = OllamaClient(base_url=self.start_server(SlowHandler), read_timeout=0.05, retry=RetryPolicy(max_retries=0))
+        self.addCleanup(client.close)
+        with self.assertRaises(OllamaTimeout):
+            client.chat('hello')
+
+        refused = OllamaClient(base_url='http://127.0.0.1:9', retry=RetryPolicy(max_retries=0))
+        self.addCleanup(refused.close)
+        with self.assertRaises(OllamaError) as ctx:
+            refused.chat('hello')
+        self.assertIsNone(ctx.exception.status_code)
+        self.assertTrue(ctx.exception.retryable)
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Test that delays stay within the exponential bound and honour Retry-After"""
+        policy = RetryPolicy(max_retries=5, backoff=1.0, max_backoff=5.0)
+        for retry in range(5):
+            self.assertLessEqual(policy.delay(retry), min(5.0, 2 ** retry))
+        self.assertGreaterEqual(policy.delay(0, retry_after=3), 3)
+        self.assertLessEqual(policy.delay(0, retry_after=60), 5.0)
+
+
+class StreamingTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeOllamaServer(latency='fixed', latency_ms=0, tokens_per_second=500, reply_tokens=100).start()
+        self.addCleanup(self.server.stop)
+        self.client = OllamaClient(base_url=self.server.url)
+        self.addCleanup(self.client.close)
+
+    def test_streamed_reply_is_assembled(self):
+        """Test that a streamed reply matches the full text and reports usage"""
+        completion = self.client.complete('Generate a summary', stream=True)
+
+        self.assertEqual(completion.content.split(), ['lorem'] * 92)
+        self.assertEqual(completion.completion_tokens, 92)
+        self.assertFalse(completion.stopped_early)
+
+    def test_on_token_receives_each_piece(self):
+        """Test that on_token sees the reply as it streams in"""
+        tokens = []
+        completion = self.client.complete('Generate a summary', stream=True, on_token=tokens.append)
+
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(''.join(tokens), completion.content)
+
+    def test_no_retry_after_tokens_were_passed_on(self):
+        """Test that an interrupted stream is not started over once on_token has seen text"""
+        def interrupted(data, stream, stop_when, on_token):
+            on_token('partial')
+            raise OllamaError('Stream interrupted')
+
+        client = OllamaClient(base_url=self.server.url, retry=RetryPolicy(max_retries=3))
+        self.addCleanup(client.close)
+        client._send = Mock(side_effect=interrupted)
+        with self.assertRaises(OllamaError):
+            client.complete('Generate a summary', stream=True, on_token=lambda text: None)
+        client._send.assert_called_once()
+
+    def test_stop_when_cuts_generation_short(self):
+        """Test that the client hangs up once stop_when is satisfied"""
+        completion = self.client.complete('Generate a summary', stream=True, stop_when=lambda text: len(text) > 20)
+
+        self.assertTrue(completion.stopped_early)
+        self.assertLess(len(completion.content), 40)
+        # The fake server notices the disconnect on its next write
+        for _ in range(50):
+            if self.server.stats()['cancelled']:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.server.stats()['cancelled'], 1)
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from hotels import llm
+from hotels.fakeollama import FakeOllamaServer
+from hotels.llm import Completion, OllamaClient, OllamaError
+from hotels.metrics import Histogram, InstrumentedClient, MetricsRegistry
+
+
+class HistogramTests(SimpleTestCase):
+    def test_quantiles_are_interpolated_within_buckets(self):
+        histogram = Histogram(buckets=(1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 6.5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.5)
+        self.assertAlmostEqual(histogram.quantile(1.0), 4)
+
+    def test_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        registry.histogram('request_seconds', 'Request time.', buckets=(1, 2)).observe(1.5)
+        registry.counter('requests_total', 'Requests.', status=200).inc(3)
+
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE request_seconds histogram', text)
+        self.assertIn('request_seconds_bucket{le="1"} 0', text)
+        self.assertIn('request_seconds_bucket{le="2"} 1', text)
+        self.assertIn('request_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn('request_seconds_count 1', text)
+        self.assertIn('requests_total{status="200"} 3', text)
+
+
+class InstrumentedClientTests(SimpleTestCase):
+    def test_successful_request_is_recorded(self):
+        inner = Mock()
+        inner.complete.return_value = Completion(
+            'reply', ttfb=0.2, seconds=0.3, usage={'prompt_tokens': 40, 'completion_tokens': 12}
+        )
+        metrics = MetricsRegistry()
+
+        self.assertEqual(InstrumentedClient(inner, metrics).chat('prompt'), 'reply')
+
+        summary = metrics.summary()
+        self.assertEqual(summary['ollama_requests_total{status="200"}'], 1)
+        self.assertEqual(summary['ollama_prompt_tokens']['sum'], 40)
+        self.assertEqual(summary['ollama_completion_tokens']['sum'], 12)
+        self.assertAlmostEqual(summary['ollama_time_to_first_byte_seconds']['sum'], 0.2)
+
+    def test_failed_request_is_counted_by_status(self):
+        inner = Mock()
+        inner.complete.side_effect = OllamaError('busy', status_code=503)
+        metrics = MetricsRegistry()
+
+        with self.assertRaises(OllamaError):
+            InstrumentedClient(inner, metrics).chat('prompt')
+        self.assertEqual(metrics.summary()['ollama_requests_total{status="503"}'], 1)
+
+
+class CommandMetricsTests(TestCase):
+    @patch('hotels.llm.requests.Session.post')
+    def test_metrics_files_are_written(self, mock_post):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'choices': [{'message': {'content': 'New Title. Description: New Description'}}],
+            'usage': {'prompt_tokens': 20, 'completion_tokens': 8},
+        }
+        mock_post.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'hotels.csv')
+            with open(input_path, 'w') as file:
+                file.write('id,title,description\n1,Hotel,Desc\n')
+
+            call_command('rewrite_titles_description', input=input_path, metrics_dir=directory, stdout=StringIO())
+
+            with open(os.path.join(directory, 'metrics.json')) as file:
+                summary = json.load(file)
+            with open(os.path.join(directory, 'metrics.prom')) as file:
+                prometheus = file.read()
+
+        self.assertIn('# TYPE ollama_request_seconds histogram', prometheus)
+        self.assertEqual(summary['ollama_requests_total{status="200"}'], 1)
+        self.assertEqual(summary['ollama_completion_tokens']['sum'], 8)
+        self.assertEqual(summary['db_flush_rows']['sum'], 1)
+
+    def test_connection_reuse_is_reported_and_exported(self):
+        server = FakeOllamaServer(latency='fixed', latency_ms=0, seed=1).start()
+        self.addCleanup(server.stop)
+        self.addCleanup(setattr, llm, '_client', None)
+        llm._client = OllamaClient(base_url=server.url, pool_size=1)
+        self.addCleanup(llm._client.close)
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'hotels.csv')
+            with open(input_path, 'w') as file:
+                file.write('id,title,description\n1,Hotel,Desc\n2,Inn,Desc\n3,Lodge,Desc\n')
+            out = StringIO()
+            call_command('rewrite_titles_description', input=input_path, metrics_dir=directory, stdout=out)
+            with open(os.path.join(directory, 'metrics.json')) as file:
+                summary = json.load(file)
+
+        self.assertIn('Connections: 1 opened, 2 of 3 requests reused one', out.getvalue())
+        self.assertEqual(summary['ollama_connections_opened_total'], 1)
+        self.assertEqual(summary['ollama_connections_reused_total'], 2)
+
+    def test_queue_wait_includes_waiting_for_a_pooled_connection(self):
+        server = FakeOllamaServer(latency='fixed', latency_ms=100, seed=1).start()
+        self.addCleanup(server.stop)
+        self.addCleanup(setattr, llm, '_client', None)
+        llm._client = OllamaClient(base_url=server.url, pool_size=1)
+        self.addCleanup(llm._client.close)
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'hotels.csv')
+            with open(input_path, 'w') as file:
+                file.write('id,title,description\n1,Hotel,Desc\n2,Inn,Desc\n')
+            call_command(
+                'rewrite_titles_description', input=input_path, metrics_dir=directory, concurrency=2,
+                stdout=StringIO(),
+            )
+            with open(os.path.join(directory, 'metrics.json')) as file:
+                summary = json.load(file)
+
+        # Two workers share one connection, so one row waits for the other's request.
+        self.assertEqual(summary['queue_wait_seconds']['count'], 2)
+        self.assertGreater(summary['queue_wait_seconds']['sum'], 0.08)
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from unittest.mock import patch
+from decimal import Decimal
+from django.test import SimpleTestCase, TestCase
+from hotels.llm import Completion, OllamaError
+from hotels.management.base import source_fingerprint
+from hotels.models import GeneratedPropertySummary, Property
+from hotels.ondemand import SingleFlight
+
+
+class FakeClient:
+    """Streams a fixed reply once ``gate`` is set, counting calls."""
+
+    def __init__(self, parts=('A ', 'quiet ', 'suite.'), error=None):
+        self.parts = parts
+        self.error = error
+        self.calls = 0
+        self.gate = threading.Event()
+
+    def complete(self, prompt, on_token=None, **options):
+        self.calls += 1
+        self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        for part in self.parts:
+            on_token(part)
+        return Completion(''.join(self.parts))
+
+
+async def read(response):
+    if response.streaming:
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+    return response.content.decode()
+
+
+class OnDemandSummaryTests(TestCase):
+    def setUp(self):
+        Property.objects.create(id=1, title='Sea View Suite', description='Bright', location='Cox', room_type='Suite',
+                                price=Decimal('150.00'))
+        self.flights = SingleFlight(max_in_flight=2)
+        patcher = patch('hotels.ondemand.summaries', self.flights)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_concurrent_requests_share_one_call(self):
+        client = FakeClient()
+        asyncio.get_running_loop().call_later(0.2, client.gate.set)
+        with patch('hotels.ondemand.get_client', return_value=client):
+            responses = await asyncio.gather(*(self.async_client.get('/api/properties/1/summary/') for _ in range(3)))
+            bodies = [await read(response) for response in responses]
+
+        self.assertEqual(bodies, ['A quiet suite.'] * 3)
+        self.assertEqual({response['X-Summary-Source'] for response in responses}, {'generated'})
+        self.assertEqual(client.calls, 1)
+        self.assertEqual((self.flights.started, self.flights.coalesced), (1, 2))
+
+        stored = await self.async_client.get('/api/properties/1/summary/')
+        self.assertEqual(stored['X-Summary-Source'], 'stored')
+        self.assertEqual(await read(stored), 'A quiet suite.')
+        self.assertEqual(await GeneratedPropertySummary.objects.acount(), 1)
+
+        # A CSV row with the same fields fingerprints the same, so --changed-only leaves it alone
+        summary = await GeneratedPropertySummary.objects.aget(property_id=1)
+        row = {'title': 'Sea View Suite', 'description': 'Bright', 'location': 'Cox', 'price': '150', 'room_type': 'Suite'}
+        self.assertEqual(summary.source_fingerprint, source_fingerprint(row, tuple(row)))
+
+    async def test_failure_before_any_text_is_a_bad_gateway(self):
+        client = FakeClient(error=OllamaError('503 - busy', status_code=503))
+        client.gate.set()
+        with patch('hotels.ondemand.get_client', return_value=client), self.assertLogs('hotels.ondemand', 'WARNING'):
+            response = await self.async_client.get('/api/properties/1/summary/')
+        self.assertEqual(response.status_code, 502)
+        self.assertFalse(await GeneratedPropertySummary.objects.aexists())
+
+    async def test_unknown_property(self):
+        response = await self.async_client.get('/api/properties/9/summary/')
+        self.assertEqual(response.status_code, 404)
+
+
+class SingleFlightTests(SimpleTestCase):
+    async def test_in_flight_limit(self):
+        flights = SingleFlight(max_in_flight=2)
+        state = {'current': 0, 'peak': 0}
+
+        async def generate(flight):
+            state['current'] += 1
+            state['peak'] = max(state['peak'], state['current'])
+            await asyncio.sleep(0.01)
+            flight.push('done')
+            state['current'] -= 1
+
+        joined = [flights.join(n, generate) for n in range(5)]
+        for flight in joined:
+            self.assertEqual([text async for text in flight.tokens()], ['done'])
+        self.assertEqual(state['peak'], 2)
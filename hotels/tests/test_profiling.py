@@ -0,0 +1,92 @@
+import os
+import pstats
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from hotels import profiling
+from hotels.profiling import RunProfile
+
+
+class PhaseTimerTests(SimpleTestCase):
+    def test_nested_phases_are_left_out_of_self_time(self):
+        with RunProfile(os.devnull) as profile:
+            with profiling.phase('outer'):
+                time.sleep(0.02)
+                with profiling.phase('inner'):
+                    time.sleep(0.05)
+        phases = profile.timer.summary()
+
+        self.assertGreaterEqual(phases['outer']['wall'], 0.07)
+        self.assertLess(phases['outer']['self_wall'], 0.05)
+        self.assertGreaterEqual(phases['inner']['self_wall'], 0.05)
+        self.assertEqual(phases['inner']['calls'], 1)
+
+    def test_phases_cost_nothing_outside_a_profiled_run(self):
+        self.assertIs(profiling.phase('outer'), profiling.phase('inner'))
+        self.assertEqual(list(profiling.timed_iter('read', [1, 2])), [1, 2])
+
+
+class CommandProfileTests(TestCase):
+    def run_rewrite(self, directory, mock_post, **options):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'choices': [{'message': {'content': 'New Title. Description: New Description'}}]}
+
+        def slow_post(*args, **kwargs):
+            time.sleep(0.03)
+            return mock_response
+        mock_post.side_effect = slow_post
+
+        input_path = os.path.join(directory, 'hotels.csv')
+        with open(input_path, 'w') as file:
+            file.write('id,title,description\n1,Hotel,Desc\n2,Inn,Desc\n3,Lodge,Desc\n')
+        out = StringIO()
+        path = os.path.join(directory, 'profile.txt')
+        call_command('rewrite_titles_description', input=input_path, profile=path, stdout=out, **options)
+        with open(path) as file:
+            return path, file.read(), out.getvalue()
+
+    @unittest.skipUnless(profiling.PER_THREAD_CPROFILE, 'cProfile cannot run per thread on Python 3.12+')
+    @patch('hotels.llm.requests.Session.post')
+    def test_phase_report_and_cprofile_cover_worker_threads(self, mock_post):
+        with tempfile.TemporaryDirectory() as directory:
+            path, report, out = self.run_rewrite(directory, mock_post, profiler='cprofile', concurrency=2)
+            stats = pstats.Stats(f"{path}.prof")
+
+        for name in ('read_input', 'generate:rewrite', 'ollama', 'decode_json', 'parse_reply', 'store', 'db_write'):
+            self.assertIn(name, report)
+        self.assertIn(f"Profile written to {path}, {path}.prof", out)
+        functions = {function for _, _, function in stats.stats}
+        self.assertIn('slow_post', functions)
+
+    @patch('hotels.profiling.PER_THREAD_CPROFILE', False)
+    @patch('hotels.llm.requests.Session.post')
+    def test_cprofile_falls_back_to_the_main_thread(self, mock_post):
+        with tempfile.TemporaryDirectory() as directory:
+            path, report, _ = self.run_rewrite(directory, mock_post, profiler='cprofile', concurrency=2)
+            stats = pstats.Stats(f"{path}.prof")
+
+        self.assertIn('cProfile covers the main thread only', report)
+        self.assertIn('use --profiler sample', report)
+        functions = {function for _, _, function in stats.stats}
+        self.assertIn('store_result', functions)
+        self.assertNotIn('slow_post', functions)
+
+    @patch('hotels.llm.requests.Session.post')
+    def test_sampling_profiler_writes_folded_stacks(self, mock_post):
+        with tempfile.TemporaryDirectory() as directory:
+            path, report, _ = self.run_rewrite(directory, mock_post, profiler='sample')
+            with open(f"{path}.folded") as file:
+                folded = file.read()
+
+        self.assertIn('On top of the stack', report)
+        self.assertIn('slow_post', folded)
+
+    def test_profiler_needs_a_report_path(self):
+        with self.assertRaises(CommandError):
+            call_command('rewrite_titles_description', profiler='sample', stdout=StringIO())
@@ -1,12 +1,15 @@
+import threading
 from unittest.mock import patch, Mock, MagicMock
 from django.core.management import call_command
 from io import StringIO
 from django.test import TestCase
 from decimal import Decimal
-from hotels.models import GeneratePropertyRatingReview
+from hotels.management.commands.generate_rating_review import Command
+from hotels.models import FailedGeneration, GeneratePropertyRatingReview
+from hotels.utils import parse_rating_review
 
 class CommandTest(TestCase):
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_generate_rating_and_review(self, mock_post):
         def side_effect(*args, **kwargs):
             if args[0].endswith('rating-endpoint'):  # Adjust URL matching logic as needed
@@ -42,13 +45,18 @@ class CommandTest(TestCase):
         return out.getvalue()
 
 
-    @patch('hotels.management.commands.generate_rating_review.requests.post')
-    def test_api_failure_handling(self, mock_post):
+    @patch('hotels.llm.time.sleep')
+    @patch('builtins.open')
+    @patch('hotels.llm.requests.Session.post')
+    def test_api_failure_handling(self, mock_post, mock_open, mock_sleep):
         """
-        Test that the command handles API failures gracefully
+        Test that API failures are recorded for replay instead of saving default values
         """
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,room_type,price\n"
+            "1,Test Hotel,Nice hotel,Downtown,Suite,200\n"
+        )
 
-        
         # Simulate an API failure by having the mock return a non-200 status code
         mock_post.return_value.status_code = 500  # Simulating server error
         mock_post.return_value.text = "Internal Server Error"
@@ -56,20 +64,16 @@ class CommandTest(TestCase):
         # Call the command
         out = self.capture_stdout(lambda: call_command('generate_rating_review'))
 
-        # Check that the error message is in the output
-        self.assertIn("Error generating rating:", out)
-        self.assertIn("Error generating review:", out)
-        
-        # Ensure default values are used (rating = 4.5, default review)
-        # Check if default review was used
-        review = GeneratePropertyRatingReview.objects.first().review
-        rating = GeneratePropertyRatingReview.objects.first().rating
-        
-        self.assertEqual(review, "Default review: This is a great property!")
-        self.assertEqual(rating, 4.5) 
+        # Check that the failure is reported
+        self.assertIn("Could not generate rating_review for property 1", out)
+
+        # No made-up rating or review is stored; the row waits in the replay table
+        self.assertFalse(GeneratePropertyRatingReview.objects.exists())
+        failure = FailedGeneration.objects.get(task='rating_review', property_id=1)
+        self.assertIn('500', failure.error)
 
     @patch('builtins.open')
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_duplicate_property_handling(self, mock_post, mock_open):
         """Test handling of duplicate property IDs"""
         
@@ -92,7 +96,9 @@ class CommandTest(TestCase):
         }
 
         # Mock the post requests for rating and review
-        mock_post.return_value = MagicMock(status_code=200, json=lambda: self.mock_rating_response)
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {
+            "choices": [{"message": {"content": "Rating: 4.5 stars. Great property, highly recommend it!"}}]
+        })
 
         # Call the command
         out = StringIO()
@@ -101,6 +107,7 @@ class CommandTest(TestCase):
         # Verify only one entry was created for the duplicate property_id
         review_count = GeneratePropertyRatingReview.objects.filter(property_id=1).count()
         self.assertEqual(review_count, 1)
+        self.assertEqual(mock_post.call_count, 2)
 
         # Optionally, you can print the command output if needed for debugging
         print(out.getvalue())
@@ -108,7 +115,7 @@ class CommandTest(TestCase):
 
    
     @patch('builtins.open')
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_rating_extraction_failure(self, mock_post, mock_open):
         """Test handling of invalid rating format in API response"""
         
@@ -143,11 +150,163 @@ class CommandTest(TestCase):
         out = StringIO()
         call_command('generate_rating_review', stdout=out)
         
-        # Verify that a default rating was used when invalid rating is extracted
-        review = GeneratePropertyRatingReview.objects.get(property_id=1)
-        
-        # Verify that the default rating was set (e.g., 4.5)
-        self.assertEqual(review.rating, Decimal('4.5'))
+        # Verify that no default rating was stored for an unparseable reply
+        self.assertFalse(GeneratePropertyRatingReview.objects.exists())
+        failure = FailedGeneration.objects.get(task='rating_review', property_id=1)
+        self.assertIn('Rating extraction failed', failure.error)
 
         # Optionally, print the output for debugging
-        print(out.getvalue())      
\ No newline at end of file
+        print(out.getvalue())
+
+    @patch('builtins.open')
+    @patch('requests.Session.post')
+    def test_out_of_range_rating_is_recorded_as_failure(self, mock_post, mock_open):
+        mock_post.return_value = MagicMock(
+            status_code=200,
+            json=lambda: {"choices": [{"message": {"content": "Rating: 7.5"}}]}
+        )
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,room_type,price\n"
+            "1,Test Hotel,Nice hotel,Downtown,Suite,200\n"
+        )
+
+        call_command('generate_rating_review', stdout=StringIO())
+
+        self.assertFalse(GeneratePropertyRatingReview.objects.exists())
+        failure = FailedGeneration.objects.get(task='rating_review', property_id=1)
+        self.assertIn('Rating out of range', failure.error)
+
+    @patch('builtins.open')
+    @patch('requests.Session.post')
+    def test_structured_mode_uses_one_request(self, mock_post, mock_open):
+        """Test that --structured asks for rating and review in a single JSON reply"""
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {
+            "choices": [{"message": {"content": '{"rating": 4.2, "review": "Spacious and clean."}'}}]
+        })
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,room_type,price\n"
+            "1,Test Hotel,Nice hotel,Downtown,Suite,200\n"
+        )
+
+        call_command('generate_rating_review', structured=True, stdout=StringIO())
+
+        mock_post.assert_called_once()
+        self.assertIn('response_format', mock_post.call_args[1]['json'])
+        review = GeneratePropertyRatingReview.objects.get(property_id=1)
+        self.assertEqual(review.rating, Decimal('4.2'))
+        self.assertEqual(review.review, 'Spacious and clean.')
+
+    @patch('builtins.open')
+    @patch('requests.Session.post')
+    def test_structured_mode_does_not_save_unparseable_reply(self, mock_post, mock_open):
+        """Test that a reply without a usable rating is recorded as failed, not saved with a default"""
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {
+            "choices": [{"message": {"content": "The rating is excellent"}}]
+        })
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,room_type,price\n"
+            "1,Test Hotel,Nice hotel,Downtown,Suite,200\n"
+        )
+
+        out = StringIO()
+        call_command('generate_rating_review', structured=True, stdout=out)
+
+        self.assertFalse(GeneratePropertyRatingReview.objects.exists())
+        self.assertIn('Could not generate rating_review for property 1', out.getvalue())
+        self.assertTrue(FailedGeneration.objects.filter(task='rating_review', property_id=1).exists())
+
+
+    def test_stream_stops_once_rating_is_complete(self):
+        """Test that --stream stops the rating request as soon as a full rating has arrived"""
+        command = Command()
+        command.stream = True
+        command._client = Mock()
+        command._client.chat.side_effect = ['Rating: 4.3 stars', 'Great place.']
+
+        rating, review = command.generate_rating_review_with_ollama('Hotel', 'Desc', 'Town', 'Suite', '100')
+
+        self.assertEqual((rating, review), (4.3, 'Great place.'))
+        rating_options = command._client.chat.call_args_list[0][1]
+        self.assertTrue(rating_options['stream'])
+        self.assertEqual(rating_options['max_tokens'], Command.rating_max_tokens)
+        stop_when = rating_options['stop_when']
+        self.assertFalse(stop_when('Rating: 4'))
+        self.assertFalse(stop_when('Rating: 4.3'))
+        self.assertTrue(stop_when('Rating: 4.3 '))
+
+    @patch('builtins.open')
+    @patch('requests.Session.post')
+    def test_prompt_batch_asks_for_ratings_together(self, mock_post, mock_open):
+        """Test that --prompt-batch rates several properties in one request and still reviews each one"""
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,room_type,price\n"
+            "1,Hotel 1,Nice hotel,Downtown,Suite,200\n"
+            "2,Hotel 2,Quiet hotel,Uptown,Single,90\n"
+        )
+
+        def reply(url, **kwargs):
+            prompt = kwargs['json']['messages'][0]['content']
+            if prompt.startswith('Assign a rating'):
+                content = '[{"id": 2, "rating": "3.9"}, {"id": 1, "rating": 4.4}]'
+            else:
+                content = 'A fine place.'
+            return MagicMock(status_code=200, json=lambda: {"choices": [{"message": {"content": content}}]})
+
+        mock_post.side_effect = reply
+        call_command('generate_rating_review', prompt_batch=2, stdout=StringIO())
+
+        # one batched rating request and one review per property
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(GeneratePropertyRatingReview.objects.get(property_id=1).rating, Decimal('4.4'))
+        self.assertEqual(GeneratePropertyRatingReview.objects.get(property_id=2).rating, Decimal('3.9'))
+        self.assertEqual(GeneratePropertyRatingReview.objects.get(property_id=2).review, 'A fine place.')
+
+
+    @patch('builtins.open')
+    @patch('requests.Session.post')
+    def test_prompt_batch_reviews_run_concurrently(self, mock_post, mock_open):
+        """Test that the reviews of a batch are sent at the same time, not one after another"""
+        mock_open.return_value.__enter__.return_value = StringIO(
+            "id,title,description,location,room_type,price\n"
+            "1,Hotel 1,Nice hotel,Downtown,Suite,200\n"
+            "2,Hotel 2,Quiet hotel,Uptown,Single,90\n"
+        )
+        # Both reviews must be in flight before either may finish.
+        reviews_in_flight = threading.Barrier(2, timeout=5)
+
+        def reply(url, **kwargs):
+            prompt = kwargs['json']['messages'][0]['content']
+            if 'to each of the following' in prompt:
+                content = '[{"id": 1, "rating": 4.4}]'
+            elif prompt.startswith('Generate a detailed review'):
+                reviews_in_flight.wait()
+                content = 'A fine place.'
+            else:
+                content = 'Rating: 3.9 stars'
+            return MagicMock(status_code=200, json=lambda: {"choices": [{"message": {"content": content}}]})
+
+        mock_post.side_effect = reply
+        call_command('generate_rating_review', prompt_batch=2, concurrency=3, stdout=StringIO())
+
+        # Property 2 was missing from the batched reply: only its rating is asked again
+        self.assertEqual(mock_post.call_count, 4)
+        self.assertEqual(GeneratePropertyRatingReview.objects.get(property_id=1).rating, Decimal('4.4'))
+        self.assertEqual(GeneratePropertyRatingReview.objects.get(property_id=2).rating, Decimal('3.9'))
+        self.assertEqual(GeneratePropertyRatingReview.objects.count(), 2)
+
+
+class ParseRatingReviewTest(TestCase):
+    def test_plain_json(self):
+        self.assertEqual(
+            parse_rating_review('{"rating": 4.56, "review": "Lovely stay."}'),
+            (4.6, 'Lovely stay.')
+        )
+
+    def test_fenced_json_with_string_rating(self):
+        content = 'Here you go:\n```json\n{"Rating": "4/5", "Review": " Good value. "}\n```'
+        self.assertEqual(parse_rating_review(content), (4.0, 'Good value.'))
+
+    def test_invalid_replies_raise(self):
+        for content in ['no json here', '{"rating": 9, "review": "x"}', '{"rating": 4.0, "review": ""}', '{"review": "x"}']:
+            with self.assertRaises(ValueError):
+                parse_rating_review(content)
@@ -1,8 +1,11 @@
+import os
+import tempfile
 from django.test import TestCase
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from unittest.mock import patch, Mock
 from io import StringIO
-from hotels.models import GeneratedPropertySummary
+from hotels.llm import OllamaError
+from hotels.models import FailedGeneration, GeneratedPropertySummary
 from hotels.management.commands.write_summary import Command
 
 class PropertySummaryCommandTests(TestCase):
@@ -17,7 +20,7 @@ class PropertySummaryCommandTests(TestCase):
             'room_type': 'Single'
         }
 
-    @patch('hotels.management.commands.write_summary.requests.post')
+    @patch('hotels.llm.requests.Session.post')
     def test_generate_summary_successful(self, mock_post):
         # Mock successful API response
         mock_response = Mock()
@@ -56,26 +59,27 @@ class PropertySummaryCommandTests(TestCase):
         self.assertIn(self.test_data['room_type'], prompt)
 
 
-    @patch('hotels.management.commands.write_summary.requests.post')
-    def test_generate_summary_api_failure(self, mock_post):
+    @patch('hotels.llm.time.sleep')
+    @patch('hotels.llm.requests.Session.post')
+    def test_generate_summary_api_failure(self, mock_post, mock_sleep):
         # Mock failed API response
         mock_response = Mock()
         mock_response.status_code = 500
         mock_post.return_value = mock_response
 
-        summary = self.command.Generate_Summary_with_Ollama(
-            self.test_data['title'],
-            self.test_data['description'],
-            self.test_data['location'],
-            self.test_data['price'],
-            self.test_data['room_type']
-        )
-
-        self.assertEqual(summary, "Error generating summary")
+        with self.assertRaises(OllamaError):
+            self.command.Generate_Summary_with_Ollama(
+                self.test_data['title'],
+                self.test_data['description'],
+                self.test_data['location'],
+                self.test_data['price'],
+                self.test_data['room_type']
+            )
+        mock_response.json.assert_not_called()
 
     @patch('builtins.open')
     @patch('csv.DictReader')
-    @patch('hotels.management.commands.write_summary.requests.post')
+    @patch('hotels.llm.requests.Session.post')
     def test_handle_command(self, mock_post, mock_reader, mock_open):
         # Mock CSV data
         mock_reader.return_value = [self.test_data]
@@ -115,7 +119,7 @@ class PropertySummaryCommandTests(TestCase):
             {**self.test_data, 'id': '3'}
         ]
         
-        with patch('hotels.management.commands.write_summary.requests.post') as mock_post:
+        with patch('hotels.llm.requests.Session.post') as mock_post:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {
@@ -139,7 +143,7 @@ class PropertySummaryCommandTests(TestCase):
         # Test that property_id is correctly converted to integer
         with patch('builtins.open'), \
              patch('csv.DictReader') as mock_reader, \
-             patch('hotels.management.commands.write_summary.requests.post') as mock_post:
+             patch('hotels.llm.requests.Session.post') as mock_post:
             
             mock_reader.return_value = [{**self.test_data, 'id': '123'}]
             mock_response = Mock()
@@ -157,4 +161,219 @@ class PropertySummaryCommandTests(TestCase):
             
             generated_summary = GeneratedPropertySummary.objects.first()
             self.assertEqual(generated_summary.property_id, 123)
-            self.assertTrue(isinstance(generated_summary.property_id, int))
\ No newline at end of file
+            self.assertTrue(isinstance(generated_summary.property_id, int))
+
+    @patch('builtins.open')
+    @patch('csv.DictReader')
+    @patch('hotels.llm.requests.Session.post')
+    def test_resume_skips_completed_properties(self, mock_post, mock_reader, mock_open):
+        # Property 1 was generated by an earlier, interrupted run
+        GeneratedPropertySummary.objects.create(property_id=1, summary='Existing summary')
+        mock_reader.return_value = [
+            {**self.test_data, 'id': '1'},
+            {**self.test_data, 'id': '2'}
+        ]
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'choices': [{
+                'message': {
+                    'content': 'Test summary'
+                }
+            }]
+        }
+        mock_post.return_value = mock_response
+
+        call_command('write_summary', resume=True, stdout=StringIO())
+
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 2)
+        self.assertEqual(GeneratedPropertySummary.objects.get(property_id=1).summary, 'Existing summary')
+
+    @patch('builtins.open')
+    @patch('csv.DictReader')
+    @patch('hotels.llm.requests.Session.post')
+    def test_resume_looks_up_each_batch_as_it_is_read(self, mock_post, mock_reader, mock_open):
+        mock_reader.return_value = [
+            {**self.test_data, 'id': '1'},
+            {**self.test_data, 'id': '2'}
+        ]
+
+        def reply(*args, **kwargs):
+            # Another worker finishes property 2 while this one is on property 1
+            GeneratedPropertySummary.objects.get_or_create(property_id=2, defaults={'summary': 'Other worker'})
+            return Mock(status_code=200, json=lambda: {'choices': [{'message': {'content': 'Test summary'}}]})
+        mock_post.side_effect = reply
+
+        call_command('write_summary', resume=True, chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(GeneratedPropertySummary.objects.get(property_id=2).summary, 'Other worker')
+
+    @patch('builtins.open')
+    @patch('csv.DictReader')
+    @patch('hotels.llm.requests.Session.post')
+    def test_changed_only_regenerates_new_and_modified_properties(self, mock_post, mock_reader, mock_open):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'choices': [{'message': {'content': 'Test summary'}}]}
+        mock_post.return_value = mock_response
+        mock_reader.return_value = [{**self.test_data, 'id': str(i)} for i in (1, 2, 3)]
+        call_command('write_summary', stdout=StringIO())
+        self.assertEqual(mock_post.call_count, 3)
+
+        # Nightly export: 1 unchanged, 2 edited, 3 removed, 4 new
+        mock_post.reset_mock()
+        mock_reader.return_value = [
+            {**self.test_data, 'id': '1'},
+            {**self.test_data, 'id': '2', 'description': 'Renovated in 2026'},
+            {**self.test_data, 'id': '4'},
+        ]
+        out = StringIO()
+        call_command('write_summary', changed_only=True, stdout=out)
+
+        self.assertEqual(mock_post.call_count, 2)
+        prompts = [call[1]['json']['messages'][0]['content'] for call in mock_post.call_args_list]
+        self.assertIn('Renovated in 2026', prompts[0])
+        self.assertEqual(
+            list(GeneratedPropertySummary.objects.filter(stale=True).values_list('property_id', flat=True)), [3]
+        )
+        self.assertIn('skipped 1 unchanged properties; marked 1 rows stale, 0 back in the input', out.getvalue())
+
+        # Property 3 comes back unchanged: no request, but no longer stale
+        mock_post.reset_mock()
+        mock_reader.return_value = [{**self.test_data, 'id': '3'}]
+        call_command('write_summary', changed_only=True, stdout=StringIO())
+        self.assertEqual(mock_post.call_count, 0)
+        self.assertFalse(GeneratedPropertySummary.objects.get(property_id=3).stale)
+        self.assertEqual(GeneratedPropertySummary.objects.filter(stale=True).count(), 3)
+
+    @patch('builtins.open')
+    @patch('csv.DictReader')
+    @patch('hotels.llm.requests.Session.post')
+    def test_changed_only_compares_and_stamps_each_batch(self, mock_post, mock_reader, mock_open):
+        rows = [{**self.test_data, 'id': str(i)} for i in (1, 2, 3)]
+        for row in rows:
+            GeneratedPropertySummary.objects.create(
+                property_id=int(row['id']), summary='Old summary', source_fingerprint=self.command.fingerprint(row)
+            )
+        mock_reader.return_value = rows[:2]
+
+        out = StringIO()
+        call_command('write_summary', changed_only=True, chunk_size=1, stdout=out)
+
+        self.assertEqual(mock_post.call_count, 0)
+        self.assertEqual(
+            list(GeneratedPropertySummary.objects.filter(stale=True).values_list('property_id', flat=True)), [3]
+        )
+        self.assertEqual(GeneratedPropertySummary.objects.exclude(last_seen_run='').count(), 2)
+        self.assertIn('skipped 2 unchanged properties; marked 1 rows stale', out.getvalue())
+
+    @patch('builtins.open')
+    @patch('csv.DictReader')
+    @patch('hotels.llm.requests.Session.post')
+    def test_claim_runs_with_a_new_run_id_see_changed_properties(self, mock_post, mock_reader, mock_open):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'choices': [{'message': {'content': 'Test summary'}}]}
+        mock_post.return_value = mock_response
+        mock_reader.return_value = [{**self.test_data, 'id': str(i)} for i in (1, 2)]
+        call_command('write_summary', claim=True, run_id='monday', stdout=StringIO())
+        self.assertEqual(mock_post.call_count, 2)
+
+        # Same run again: every property is already done
+        mock_post.reset_mock()
+        call_command('write_summary', claim=True, run_id='monday', stdout=StringIO())
+        self.assertEqual(mock_post.call_count, 0)
+
+        # Next run: property 1 changed, property 2 did not
+        mock_post.reset_mock()
+        mock_reader.return_value = [
+            {**self.test_data, 'id': '1', 'description': 'Renovated in 2026'},
+            {**self.test_data, 'id': '2'},
+        ]
+        call_command('write_summary', claim=True, run_id='tuesday', changed_only=True, stdout=StringIO())
+        mock_post.assert_called_once()
+        self.assertIn('Renovated in 2026', mock_post.call_args[1]['json']['messages'][0]['content'])
+
+    def test_claim_needs_a_run_id(self):
+        with self.assertRaisesMessage(CommandError, '--run-id'):
+            call_command('write_summary', claim=True, stdout=StringIO())
+
+    @patch('hotels.llm.requests.Session.post')
+    def test_columnar_input_rejects_bad_rows_before_any_request(self, mock_post):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'choices': [{'message': {'content': 'Test summary'}}]}
+        mock_post.return_value = mock_response
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'hotels.csv')
+            with open(input_path, 'w') as file:
+                file.write(
+                    "id,title,description,location,price,room_type\n"
+                    "1,Test Hotel,Test description,Test location,100,Single\n"
+                    "2,Test Hotel,Test description,Test location,cheap,Single\n"
+                    "3,Test Hotel,Test description,,100,Single\n"
+                )
+            out = StringIO()
+            call_command('write_summary', input=input_path, columnar=True, stdout=out)
+
+        mock_post.assert_called_once()
+        self.assertIn('Price: 100, ', mock_post.call_args[1]['json']['messages'][0]['content'])
+        self.assertEqual(list(GeneratedPropertySummary.objects.values_list('property_id', flat=True)), [1])
+        self.assertIn('Rejected: 1 empty location, 1 invalid price', out.getvalue())
+
+    @patch('builtins.open')
+    @patch('csv.DictReader')
+    @patch('hotels.llm.requests.Session.post')
+    def test_shard_processes_only_its_properties(self, mock_post, mock_reader, mock_open):
+        mock_reader.return_value = [{**self.test_data, 'id': str(i)} for i in range(1, 7)]
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            'choices': [{
+                'message': {
+                    'content': 'Test summary'
+                }
+            }]
+        }
+        mock_post.return_value = mock_response
+
+        call_command('write_summary', shard='1/3', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(GeneratedPropertySummary.objects.values_list('property_id', flat=True)),
+            [1, 4]
+        )
+
+    @patch('hotels.llm.time.sleep')
+    @patch('builtins.open')
+    @patch('csv.DictReader')
+    @patch('hotels.llm.requests.Session.post')
+    def test_failed_rows_are_recorded_and_replayed(self, mock_post, mock_reader, mock_open, mock_sleep):
+        mock_reader.return_value = [{**self.test_data, 'id': '1'}, {**self.test_data, 'id': '2'}]
+        ok = Mock(status_code=200)
+        ok.json.return_value = {'choices': [{'message': {'content': 'Test summary'}}]}
+        down = Mock(status_code=503, text='overloaded', headers={})
+
+        # Property 2 keeps failing until the retries run out
+        mock_post.side_effect = [ok] + [down] * 4
+        out = StringIO()
+        call_command('write_summary', stdout=out)
+
+        self.assertEqual(list(GeneratedPropertySummary.objects.values_list('property_id', flat=True)), [1])
+        failure = FailedGeneration.objects.get(task='summary')
+        self.assertEqual(failure.property_id, 2)
+        self.assertEqual(failure.row['title'], self.test_data['title'])
+        self.assertIn('rerun with --replay-failed', out.getvalue())
+
+        # The replay reads the failed row from the table, not the input file
+        mock_reader.return_value = []
+        mock_post.side_effect = None
+        mock_post.return_value = ok
+        call_command('write_summary', replay_failed=True, stdout=StringIO())
+
+        self.assertEqual(mock_post.call_count, 6)
+        self.assertEqual(GeneratedPropertySummary.objects.get(property_id=2).summary, 'Test summary')
+        self.assertFalse(FailedGeneration.objects.exists())
@@ -0,0 +1,66 @@
+from unittest.mock import patch
+from django.db.models.query import QuerySet
+from django.test import TestCase
+from hotels.models import GeneratedPropertySummary, GeneratePropertyRatingReview
+from hotels.writer import BufferedWriter
+
+
+class BufferedWriterTests(TestCase):
+    def test_rows_are_written_in_batches(self):
+        """Test that rows reach the database once a batch is full"""
+        writer = BufferedWriter(batch_size=2)
+        writer.add(GeneratedPropertySummary(property_id=1, summary='one'))
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 0)
+
+        writer.add(GeneratedPropertySummary(property_id=2, summary='two'))
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 2)
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(writer.written, 2)
+
+    def test_partial_batch_is_flushed_on_interrupt(self):
+        """Test that leaving the context on Ctrl-C still saves buffered rows"""
+        with self.assertRaises(KeyboardInterrupt):
+            with BufferedWriter(batch_size=100) as writer:
+                writer.add(GeneratedPropertySummary(property_id=1, summary='one'))
+                raise KeyboardInterrupt
+
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 1)
+
+    def test_rows_stay_buffered_when_the_insert_is_interrupted(self):
+        """Test that an interrupt inside bulk_create keeps the batch for the final flush"""
+        bulk_create = QuerySet.bulk_create
+        calls = []
+
+        def interrupt_once(queryset, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise KeyboardInterrupt
+            return bulk_create(queryset, *args, **kwargs)
+
+        with patch.object(QuerySet, 'bulk_create', interrupt_once), self.assertRaises(KeyboardInterrupt):
+            with BufferedWriter(batch_size=3) as writer:
+                for property_id in (1, 2, 3):
+                    writer.add(GeneratedPropertySummary(property_id=property_id, summary='text'))
+
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(writer.written, 3)
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 3)
+
+    def test_mixed_models_share_one_flush(self):
+        """Test that one writer can buffer rows for several models"""
+        with BufferedWriter(batch_size=100) as writer:
+            writer.add(GeneratedPropertySummary(property_id=1, summary='one'))
+            writer.add(GeneratePropertyRatingReview(property_id=1, rating='4.0', review='ok'))
+
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 1)
+        self.assertEqual(GeneratePropertyRatingReview.objects.count(), 1)
+
+    def test_existing_property_is_updated_not_duplicated(self):
+        """Test that writing a property twice upserts on property_id"""
+        GeneratedPropertySummary.objects.create(property_id=1, summary='old')
+        with BufferedWriter() as writer:
+            writer.add(GeneratedPropertySummary(property_id=1, summary='stale'))
+            writer.add(GeneratedPropertySummary(property_id=1, summary='new'))
+
+        self.assertEqual(GeneratedPropertySummary.objects.count(), 1)
+        self.assertEqual(GeneratedPropertySummary.objects.get(property_id=1).summary, 'new')
@@ -0,0 +1,14 @@
+from django.urls import path
+
+from hotels import views
+
+app_name = 'hotels'
+
+urlpatterns = [
+    path('properties/', views.property_list, name='property-list'),
+    path('properties/<int:property_id>/', views.property_detail, name='property-detail'),
+    path('properties/<int:property_id>/summary/', views.property_summary, name='property-summary'),
+    path('rewrites/', views.rewrite_list, name='rewrite-list'),
+    path('summaries/', views.summary_list, name='summary-list'),
+    path('reviews/', views.review_list, name='review-list'),
+]
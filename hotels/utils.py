@@ -1,15 +1,148 @@
-import requests
-
-def rewrite_with_ollama(title, description):
-    api_url = 'http://127.0.0.1:11434/rewrite'  
-    payload = {
-        'title': title,
-        'description': description
-    }
-    response = requests.post(api_url, json=payload)
-    
-    if response.status_code == 200:
-        return response.json() 
+import json
+import re
+
+from hotels.llm import get_client
+from hotels.profiling import profiled
+
+
+@profiled('parse_reply')
+def split_title_description(content):
+    """Split a rewritten "Title ... Description: ..." reply into its two parts."""
+    try:
+        title_part, description_part = content.split("Description:", 1)
+    except ValueError:
+        title_part = content.split(".")[0]
+        description_part = content[len(title_part):]
+    return title_part.strip(), description_part.strip()
+
+
+def rewrite_with_ollama(title, description, client=None, **options):
+    client = client or get_client()
+    prompt = f"Rewrite the following: Title: {title}, Description: {description}"
+    return split_title_description(client.chat(prompt, **options))
+
+
+def summary_prompt(title, description, location, price, room_type):
+    return (
+        f"Generate a summary for the following property: Title: {title}, Description: {description}, "
+        f"Location: {location}, Price: {price}, Room Type: {room_type}"
+    )
+
+
+def rewrite_batch_with_ollama(items, client=None, **options):
+    """Rewrite several ``(key, title, description)`` items with one prompt.
+
+    Returns ``{key: (title, description)}`` for the entries of the reply that
+    could be matched to an item; the caller retries the others on their own.
+    """
+    client = client or get_client()
+    listing = "\n\n".join(
+        f"id: {key}\nTitle: {title}\nDescription: {description}" for key, title, description in items
+    )
+    prompt = (
+        f"Rewrite the title and description of each of the following {len(items)} properties.\n\n"
+        f"{listing}\n\n"
+        "Reply with a JSON array containing one object per property, in any order, each with the keys "
+        "\"id\" (the id given above), \"title\" and \"description\"."
+    )
+    return parse_batch_reply(client.chat(prompt, **options), [key for key, _, _ in items], _parse_rewrite_entry)
+
+
+def _parse_rewrite_entry(entry):
+    title, description = entry.get('title'), entry.get('description')
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError(f"Entry has no title: {entry!r}")
+    if not isinstance(description, str) or not description.strip():
+        raise ValueError(f"Entry has no description: {entry!r}")
+    return title.strip(), description.strip()
+
+
+def _find_json_object(content):
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r'\{', content):
+        try:
+            value, _ = decoder.raw_decode(content, match.start())
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value
+    raise ValueError(f"No JSON object in reply: {content[:200]!r}")
+
+
+def _find_json_list(content):
+    """Return the first JSON array in ``content``, or the first array held by a JSON object."""
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r'[\[{]', content):
+        try:
+            value, _ = decoder.raw_decode(content, match.start())
+        except ValueError:
+            continue
+        if isinstance(value, list):
+            return value
+        for item in value.values():
+            if isinstance(item, list):
+                return item
+    raise ValueError(f"No JSON array in reply: {content[:200]!r}")
+
+
+@profiled('parse_reply')
+def parse_batch_reply(content, keys, parse_entry):
+    """Map the entries of a batched JSON reply back to the ids they were asked for.
+
+    ``parse_entry`` turns one entry (a dict with lower-cased keys) into a
+    result or raises ValueError. Entries with an unknown or repeated id, or
+    that fail to parse, are left out. Raises ValueError if the reply holds no
+    JSON array at all.
+    """
+    wanted = {str(key) for key in keys}
+    results = {}
+    seen = set()
+    for entry in _find_json_list(content):
+        if not isinstance(entry, dict):
+            continue
+        entry = {str(name).lower(): value for name, value in entry.items()}
+        key = str(entry.get('id', '')).strip()
+        if key not in wanted:
+            continue
+        if key in seen:
+            # Two answers for one property: trust neither.
+            results.pop(key, None)
+            continue
+        seen.add(key)
+        try:
+            results[key] = parse_entry(entry)
+        except ValueError:
+            pass
+    return results
+
+
+def parse_rating(value):
+    """Turn 4.5, "4.5", "4.5/5" or "4.5 stars" into a rating rounded to one decimal."""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid rating: {value!r}")
+    if isinstance(value, (int, float)):
+        rating = float(value)
     else:
-        print(f"Error: {response.status_code}")
-        return None
+        match = re.search(r'\d+(?:\.\d+)?', str(value))
+        if not match:
+            raise ValueError(f"Invalid rating: {value!r}")
+        rating = float(match.group())
+    if not 0 <= rating <= 5:
+        raise ValueError(f"Rating out of range: {rating}")
+    return round(rating, 1)
+
+
+@profiled('parse_reply')
+def parse_rating_review(content):
+    """Parse a ``{"rating": ..., "review": ...}`` reply into ``(rating, review)``.
+
+    Tolerates code fences and text around the object, differently cased keys
+    and ratings given as strings. Raises ValueError instead of guessing.
+    """
+    data = {str(key).lower(): value for key, value in _find_json_object(content).items()}
+    if 'rating' not in data:
+        raise ValueError(f"Reply has no rating: {content[:200]!r}")
+    review = data.get('review')
+    if not isinstance(review, str) or not review.strip():
+        raise ValueError(f"Reply has no review: {content[:200]!r}")
+    return parse_rating(data['rating']), review.strip()
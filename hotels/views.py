@@ -1,3 +1,189 @@
-from django.shortcuts import render
+import hashlib
+from functools import wraps
 
-# Create your views here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from hotels import ondemand
+from hotels.apicache import cache_version
+from hotels.models import GeneratedHotelTD, GeneratedPropertySummary, GeneratePropertyRatingReview, Property
+
+PROPERTY_FIELDS = ('id', 'title', 'location', 'latitude', 'longitude', 'room_type', 'price', 'description')
+GENERATED_FIELDS = (
+    'rewrite__title', 'rewrite__description', 'summary__summary', 'rating_review__rating', 'rating_review__review',
+)
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def cached_json(view_name):
+    """Cache a JSON view's 200 responses and answer conditional GETs with 304.
+
+    Entries are keyed by the full URL and stored under the view's current
+    ``cache_version``, so invalidating the view drops all of its pages at
+    once. The ETag is a hash of the body, so it stays correct even when the
+    cache is not shared with the process that wrote the rows.
+    """
+    def decorator(view):
+        @wraps(view)
+        @require_safe
+        def wrapper(request, *args, **kwargs):
+            key = 'hotels-api:' + hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+            version = cache_version(view_name)
+            entry = cache.get(key, version=version)
+            if entry is None:
+                try:
+                    response = view(request, *args, **kwargs)
+                except InvalidQuery as e:
+                    return JsonResponse({'error': str(e)}, status=400)
+                if response.status_code != 200:
+                    return response
+                entry = (f'"{hashlib.md5(response.content).hexdigest()}"', response.content)
+                cache.set(key, entry, settings.API_CACHE_SECONDS, version=version)
+
+            etag, body = entry
+            response = get_conditional_response(request, etag=etag) or HttpResponse(
+                body, content_type='application/json'
+            )
+            response['ETag'] = etag
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def int_param(request, name, default=None, minimum=None, maximum=None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidQuery(f"{name} must be an integer")
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise InvalidQuery(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def keyset_page(request, queryset, key, serialize):
+    """One page of ``queryset`` ordered by the indexed column ``key``.
+
+    Instead of an OFFSET, the next page starts after the last key of this one
+    (``?after=``), so every page costs the same index range scan no matter how
+    deep it is. There is deliberately no total count.
+    """
+    limit = int_param(request, 'limit', settings.API_PAGE_SIZE, 1, settings.API_MAX_PAGE_SIZE)
+    after = int_param(request, 'after')
+    if after is not None:
+        queryset = queryset.filter(**{f'{key}__gt': after})
+    rows = list(queryset.order_by(key)[:limit + 1])
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        params = request.GET.copy()
+        params['after'] = getattr(rows[-1], key)
+        next_url = f"{request.path}?{params.urlencode()}"
+    return JsonResponse({'results': [serialize(row) for row in rows], 'next': next_url})
+
+
+def related(instance, name):
+    try:
+        return getattr(instance, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+def serialize_rewrite(rewrite):
+    return {'property_id': rewrite.property_id, 'title': rewrite.title, 'description': rewrite.description}
+
+
+def serialize_summary(summary):
+    return {'property_id': summary.property_id, 'summary': summary.summary}
+
+
+def serialize_review(review):
+    return {'property_id': review.property_id, 'rating': review.rating, 'review': review.review}
+
+
+def serialize_property(prop):
+    data = {field: getattr(prop, field) for field in PROPERTY_FIELDS}
+    rewrite = related(prop, 'rewrite')
+    summary = related(prop, 'summary')
+    review = related(prop, 'rating_review')
+    data['rewrite'] = {'title': rewrite.title, 'description': rewrite.description} if rewrite else None
+    data['summary'] = summary.summary if summary else None
+    data['rating_review'] = {'rating': review.rating, 'review': review.review} if review else None
+    return data
+
+
+def properties_with_content():
+    return (
+        Property.objects
+        .select_related('rewrite', 'summary', 'rating_review')
+        .only(*PROPERTY_FIELDS, *GENERATED_FIELDS)
+    )
+
+
+@cached_json('properties')
+def property_list(request):
+    queryset = properties_with_content()
+    for field in ('room_type', 'location'):
+        if request.GET.get(field):
+            queryset = queryset.filter(**{field: request.GET[field]})
+    return keyset_page(request, queryset, 'id', serialize_property)
+
+
+@cached_json('property')
+def property_detail(request, property_id):
+    prop = properties_with_content().filter(id=property_id).first()
+    if prop is None:
+        return JsonResponse({'error': f"Property {property_id} not found"}, status=404)
+    return JsonResponse(serialize_property(prop))
+
+
+@cached_json('rewrites')
+def rewrite_list(request):
+    queryset = GeneratedHotelTD.objects.filter(property_id__isnull=False).only('property_id', 'title', 'description')
+    return keyset_page(request, queryset, 'property_id', serialize_rewrite)
+
+
+@cached_json('summaries')
+def summary_list(request):
+    queryset = GeneratedPropertySummary.objects.only('property_id', 'summary')
+    return keyset_page(request, queryset, 'property_id', serialize_summary)
+
+
+@cached_json('reviews')
+def review_list(request):
+    queryset = GeneratePropertyRatingReview.objects.only('property_id', 'rating', 'review')
+    return keyset_page(request, queryset, 'property_id', serialize_review)
+
+
+@require_safe
+async def property_summary(request, property_id):
+    """Return the property's summary as plain text, generating and streaming it if there is none yet.
+
+    Concurrent requests for the same property share one Ollama call, and
+    the generated summary is saved even if every caller disconnects.
+    """
+    stored = await GeneratedPropertySummary.objects.filter(property_id=property_id).only('summary').afirst()
+    if stored is not None:
+        return HttpResponse(stored.summary, content_type='text/plain; charset=utf-8',
+                            headers={'X-Summary-Source': 'stored'})
+    prop = await Property.objects.only(*PROPERTY_FIELDS).filter(id=property_id).afirst()
+    if prop is None:
+        return JsonResponse({'error': f"Property {property_id} not found"}, status=404)
+
+    flight = ondemand.summaries.join(('summary', property_id), ondemand.summary_generator(prop))
+    await flight.wait_started()
+    if flight.error is not None and not flight.parts:
+        return JsonResponse({'error': f"Could not generate a summary: {flight.error}"}, status=502)
+    return StreamingHttpResponse(flight.tokens(), content_type='text/plain; charset=utf-8',
+                                 headers={'X-Summary-Source': 'generated'})
@@ -0,0 +1,104 @@
+import time
+
+from django.db import transaction
+
+from hotels import profiling
+from hotels.metrics import ROW_BUCKETS
+
+
+def upsert_options(model):
+    """Return ``bulk_create`` options that upsert on the model's unique fields.
+
+    A unique column is used if the model has one, otherwise its first
+    unconditional ``UniqueConstraint``.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    unique_fields = [field.name for field in fields if field.unique]
+    if not unique_fields and model._meta.total_unique_constraints:
+        unique_fields = list(model._meta.total_unique_constraints[0].fields)
+    if not unique_fields:
+        return {}
+    return {
+        'update_conflicts': True,
+        'unique_fields': unique_fields,
+        'update_fields': [field.name for field in fields if field.name not in unique_fields],
+    }
+
+
+def _last_per_key(instances, unique_fields):
+    # A single INSERT ... ON CONFLICT may not touch the same row twice, so keep
+    # only the newest instance per key. Rows with a NULL key never conflict.
+    # Keys are read by attname so a foreign key gives its id, not a query.
+    if not instances:
+        return instances
+    opts = instances[0]._meta
+    attnames = [opts.get_field(name).attname for name in unique_fields]
+    keyed = {}
+    for position, instance in enumerate(instances):
+        key = tuple(getattr(instance, name) for name in attnames)
+        keyed[position if None in key else key] = instance
+    return list(keyed.values())
+
+
+class BufferedWriter:
+    """Collects unsaved model instances and inserts them with ``bulk_create``.
+
+    Every flush writes all buffered rows in one transaction. Models with a
+    unique column (``property_id``) are upserted on it, so writing the same
+    property twice updates its row instead of adding another. Use it as a
+    context manager so the last partial batch is flushed even when the run is
+    interrupted. Rows stay buffered until their transaction has committed, so
+    a failed or interrupted flush can be retried.
+
+    ``on_flush`` is called with the flushed instances inside the same
+    transaction, for bookkeeping that must commit together with the rows.
+    """
+
+    def __init__(self, batch_size=100, using=None, on_flush=None, metrics=None):
+        self.batch_size = batch_size
+        self.using = using
+        self.on_flush = on_flush
+        self.metrics = metrics
+        self.written = 0
+        self._pending = []
+
+    def add(self, instance):
+        self._pending.append(instance)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        pending = list(self._pending)
+
+        by_model = {}
+        for instance in pending:
+            by_model.setdefault(type(instance), []).append(instance)
+
+        started = time.perf_counter()
+        with profiling.phase('db_write'), transaction.atomic(using=self.using):
+            for model, instances in by_model.items():
+                options = upsert_options(model)
+                if options:
+                    instances = _last_per_key(instances, options['unique_fields'])
+                model.objects.using(self.using).bulk_create(instances, **options)
+            if self.on_flush is not None:
+                self.on_flush(pending)
+        del self._pending[:len(pending)]
+        self.written += len(pending)
+
+        if self.metrics is not None:
+            self.metrics.histogram('db_flush_seconds', 'Time per batched write transaction.').observe(
+                time.perf_counter() - started
+            )
+            self.metrics.histogram('db_flush_rows', 'Rows per batched write.', buckets=ROW_BUCKETS).observe(len(pending))
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()